@@ -124,6 +124,34 @@ bool readAnglesOnce(float &outRoll, float &outPitch, float &outYaw) {
 }
 
 // ================== NET parsing ==================
+// Binary target frame v1 (little endian), see tools/protocol.py:
+// [0xA5][ver][seq u16][x i16 centi-deg][y i16 centi-deg][crc8 of first 8 bytes]
+constexpr uint8_t BIN_MAGIC     = 0xA5;
+constexpr uint8_t BIN_VERSION   = 1;
+constexpr int     BIN_FRAME_LEN = 9;
+
+bool binMode = false;  // switched on per client by "PROTO:BIN1"
+
+static uint8_t crc8(const uint8_t* d, size_t n) {
+  uint8_t c = 0;
+  for (size_t i = 0; i < n; i++) {
+    c ^= d[i];
+    for (int b = 0; b < 8; b++) c = (c & 0x80) ? (uint8_t)((c << 1) ^ 0x07) : (uint8_t)(c << 1);
+  }
+  return c;
+}
+
+static bool readBinFrame(WiFiClient& c, uint16_t& seq, float& x, float& y) {
+  uint8_t f[BIN_FRAME_LEN];
+  if (c.read(f, BIN_FRAME_LEN) != BIN_FRAME_LEN) return false;
+  if (f[0] != BIN_MAGIC || f[1] != BIN_VERSION) return false;
+  if (crc8(f, BIN_FRAME_LEN - 1) != f[BIN_FRAME_LEN - 1]) return false;
+  seq = (uint16_t)(f[2] | (f[3] << 8));
+  x = (float)(int16_t)(f[4] | (f[5] << 8)) / 100.0f;
+  y = (float)(int16_t)(f[6] | (f[7] << 8)) / 100.0f;
+  return true;
+}
+
 static String readLine(WiFiClient& c) {
   String line;
   while (c.available()) {
@@ -165,6 +193,21 @@ static bool parsePacket(const String& s, String& msg, float& x, float& y) {
   return true;
 }
 
+static void applyTarget(const char* msg, float x, float y) {
+  // spawn (deg, step 2)
+  spawnPitchQ = quantizeDeg2(x);
+  spawnYawQ   = quantizeDeg2(y);
+  spawnSet    = true;
+
+  // Msg for HUD
+  char msgBuf[48];
+  strncpy(msgBuf, msg, sizeof(msgBuf) - 1);
+  msgBuf[sizeof(msgBuf) - 1] = '\0';
+  msgBuf[30] = '\0';
+  strncpy(lastMsg, msgBuf, sizeof(lastMsg) - 1);
+  lastMsg[sizeof(lastMsg) - 1] = '\0';
+}
+
 void wifiConnectAndStartServer() {
   Serial.print("Starting AP: ");
   Serial.println(WIFI_SSID);
@@ -231,6 +274,7 @@ void loop() {
     if (newClient) {
       client = newClient;
       client.setTimeout(5);
+      binMode = false;
       client.println("HELLO from UNO R4 WiFi");
       Serial.println("Client connected.");
     }
@@ -238,35 +282,43 @@ void loop() {
 
   // ===== NET read =====
   if (client && client.connected() && client.available()) {
-    String line = readLine(client);
-    line.trim();
-    if (line.length() > 0) {
-      String msg;
-      float x = 0.0f, y = 0.0f;
-
-      if (parsePacket(line, msg, x, y)) {
-        // spawn (deg, step 2)
-        spawnPitchQ = quantizeDeg2((float)x);
-        spawnYawQ   = quantizeDeg2((float)y);
-        spawnSet    = true;
-
-        // Msg for HUD
-        char msgBuf[48];
-        msg.toCharArray(msgBuf, sizeof(msgBuf));
-        msgBuf[30] = '\0';
-        strncpy(lastMsg, msgBuf, sizeof(lastMsg) - 1);
-        lastMsg[sizeof(lastMsg) - 1] = '\0';
-
-        // ACK
-        client.print("ACK;MSG:");
-        client.print(msg);
-        client.print(";X:");
-        client.print(x, 2);
-        client.print(";Y:");
-        client.println(y, 2);
-      } else {
-        client.print("ERR;BAD_PACKET;");
-        client.println(line);
+    if (binMode && client.peek() == BIN_MAGIC) {
+      // wait until the whole fixed-size frame is in
+      if (client.available() >= BIN_FRAME_LEN) {
+        uint16_t seq = 0;
+        float x = 0.0f, y = 0.0f;
+        if (readBinFrame(client, seq, x, y)) {
+          applyTarget("PHONE", x, y);
+          client.print("A:");
+          client.println(seq);
+        } else {
+          client.println("ERR;BAD_FRAME");
+        }
+      }
+    } else {
+      String line = readLine(client);
+      line.trim();
+      if (line.length() > 0) {
+        String msg;
+        float x = 0.0f, y = 0.0f;
+
+        if (line == "PROTO:BIN1") {
+          binMode = true;
+          client.println("PROTO:BIN1;OK");
+        } else if (parsePacket(line, msg, x, y)) {
+          applyTarget(msg.c_str(), x, y);
+
+          // ACK
+          client.print("ACK;MSG:");
+          client.print(msg);
+          client.print(";X:");
+          client.print(x, 2);
+          client.print(";Y:");
+          client.println(y, 2);
+        } else {
+          client.print("ERR;BAD_PACKET;");
+          client.println(line);
+        }
       }
     }
   }
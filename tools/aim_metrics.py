@@ -0,0 +1,236 @@
+import argparse
+import json
+import sys
+import time
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+from protocol import TARGET_TOL_DEG, FrameDecoder, parse_text_packet, quantize_deg2
+from session import TX, read_session
+from telemetry import TelemetryReader, TelemetryRing
+
+MAX_SETTLE = 5.0
+MATCH_SLACK = 0.5
+RESULT_FIELDS = ("send_t", "arrival_t", "latency", "initial_error", "time_to_on_target", "settle_time",
+                 "overshoot_pitch", "overshoot_yaw")
+
+
+def segment_metrics(t, err_p, err_y, on, starts, ends, tol: float = TARGET_TOL_DEG) -> dict:
+    # Per-command response over telemetry segments [starts[i], ends[i]), all
+    # vectorized: no Python loop over samples or commands.
+    #   time_to_on_target  first onTarget sample after arrival
+    #   settle_time        from arrival until the error stays within tol for
+    #                      the rest of the segment (NaN if it never does)
+    #   overshoot_*        how far the axis went past the target, degrees
+    starts = np.asarray(starts, np.int64)
+    ends = np.asarray(ends, np.int64)
+    t0 = t[starts]
+    n = len(t)
+
+    on_idx = np.flatnonzero(on)
+    k = np.searchsorted(on_idx, starts)
+    hit = k < on_idx.size
+    hit[hit] &= on_idx[k[hit]] < ends[hit]
+    tto = np.full(starts.size, np.nan)
+    tto[hit] = t[on_idx[k[hit]]] - t0[hit]
+
+    outside = (np.abs(err_p) > tol) | (np.abs(err_y) > tol)
+    out_idx = np.flatnonzero(outside)
+    k = np.searchsorted(out_idx, ends) - 1
+    has = k >= 0
+    has[has] &= out_idx[k[has]] >= starts[has]
+    first_in = starts.copy()
+    first_in[has] = out_idx[k[has]] + 1
+    settle = np.full(starts.size, np.nan)
+    ok = first_in < ends
+    settle[ok] = t[first_in[ok]] - t0[ok]
+
+    # reduceat over [start, end) pairs; pad so an end == n is a valid index
+    bounds = np.empty(2 * starts.size, np.int64)
+    bounds[0::2], bounds[1::2] = starts, np.minimum(ends, n)
+    over = {}
+    for axis, err in (("pitch", err_p), ("yaw", err_y)):
+        e = np.append(err.astype(np.float64), 0.0)
+        sign = np.sign(e[starts])
+        lo = np.minimum.reduceat(e, bounds)[0::2]
+        hi = np.maximum.reduceat(e, bounds)[0::2]
+        # past the target means an error of the opposite sign
+        past = np.where(sign > 0, -lo, np.where(sign < 0, hi, 0.0))
+        over[axis] = np.maximum(past, 0.0)
+    init = np.maximum(np.abs(err_p[starts]), np.abs(err_y[starts])).astype(np.float64)
+    return {"time_to_on_target": tto, "settle_time": settle, "overshoot_pitch": over["pitch"],
+            "overshoot_yaw": over["yaw"], "initial_error": init}
+
+
+class AimAnalyzer:
+    # Pairs target commands with the firmware's response in the telemetry.
+    # A command "arrives" at the first telemetry sample where the board's
+    # spawnPitchQ/spawnYawQ switch to its quantized X/Y. Commands are matched
+    # in send order, and when the ring has host arrival times their board
+    # time is bounded through the estimated clock offset as well. Commands
+    # that quantize to the spawn already set cannot move the board and are
+    # only counted. update() finishes every command whose response window
+    # is complete (next command arrived or max_settle elapsed) and computes
+    # its metrics in one vectorized pass.
+    def __init__(self, ring: TelemetryRing, tol: float = TARGET_TOL_DEG, max_settle: float = MAX_SETTLE,
+                 match_slack: float = MATCH_SLACK):
+        self.ring = ring
+        self.tol = tol
+        self.max_settle = max_settle
+        self.match_slack = match_slack
+        self.pending = []
+        self.last_q = None
+        self.last_arrival = -np.inf
+        self.results = {f: np.empty(0) for f in RESULT_FIELDS}
+        self.sent = 0
+        self.repeats = 0
+        self.lost = 0
+
+    def on_send(self, x: float, y: float, t: float = None):
+        # x / y as they go on the wire (X -> pitch spawn, Y -> yaw spawn)
+        self.sent += 1
+        q = (quantize_deg2(x), quantize_deg2(y))
+        if q == self.last_q:
+            self.repeats += 1
+            return
+        self.last_q = q
+        self.pending.append((time.time() if t is None else t, q))
+
+    def update(self, final: bool = False) -> int:
+        # -> number of commands finished by this call
+        if not self.pending:
+            return 0
+        w = self.ring.last()
+        t = w["t"]
+        if t.size == 0:
+            if final:
+                self.lost += len(self.pending)
+                self.pending = []
+            return 0
+        sp, sy, ss = w["spawnPitchQ"].astype(np.int32), w["spawnYawQ"].astype(np.int32), w["spawnSet"]
+        # samples where the board took a new spawn
+        change = np.flatnonzero(np.r_[ss[0] != 0, (np.diff(sp) != 0) | (np.diff(sy) != 0) | (np.diff(ss) != 0)])
+        change = change[ss[change] != 0]
+        offset = self.ring.clock_offset(self.max_settle * 4)
+
+        starts, ends, done = [], [], []
+        i = 0
+        while i < len(self.pending):
+            send_t, (qx, qy) = self.pending[i]
+            lo = self.last_arrival
+            if offset is not None:
+                lo = max(lo, send_t - offset - self.match_slack)
+            start = self.find(change, t, sp, sy, lo, (qx, qy))
+            if start is None:
+                # never seen: lost once its window has passed or a later
+                # command already shows up on the board
+                expired = offset is not None and t[-1] > send_t - offset + self.max_settle
+                superseded = any(self.find(change, t, sp, sy, lo, q) is not None
+                                 for _, q in self.pending[i + 1:i + 4])
+                if final or expired or superseded:
+                    self.lost += 1
+                    self.pending.pop(i)
+                    continue
+                break
+            nxt = change[change > start]
+            end_t = t[start] + self.max_settle
+            end = int(np.searchsorted(t, end_t, side="left"))
+            if nxt.size and nxt[0] < end:
+                end = int(nxt[0])
+            elif end >= t.size and not final:
+                # response window still open
+                break
+            starts.append(start)
+            ends.append(max(end, start + 1))
+            done.append(send_t)
+            self.last_arrival = t[start]
+            self.pending.pop(i)
+
+        if not starts:
+            return 0
+        err_p = w["pitchQ"].astype(np.int32) - sp
+        err_y = w["yawQ"].astype(np.int32) - sy
+        m = segment_metrics(t, err_p, err_y, w["onTarget"].astype(bool), starts, ends, self.tol)
+        send = np.asarray(done)
+        arrival = t[np.asarray(starts)]
+        m["send_t"] = send
+        m["arrival_t"] = arrival
+        m["latency"] = arrival + offset - send if offset is not None else np.full(send.size, np.nan)
+        for f in RESULT_FIELDS:
+            self.results[f] = np.concatenate((self.results[f], m[f]))
+        return len(starts)
+
+    @staticmethod
+    def find(change, t, sp, sy, lo, q):
+        cand = change[(t[change] > lo) & (sp[change] == q[0]) & (sy[change] == q[1])]
+        return int(cand[0]) if cand.size else None
+
+    def summary(self) -> dict:
+        r = self.results
+        n = int(r["send_t"].size)
+        out = {"sent": self.sent, "repeats": self.repeats, "lost": self.lost, "pending": len(self.pending),
+               "commands": n}
+        if not n:
+            return out
+        out["settled"] = float(np.mean(~np.isnan(r["settle_time"])))
+        out["reached"] = float(np.mean(~np.isnan(r["time_to_on_target"])))
+        for f in ("latency", "time_to_on_target", "settle_time", "overshoot_pitch", "overshoot_yaw",
+                  "initial_error"):
+            v = r[f][~np.isnan(r[f])]
+            if v.size:
+                p50, p95 = np.percentile(v, (50, 95))
+                out[f] = {"mean": float(v.mean()), "p50": float(p50), "p95": float(p95), "max": float(v.max())}
+        return out
+
+
+def sends_from_session(path: str):
+    # -> [(t, x, y)] for every target the session put on the wire
+    out = []
+    dec = FrameDecoder()
+    for t, kind, data in read_session(path):
+        if kind != TX:
+            continue
+        if data[:1] == b"M":
+            parsed = parse_text_packet(data.decode("utf-8", errors="replace"))
+            if parsed is not None:
+                out.append((t, parsed[1], parsed[2]))
+        else:
+            out.extend((t, x, y) for _, x, y in dec.feed(data))
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Aim-error metrics: sent targets vs firmware telemetry.")
+    p.add_argument("--session", required=True, help="recorded session (see session.py) with the TX side")
+    p.add_argument("--telemetry", required=True, help="telemetry CSV file recorded during the session")
+    p.add_argument("--tol", type=float, default=TARGET_TOL_DEG)
+    p.add_argument("--max-settle", type=float, default=MAX_SETTLE)
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+    if np is None:
+        print("[AIM] numpy not installed. Install: pip install numpy")
+        return 2
+
+    reader = TelemetryReader(args.telemetry, TelemetryRing(1 << 20)).start()
+    reader.wait()
+    an = AimAnalyzer(reader.ring, tol=args.tol, max_settle=args.max_settle)
+    for t, x, y in sends_from_session(args.session):
+        an.on_send(x, y, t)
+    an.update(final=True)
+    res = an.summary()
+    if args.json:
+        print(json.dumps(res, indent=2))
+        return 0
+    print(f"[AIM] sent={res['sent']} commands={res['commands']} repeats={res['repeats']} lost={res['lost']}")
+    for f in ("time_to_on_target", "settle_time", "overshoot_pitch", "overshoot_yaw", "latency"):
+        if f in res:
+            s = res[f]
+            print(f"{f:18s} p50={s['p50']:.3f} p95={s['p95']:.3f} max={s['max']:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
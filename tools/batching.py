@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from defaults import CONF_DEFAULT, PHONE_CLASS
+
+
+class BatchInferenceEngine:
+    # Groups frames from any number of producers into one predict() call:
+    # a batch is flushed when batch_size frames are queued or deadline_ms has
+    # passed since the oldest queued frame arrived. Every submit() gets a
+    # Future resolving to (ts, det) so results route back to their frame.
+    def __init__(self, detector, batch_size: int = 4, deadline_ms: float = 20.0,
+                 conf: float = CONF_DEFAULT, classes=(PHONE_CLASS,), max_pending: int = 64):
+        self.detector = detector
+        self.batch_size = max(1, int(batch_size))
+        self.deadline = max(0.0, float(deadline_ms)) / 1000.0
+        self.conf = conf
+        self.classes = tuple(classes)
+        self.max_pending = max(self.batch_size, int(max_pending))
+
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.batches = 0
+        self.frames = 0
+        self.dropped = 0
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.loop, name="batch-infer", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self.stop_event.set()
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+        with self.cond:
+            while self.pending:
+                self.pending.popleft()[3].cancel()
+
+    def submit(self, frame, ts=None, source=None, callback=None) -> Future:
+        fut = Future()
+        if callback is not None:
+            fut.add_done_callback(callback)
+        item = (time.monotonic(), time.time() if ts is None else ts, source, fut, frame)
+        with self.cond:
+            if len(self.pending) >= self.max_pending:
+                # the consumer cannot keep up: drop the oldest frame
+                self.pending.popleft()[3].cancel()
+                self.dropped += 1
+            self.pending.append(item)
+            self.cond.notify()
+        return fut
+
+    def set_filters(self, conf=None, classes=None):
+        if conf is not None:
+            self.conf = float(conf)
+        if classes is not None:
+            self.classes = tuple(classes)
+
+    def take_batch(self):
+        with self.cond:
+            while not self.pending and not self.stop_event.is_set():
+                self.cond.wait(0.1)
+            if self.stop_event.is_set():
+                return []
+            flush_at = self.pending[0][0] + self.deadline
+            while len(self.pending) < self.batch_size and not self.stop_event.is_set():
+                left = flush_at - time.monotonic()
+                if left <= 0:
+                    break
+                self.cond.wait(left)
+            n = min(self.batch_size, len(self.pending))
+            return [self.pending.popleft() for _ in range(n)]
+
+    def loop(self):
+        while not self.stop_event.is_set():
+            batch = self.take_batch()
+            batch = [it for it in batch if it[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                dets = self.detector.detect_batch([it[4] for it in batch], conf=self.conf, classes=self.classes)
+            except Exception as e:
+                for it in batch:
+                    it[3].set_exception(e)
+                continue
+            self.batches += 1
+            self.frames += len(batch)
+            for it, det in zip(batch, dets):
+                it[3].set_result((it[1], det))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch": (self.frames / self.batches) if self.batches else 0.0,
+            "dropped": self.dropped,
+        }
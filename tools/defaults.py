@@ -0,0 +1,13 @@
+# Settings and helpers shared by the GUIs, the headless tools and the
+# vision modules. Nothing heavy is imported here, so a GUI can build its
+# window before cv2 / numpy / torch are loaded (see model_loader.py).
+
+PHONE_CLASS = 67  # COCO "cell phone"
+CONF_DEFAULT = 0.25
+IMGSZ_DEFAULT = 640
+BACKENDS = ("auto", "ultralytics", "onnxruntime", "cv2")
+PORT_DEFAULT = 3333  # SERVER_PORT in src/main.cpp
+
+
+def log(s: str):
+    print(s, flush=True)
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+from detectors import Detector
+from perf import PERF
+
+HASH_SIZE = 32
+# thermometer code of neighbour differences, gray levels
+LEVELS = (3, 6, 12, 24, 48, 96)
+MAX_DISTANCE = 6
+CAPACITY = 64
+TTL = 2.0
+
+
+def frame_hash(frame, size: int = HASH_SIZE, levels=LEVELS) -> int:
+    # Difference hash: shrink to (size + 1) x size gray and compare
+    # horizontal neighbours. Plain dHash keeps one sign bit per pair, which
+    # flips at random on flat walls where neighbours are equal and does not
+    # change while a target moves inside one cell. Here every pair sets one
+    # bit per level its difference exceeds, each sign separately, so the
+    # Hamming distance grows with how much the picture changed; area
+    # averaging leaves sensor noise far below the lowest level. A 120 px
+    # target moving 20 px in a 1080p frame changes 20-60 bits, sensor
+    # noise a few.
+    # INTER_AREA straight from 1080p costs ~9 ms; a linear pass to 8x the
+    # hash size first brings that under 1 ms.
+    w, h = (size + 1) * 8, size * 8
+    if frame.shape[1] > w:
+        frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_LINEAR)
+    small = cv2.resize(frame, (size + 1, size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    d = small[:, :-1].astype(np.int16) - small[:, 1:]
+    bits = np.concatenate([d > m for m in levels] + [d < -m for m in levels])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+if hasattr(int, "bit_count"):
+    def hamming(a: int, b: int) -> int:
+        return (a ^ b).bit_count()
+else:
+    def hamming(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+
+class DetectionCache:
+    # LRU of detection results keyed by frame_hash(). lookup() returns the
+    # result of the closest cached frame within max_distance bits, so a
+    # static scene (fixed mount, Single Detect pressed twice) skips
+    # inference. Entries expire after ttl seconds so a target that appears
+    # in an otherwise unchanged scene is found again; the least recently
+    # hit entry goes when capacity is reached. Frames of different sizes,
+    # or looked up with a different tag (the conf/classes filters), never
+    # match. Thread-safe; hits and misses also go to PERF.
+    def __init__(self, capacity: int = CAPACITY, max_distance: int = MAX_DISTANCE, ttl: float = TTL,
+                 hash_size: int = HASH_SIZE):
+        self.capacity = max(1, int(capacity))
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.hash_size = hash_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def key(self, frame, tag=None):
+        h, w = frame.shape[:2]
+        return (w, h, tag), frame_hash(frame, self.hash_size)
+
+    def lookup(self, frame, now: float = None, tag=None):
+        # -> (hit, det, key); pass key to put() after a miss
+        now = time.monotonic() if now is None else now
+        key = self.key(frame, tag)
+        group, fh = key
+        best, best_d = None, self.max_distance + 1
+        with self.lock:
+            for k, (det, t) in list(self.entries.items()):
+                if now - t > self.ttl:
+                    del self.entries[k]
+                    self.expired += 1
+                    continue
+                if k[0] != group:
+                    continue
+                d = hamming(k[1], fh)
+                if d < best_d:
+                    best, best_d = k, d
+            if best is None:
+                self.misses += 1
+                PERF.count("cache.misses")
+                return False, None, key
+            self.entries.move_to_end(best)
+            self.hits += 1
+            PERF.count("cache.hits")
+            return True, self.entries[best][0], key
+
+    def put(self, key, det, now: float = None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self.entries[key] = (det, now)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            n = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / n if n else 0.0,
+                    "entries": len(self.entries), "evictions": self.evictions, "expired": self.expired}
+
+
+class CachedDetector(Detector):
+    # Any detector behind a DetectionCache: only the misses of a batch go
+    # to the wrapped detector, in one detect_batch() call.
+    def __init__(self, detector, cache: DetectionCache):
+        super().__init__(detector.conf, detector.classes)
+        self.detector = detector
+        self.cache = cache
+        self.name = f"{detector.name}+cache"
+
+    def detect_batch(self, frames, conf=None, classes=None):
+        conf, classes = self.filters(conf, classes)
+        out = [None] * len(frames)
+        missed = []
+        for i, frame in enumerate(frames):
+            hit, det, key = self.cache.lookup(frame, tag=(conf, classes))
+            if hit:
+                out[i] = det
+            else:
+                missed.append((i, key))
+        if missed:
+            dets = self.detector.detect_batch([frames[i] for i, _ in missed], conf, classes)
+            now = time.monotonic()
+            for (i, key), det in zip(missed, dets):
+                out[i] = det
+                self.cache.put(key, det, now)
+        return out
+
+    def close(self):
+        self.detector.close()
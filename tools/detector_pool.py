@@ -0,0 +1,282 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+from defaults import CONF_DEFAULT, PHONE_CLASS
+from detectors import Detector, load_detector
+
+READY_TIMEOUT = 120.0
+READY_POLL = 0.2
+
+
+def _worker(wid, model_path, backend, factory, kw, threads, tasks, results):
+    # Runs in a spawned process: limit the math libraries to this worker's
+    # share of the cores before anything imports them.
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        if factory is not None:
+            det = factory(**kw)
+        else:
+            det = load_detector(model_path, backend=backend, threads=threads, **kw)
+        try:
+            import cv2
+            cv2.setNumThreads(threads)
+        except Exception:
+            pass
+        if det.name == "ultralytics":
+            import torch
+            torch.set_num_threads(threads)
+    except Exception as e:
+        results.put(("error", wid, f"{type(e).__name__}: {e}"))
+        return
+    results.put(("ready", wid, det.name))
+
+    shm = None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            fid, name, slot, offset, shape, dtype, conf, classes = task
+            if shm is None or shm.name != name:
+                # the parent re-allocated the ring for bigger frames
+                if shm is not None:
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=name)
+            frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            try:
+                res, err = det.detect(frame, conf=conf, classes=classes), None
+            except Exception as e:
+                res, err = None, f"{type(e).__name__}: {e}"
+            del frame
+            results.put(("det", fid, slot, res, err))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if shm is not None:
+            shm.close()
+
+
+class ProcessPoolDetector(Detector):
+    # Runs a detector in `workers` processes, each with its own copy of the
+    # model and a fixed share of the cores. Frames go through a ring of
+    # shared-memory slots (one memcpy in, nothing pickled but the slot
+    # number); every frame gets an increasing id and results are handed out
+    # in id order, so callers see them exactly as submitted even though
+    # workers finish out of order. submit() blocks while every slot is in
+    # flight, which is the pool's backpressure.
+    name = "pool"
+
+    def __init__(self, model_path: str = None, backend: str = "auto", workers: int = None,
+                 threads: int = None, slots: int = None, factory=None,
+                 conf: float = CONF_DEFAULT, classes=(PHONE_CLASS,), **kw):
+        super().__init__(conf, classes)
+        if np is None:
+            raise RuntimeError("process pool needs numpy")
+        cpus = os.cpu_count() or 1
+        self.workers = max(1, int(workers or cpus))
+        self.threads = max(1, int(threads or cpus // self.workers))
+        self.slots = max(self.workers, int(slots or 2 * self.workers))
+
+        ctx = mp.get_context("spawn")
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        kw.update(conf=conf, classes=tuple(classes))
+        self.procs = [ctx.Process(target=_worker, name=f"detect-{i}", daemon=True,
+                                  args=(i, model_path, backend, factory, kw, self.threads, self.tasks, self.results))
+                      for i in range(self.workers)]
+
+        self.shm = None
+        self.slot_bytes = 0
+        self.free = []
+        self.cond = threading.Condition()
+        self.futures = {}
+        self.done = {}
+        self.next_id = 0
+        self.next_out = 0
+        self.closed = False
+        self.error = None
+        self.collector = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.reordered = 0
+
+        for p in self.procs:
+            p.start()
+        try:
+            self.wait_ready()
+        except Exception:
+            self.close()
+            raise
+        self.collector = threading.Thread(target=self.collect, name="detect-pool", daemon=True)
+        self.collector.start()
+
+    def wait_ready(self):
+        # Poll so a worker that dies while starting (import error, bad
+        # factory, OOM kill) fails now instead of after READY_TIMEOUT.
+        waiting = set(range(self.workers))
+        deadline = time.monotonic() + READY_TIMEOUT
+        while waiting:
+            try:
+                kind, wid, info = self.results.get(timeout=READY_POLL)
+            except queue.Empty:
+                dead = [i for i in sorted(waiting) if not self.procs[i].is_alive()]
+                if dead:
+                    try:
+                        # an error it reported just before exiting says more
+                        kind, wid, info = self.results.get(timeout=READY_POLL)
+                    except queue.Empty:
+                        i = dead[0]
+                        raise RuntimeError(f"worker {i} exited while starting (exit code {self.procs[i].exitcode})")
+                elif time.monotonic() > deadline:
+                    raise RuntimeError(f"detector workers did not start in {READY_TIMEOUT:.0f} s: "
+                                       f"{', '.join(map(str, sorted(waiting)))}")
+                else:
+                    continue
+            if kind == "error":
+                raise RuntimeError(f"worker {wid}: {info}")
+            waiting.discard(wid)
+            self.name = f"pool[{self.workers}x{info}]"
+
+    # ----- shared memory ring
+    def ensure_ring(self, nbytes: int):
+        # called with self.cond held
+        if self.shm is not None and nbytes <= self.slot_bytes:
+            return
+        # frames got bigger: wait for every slot to come back, then swap rings
+        while len(self.free) < self.slots and self.shm is not None and not self.closed:
+            self.cond.wait(0.1)
+        self.release_ring()
+        self.slot_bytes = nbytes
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slots * nbytes)
+        self.free = list(range(self.slots))
+
+    def release_ring(self):
+        if self.shm is not None:
+            self.shm.close()
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+            self.shm = None
+
+    def submit(self, frame, conf=None, classes=None) -> Future:
+        # -> Future resolving to the detection tuple or None
+        conf, classes = self.filters(conf, classes)
+        frame = np.ascontiguousarray(frame)
+        fut = Future()
+        with self.cond:
+            if self.error is not None or self.closed:
+                raise RuntimeError(self.error or "detector pool is closed")
+            self.ensure_ring(frame.nbytes)
+            while not self.free and not self.closed and self.error is None:
+                self.cond.wait(0.1)
+            if self.error is not None or self.closed:
+                raise RuntimeError(self.error or "detector pool is closed")
+            slot = self.free.pop()
+            fid = self.next_id
+            self.next_id += 1
+            self.futures[fid] = fut
+            self.submitted += 1
+            offset = slot * self.slot_bytes
+            view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf, offset=offset)
+            view[...] = frame
+            del view
+            self.tasks.put((fid, self.shm.name, slot, offset, frame.shape, frame.dtype.str, conf, classes))
+        return fut
+
+    def detect_batch(self, frames, conf=None, classes=None):
+        futures = [self.submit(f, conf, classes) for f in frames]
+        return [f.result() for f in futures]
+
+    # ----- results
+    def collect(self):
+        while True:
+            try:
+                msg = self.results.get(timeout=0.2)
+            except queue.Empty:
+                if self.closed:
+                    return
+                dead = [p.name for p in self.procs if not p.is_alive()]
+                if dead:
+                    self.fail(f"detector worker exited: {', '.join(dead)}")
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            if msg[0] != "det":
+                continue
+            _, fid, slot, det, err = msg
+            with self.cond:
+                self.free.append(slot)
+                if fid != self.next_out:
+                    self.reordered += 1
+                self.done[fid] = (det, err)
+                out = []
+                while self.next_out in self.done:
+                    out.append((self.futures.pop(self.next_out), self.done.pop(self.next_out)))
+                    self.next_out += 1
+                self.cond.notify_all()
+            # resolve outside the lock: callbacks may submit again
+            for fut, (det, err) in out:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                if err is None:
+                    self.completed += 1
+                    fut.set_result(det)
+                else:
+                    self.failed += 1
+                    fut.set_exception(RuntimeError(err))
+
+    def fail(self, reason: str):
+        with self.cond:
+            self.error = reason
+            pending = list(self.futures.values())
+            self.futures.clear()
+            self.done.clear()
+            self.cond.notify_all()
+        for fut in pending:
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(RuntimeError(reason))
+
+    def stats(self) -> dict:
+        with self.cond:
+            in_flight = len(self.futures)
+        return {"workers": self.workers, "threads": self.threads, "submitted": self.submitted,
+                "completed": self.completed, "failed": self.failed, "in_flight": in_flight,
+                "reordered": self.reordered}
+
+    def close(self, timeout: float = 2.0):
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        for _ in self.procs:
+            self.tasks.put(None)
+        for p in self.procs:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+                p.join(timeout)
+        if self.collector is not None:
+            self.collector.join(timeout)
+        self.fail("detector pool is closed")
+        with self.cond:
+            self.release_ring()
+        for q in (self.tasks, self.results):
+            q.close()
+            q.join_thread()
@@ -0,0 +1,250 @@
+import os
+import threading
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+from defaults import BACKENDS, CONF_DEFAULT, IMGSZ_DEFAULT, PHONE_CLASS
+from preprocess import Downscale, Letterbox, remap_boxes, scale_box
+from vision import detect_batch, detect_phone
+
+IOU_DEFAULT = 0.45
+
+
+class Detector:
+    # Common surface for all backends. A detection is the same
+    # (x1, y1, x2, y2, conf) tuple the GUI has always used.
+    name = "base"
+
+    def __init__(self, conf: float = CONF_DEFAULT, classes=(PHONE_CLASS,)):
+        self.conf = conf
+        self.classes = tuple(classes)
+
+    def detect(self, frame, conf=None, classes=None):
+        return self.detect_batch([frame], conf, classes)[0]
+
+    def detect_batch(self, frames, conf=None, classes=None):
+        raise NotImplementedError
+
+    def filters(self, conf, classes):
+        return (self.conf if conf is None else conf,
+                self.classes if classes is None else tuple(classes))
+
+    def close(self):
+        pass
+
+
+class UltralyticsDetector(Detector):
+    # Frames are shrunk to imgsz here, once, into reused buffers; predict()
+    # then letterboxes the small image and boxes are scaled back.
+    name = "ultralytics"
+
+    def __init__(self, model_path: str, conf: float = CONF_DEFAULT, classes=(PHONE_CLASS,),
+                 imgsz: int = IMGSZ_DEFAULT):
+        super().__init__(conf, classes)
+        # imported here so hosts using the ONNX backend never load torch
+        try:
+            from ultralytics import YOLO
+        except Exception:
+            raise RuntimeError("ultralytics not installed. Install: pip install ultralytics")
+        self.model = YOLO(model_path)
+        self.imgsz = int(imgsz)
+        self.shrinks = []
+        self.lock = threading.Lock()
+
+    def detect_batch(self, frames, conf=None, classes=None):
+        conf, classes = self.filters(conf, classes)
+        with self.lock:
+            # one buffer per batch position: predict() sees them all at once
+            while len(self.shrinks) < len(frames):
+                self.shrinks.append(Downscale(self.imgsz))
+            shrunk = [shrink(f) for shrink, f in zip(self.shrinks, frames)]
+            dets = detect_batch(self.model, [img for img, _ in shrunk], conf=conf, classes=classes,
+                                imgsz=self.imgsz)
+        return [scale_box(det, scale) for det, (_, scale) in zip(dets, shrunk)]
+
+    def detect(self, frame, conf=None, classes=None):
+        conf, classes = self.filters(conf, classes)
+        with self.lock:
+            if not self.shrinks:
+                self.shrinks.append(Downscale(self.imgsz))
+            img, scale = self.shrinks[0](frame)
+            det = detect_phone(self.model, img, conf=conf, classes=classes, imgsz=self.imgsz)
+        return scale_box(det, scale)
+
+
+def nms(boxes, scores, iou: float = IOU_DEFAULT):
+    # Greedy NMS over xyxy boxes; IoU against the remaining set is vectorized.
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = np.argsort(-scores)
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(x1[i], x1[rest])
+        yy1 = np.maximum(y1[i], y1[rest])
+        xx2 = np.minimum(x2[i], x2[rest])
+        yy2 = np.minimum(y2[i], y2[rest])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        ious = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[ious <= iou]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def decode_yolo(pred, conf: float, classes, iou: float = IOU_DEFAULT):
+    # pred: one image of a YOLOv8/11 export, (4 + nc, N) or (N, 4 + nc),
+    # boxes as cx, cy, w, h in letterbox pixels.
+    # -> array (k, 6) of x1, y1, x2, y2, conf, cls
+    if pred.shape[0] < pred.shape[1]:
+        pred = pred.T
+    scores_all = pred[:, 4:]
+    if classes:
+        cls_idx = np.asarray(classes, dtype=np.int64)
+        cls_idx = cls_idx[cls_idx < scores_all.shape[1]]
+        sub = scores_all[:, cls_idx]
+        best = sub.argmax(axis=1)
+        cls_ids = cls_idx[best]
+        scores = sub[np.arange(len(sub)), best]
+    else:
+        cls_ids = scores_all.argmax(axis=1)
+        scores = scores_all[np.arange(len(scores_all)), cls_ids]
+    mask = scores >= conf
+    if not mask.any():
+        return np.zeros((0, 6), dtype=np.float32)
+    xywh = pred[mask, :4]
+    scores, cls_ids = scores[mask], cls_ids[mask]
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+    # class-aware NMS in one pass: shift each class into its own region
+    offsets = cls_ids[:, None].astype(boxes.dtype) * (float(boxes.max()) + 1.0)
+    keep = nms(boxes + offsets, scores, iou)
+    return np.concatenate([boxes[keep], scores[keep, None], cls_ids[keep, None].astype(boxes.dtype)], axis=1)
+
+
+class OnnxDetector(Detector):
+    # CPU backend for an exported YOLO .onnx model: onnxruntime when it is
+    # installed, otherwise cv2.dnn. Letterbox (preprocess.py), decode and
+    # NMS are NumPy.
+    name = "onnx"
+
+    def __init__(self, model_path: str, conf: float = CONF_DEFAULT, classes=(PHONE_CLASS,),
+                 imgsz: int = IMGSZ_DEFAULT, iou: float = IOU_DEFAULT, engine: str = "auto", threads: int = 0):
+        super().__init__(conf, classes)
+        if np is None or cv2 is None:
+            raise RuntimeError("ONNX backend needs numpy and opencv-python")
+        self.imgsz = int(imgsz)
+        self.iou = iou
+        self.session = None
+        self.net = None
+        self.fixed_batch = None
+
+        ort = None
+        if engine in ("auto", "onnxruntime"):
+            try:
+                import onnxruntime as ort
+            except Exception:
+                if engine == "onnxruntime":
+                    raise RuntimeError("onnxruntime not installed. Install: pip install onnxruntime")
+        if ort is not None:
+            opts = ort.SessionOptions()
+            if threads:
+                # several detectors share the host (see detector_pool.py)
+                opts.intra_op_num_threads = int(threads)
+                opts.inter_op_num_threads = 1
+            self.session = ort.InferenceSession(model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+            inp = self.session.get_inputs()[0]
+            self.input_name = inp.name
+            if isinstance(inp.shape[0], int):
+                self.fixed_batch = inp.shape[0]
+            if isinstance(inp.shape[2], int):
+                self.imgsz = inp.shape[2]
+            self.name = "onnxruntime"
+        else:
+            self.net = cv2.dnn.readNetFromONNX(model_path)
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            self.fixed_batch = 1
+            self.name = "cv2.dnn"
+        # letterbox target and input blob are allocated once and reused
+        self.boxer = Letterbox(self.imgsz)
+        self.blob = None
+        self.lock = threading.Lock()
+
+    def forward(self, blob):
+        if self.session is not None:
+            return self.session.run(None, {self.input_name: blob})[0]
+        self.net.setInput(blob)
+        return self.net.forward()
+
+    def detect_all(self, frames, conf=None, classes=None):
+        conf, classes = self.filters(conf, classes)
+        n = len(frames)
+        if not n:
+            return []
+        step = self.fixed_batch or n
+        # static-batch exports: the tail chunk is padded with zero images
+        rows = -(-n // step) * step
+        with self.lock:
+            if self.blob is None or len(self.blob) < rows:
+                self.blob = np.zeros((rows, 3, self.imgsz, self.imgsz), np.float32)
+            blob = self.blob[:rows]
+            blob[n:] = 0
+            geometry = []
+            for i, f in enumerate(frames):
+                img, scale, pad = self.boxer(f)
+                # BGR HWC uint8 -> RGB CHW float32 in one pass into the blob
+                np.multiply(img[..., ::-1].transpose(2, 0, 1), np.float32(1 / 255.0), out=blob[i],
+                            dtype=np.float32)
+                geometry.append((scale, pad))
+            preds = []
+            for i in range(0, n, step):
+                preds.extend(self.forward(blob[i:i + step])[:min(step, n - i)])
+
+        out = []
+        for pred, (scale, pad), f in zip(preds, geometry, frames):
+            det = decode_yolo(np.asarray(pred), conf, classes, self.iou)
+            h, w = f.shape[:2]
+            out.append(remap_boxes(det, scale, pad, w, h))
+        return out
+
+    def detect_batch(self, frames, conf=None, classes=None):
+        if not frames:
+            return []
+        res = []
+        for det in self.detect_all(frames, conf, classes):
+            if not len(det):
+                res.append(None)
+                continue
+            x1, y1, x2, y2, c = det[int(det[:, 4].argmax()), :5]
+            res.append((int(x1), int(y1), int(x2), int(y2), float(c)))
+        return res
+
+
+def load_detector(model_path: str, backend: str = "auto", workers: int = 0, **kw):
+    # "auto" picks the ONNX engine for .onnx files and ultralytics otherwise.
+    # workers > 1 runs that backend in a process pool (detector_pool.py).
+    if workers and workers > 1:
+        from detector_pool import ProcessPoolDetector
+        return ProcessPoolDetector(model_path, backend=backend, workers=workers, **kw)
+    if backend == "auto":
+        backend = "onnx" if os.path.splitext(model_path)[1].lower() == ".onnx" else "ultralytics"
+    if backend == "ultralytics":
+        kw.pop("iou", None)
+        kw.pop("threads", None)
+        return UltralyticsDetector(model_path, **kw)
+    engine = {"onnx": "auto", "onnxruntime": "onnxruntime", "cv2": "cv2"}.get(backend)
+    if engine is None:
+        raise ValueError(f"unknown detector backend: {backend}")
+    return OnnxDetector(model_path, engine=engine, **kw)
@@ -0,0 +1,151 @@
+import base64
+import threading
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    from PIL import Image, ImageTk
+except Exception:
+    Image = None
+    ImageTk = None
+
+from perf import PERF
+from vision import draw_detection
+
+N_BUFFERS = 3
+
+
+class DisplayEngine:
+    # Letterboxed video display without per-frame allocations.
+    #   prepare()  render thread: resize into a preallocated BGR buffer,
+    #              annotate it, convert into a preallocated RGB buffer
+    #   blit()     Tk thread: paste the RGB buffer into one long-lived
+    #              PhotoImage shown by one long-lived canvas item
+    # A small ring of buffers lets the render thread fill the next frame
+    # while Tk is still pasting the previous one.
+    def __init__(self, n_buffers: int = N_BUFFERS):
+        self.n_buffers = max(2, int(n_buffers))
+        self.layout_key = None
+        self.size = (1, 1)
+        self.offset = (0, 0)
+        self.scale = 1.0
+        self.small = []
+        self.rgb = []
+        self.locks = [threading.Lock() for _ in range(self.n_buffers)]
+        self.slot = 0
+
+        # Tk side
+        self.photo = None
+        self.photo_size = None
+        self.item = None
+        self.item_photo = None
+        self.item_offset = None
+        self.ppm_ok = True
+
+    def reset(self):
+        # forget Tk objects, e.g. after the canvas was cleared
+        if ImageTk is not None:
+            # a named raw photo outlives the canvas items and is reused
+            self.photo = None
+        self.photo_size = None
+        self.item = None
+        self.item_photo = None
+        self.item_offset = None
+
+    def relayout(self, fw, fh, canvas_w, canvas_h):
+        # only when the frame or canvas size changes
+        self.scale = min(canvas_w / fw, canvas_h / fh)
+        new_w = max(1, int(fw * self.scale))
+        new_h = max(1, int(fh * self.scale))
+        self.size = (new_w, new_h)
+        self.offset = ((canvas_w - new_w) // 2, (canvas_h - new_h) // 2)
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            self.small = [np.empty((new_h, new_w, 3), np.uint8) for _ in range(self.n_buffers)]
+            self.rgb = [np.empty((new_h, new_w, 3), np.uint8) for _ in range(self.n_buffers)]
+        finally:
+            for lock in self.locks:
+                lock.release()
+        self.layout_key = (fw, fh, canvas_w, canvas_h)
+
+    def prepare(self, frame, canvas_w, canvas_h, det=None):
+        # -> (slot, (w, h), (x0, y0), (fw, fh)) to hand to blit()
+        fh, fw = frame.shape[:2]
+        if self.layout_key != (fw, fh, canvas_w, canvas_h):
+            self.relayout(fw, fh, canvas_w, canvas_h)
+        slot = self.slot
+        self.slot = (slot + 1) % self.n_buffers
+        with self.locks[slot]:
+            t = PERF.now()
+            small = self.small[slot]
+            if (fw, fh) == self.size:
+                small[...] = frame
+            else:
+                cv2.resize(frame, self.size, dst=small, interpolation=cv2.INTER_AREA if self.scale < 1 else cv2.INTER_LINEAR)
+            t = PERF.since("display.resize", t)
+            if det is not None:
+                # annotate the small image: no full-resolution copy needed
+                s = self.scale
+                x1, y1, x2, y2, conf = det[:5]
+                draw_detection(small, (int(x1 * s), int(y1 * s), int(x2 * s), int(y2 * s), conf))
+                t = PERF.since("display.draw", t)
+            cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self.rgb[slot])
+            PERF.since("display.cvtcolor", t)
+        return (slot, self.size, self.offset, (fw, fh))
+
+    def blit(self, canvas, item):
+        slot, (w, h), (x0, y0), _ = item
+        if slot >= len(self.rgb) or self.rgb[slot].shape[:2] != (h, w):
+            # stale item from before a relayout
+            return
+        t = PERF.now()
+        with self.locks[slot]:
+            buf = self.rgb[slot]
+            if ImageTk is not None:
+                if self.photo_size != (w, h):
+                    self.photo = ImageTk.PhotoImage("RGB", (w, h))
+                    self.photo_size = (w, h)
+                self.photo.paste(Image.frombuffer("RGB", (w, h), buf, "raw", "RGB", 0, 1))
+            else:
+                if self.photo is None:
+                    # one named Tk image for the engine's lifetime: Tk images
+                    # live until deleted, and -data resizes it to each frame
+                    self.photo = canvas.tk.call("image", "create", "photo")
+                self.photo_size = (w, h)
+                self.put_raw(canvas, buf, w, h)
+        PERF.since("tk.photo", t)
+
+        if self.item is None:
+            self.item = canvas.create_image(x0, y0, image=self.photo, anchor="nw")
+            self.item_offset = (x0, y0)
+        else:
+            if self.item_offset != (x0, y0):
+                canvas.coords(self.item, x0, y0)
+                self.item_offset = (x0, y0)
+            if self.item_photo is not self.photo:
+                canvas.itemconfigure(self.item, image=self.photo)
+        self.item_photo = self.photo
+        # keep a reference so Tk does not drop the image
+        canvas.image = self.photo
+
+    def put_raw(self, canvas, buf, w, h):
+        # No PIL: Tk 8.6 reads binary PPM directly (no PNG encode, no base64).
+        # Older Tk only takes base64 text, so fall back to that once it fails.
+        if self.ppm_ok:
+            try:
+                ppm = b"P6 %d %d 255\n" % (w, h) + buf.tobytes()
+                canvas.tk.call(self.photo, "configure", "-data", ppm, "-format", "ppm")
+                return
+            except Exception:
+                self.ppm_ok = False
+        png_bytes = cv2.imencode(".png", buf[..., ::-1])[1].tobytes()
+        canvas.tk.call(self.photo, "configure", "-data", base64.b64encode(png_bytes), "-format", "png")
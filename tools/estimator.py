@@ -0,0 +1,116 @@
+import math
+
+MEAS_STD = 4.0
+ACCEL_STD = 500.0
+VEL_STD = 500.0
+LOST_AFTER = 0.6
+MAX_LEAD = 0.25
+GATE_SIGMA = 8.0
+
+
+class Axis:
+    # Constant-velocity Kalman filter for one image axis: state (p, v),
+    # white-noise acceleration. The axes of a box center are independent,
+    # so two of these stand in for a 4x4 filter at a fraction of the cost.
+    def __init__(self, p: float, meas_var: float, vel_var: float = VEL_STD * VEL_STD):
+        self.p = p
+        self.v = 0.0
+        # position as measured, velocity unknown
+        self.pp, self.pv, self.vv = meas_var, 0.0, vel_var
+
+    def advance(self, dt: float, q: float):
+        if dt <= 0:
+            return
+        self.p += self.v * dt
+        dt2 = dt * dt
+        self.pp += dt * (2 * self.pv + dt * self.vv) + q * dt2 * dt2 / 4
+        self.pv += dt * self.vv + q * dt2 * dt / 2
+        self.vv += q * dt2
+
+    def innovation(self, z: float, r: float):
+        return z - self.p, self.pp + r
+
+    def correct(self, z: float, r: float):
+        y, s = self.innovation(z, r)
+        kp, kv = self.pp / s, self.pv / s
+        self.p += kp * y
+        self.v += kv * y
+        self.pp, self.pv, self.vv = (1 - kp) * self.pp, (1 - kp) * self.pv, self.vv - kv * self.pv
+
+    def at(self, dt: float) -> float:
+        return self.p + self.v * dt
+
+
+class TargetEstimator:
+    # Smooths the detected box center of one target and predicts where it
+    # is at send time. update() takes the center with the capture time of
+    # its frame; predict(t) extrapolates to t (capped at max_lead past the
+    # last measurement), which compensates capture -> detect -> send
+    # latency. A center too far from the prediction (gate_sigma) starts a
+    # new track instead of dragging the old one, and predict() returns None
+    # once nothing was measured for lost_after seconds.
+    def __init__(self, meas_std: float = MEAS_STD, accel_std: float = ACCEL_STD,
+                 lost_after: float = LOST_AFTER, max_lead: float = MAX_LEAD, gate_sigma: float = GATE_SIGMA):
+        self.r = meas_std * meas_std
+        self.q = accel_std * accel_std
+        self.lost_after = lost_after
+        self.max_lead = max_lead
+        self.gate = gate_sigma * gate_sigma
+        self.x = self.y = None
+        self.t = None
+        self.updates = 0
+        self.restarts = 0
+
+    def reset(self):
+        self.x = self.y = None
+        self.t = None
+
+    @property
+    def active(self) -> bool:
+        return self.t is not None
+
+    def update(self, cx: float, cy: float, t: float):
+        # -> smoothed (x, y) at t
+        if self.t is not None and t < self.t:
+            # results can complete out of order: an older frame adds nothing
+            return self.x.p, self.y.p
+        if self.t is None or t - self.t > self.lost_after:
+            self.start(cx, cy, t)
+            return cx, cy
+        dt = t - self.t
+        self.x.advance(dt, self.q)
+        self.y.advance(dt, self.q)
+        yx, sx = self.x.innovation(cx, self.r)
+        yy, sy = self.y.innovation(cy, self.r)
+        if yx * yx / sx + yy * yy / sy > 2 * self.gate:
+            # a jump no plausible motion explains: new target
+            self.restarts += 1
+            self.start(cx, cy, t)
+            return cx, cy
+        self.x.correct(cx, self.r)
+        self.y.correct(cy, self.r)
+        self.t = t
+        self.updates += 1
+        return self.x.p, self.y.p
+
+    def start(self, cx: float, cy: float, t: float):
+        self.x = Axis(cx, self.r)
+        self.y = Axis(cy, self.r)
+        self.t = t
+        self.updates += 1
+
+    def predict(self, t: float):
+        # -> (x, y) expected at t, or None when the target is lost
+        if self.t is None:
+            return None
+        if t - self.t > self.lost_after:
+            self.reset()
+            return None
+        dt = min(max(0.0, t - self.t), self.max_lead)
+        return self.x.at(dt), self.y.at(dt)
+
+    def velocity(self):
+        return (self.x.v, self.y.v) if self.t is not None else (0.0, 0.0)
+
+    def speed(self) -> float:
+        return math.hypot(*self.velocity())
@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import random
+import sys
+import threading
+import time
+
+from defaults import PORT_DEFAULT
+from protocol import BIN_ACK_PREFIX, FRAME_LEN, MAGIC, NEGOTIATE, NEGOTIATE_OK, TARGET_TOL_DEG, ProtocolError, \
+    decode_frame, parse_text_packet, quantize_deg2
+
+# Mirrors src/main.cpp
+HELLO = "HELLO from UNO R4 WiFi"
+MAX_LINE = 256
+CSV_HEADER = "t_ms,roll,pitch,yaw,rollQ,pitchQ,yawQ,spawnSet,spawnPitchQ,spawnYawQ,onTarget,msg,ip"
+
+
+class FirmwareEmulator:
+    # Network side of the UNO R4 sketch on asyncio: HELLO banner, one client
+    # at a time, text/binary packet parsing with ACK / ERR replies, and the
+    # serial CSV telemetry. The IMU is replaced by a first-order "gimbal"
+    # that slews pitch/yaw toward the last target so onTarget behaves.
+    # Fault injection: reply latency + jitter, packet drop probability and
+    # forced disconnects.
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, drop: float = 0.0,
+                 disconnect_every: float = 0.0, disconnect_prob: float = 0.0, loop_hz: float = 0.0,
+                 slew_dps: float = 90.0, telemetry=None, telemetry_hz: float = 100.0,
+                 ip: str = "192.168.4.1", seed=None, multi: bool = False):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.drop = drop
+        self.disconnect_every = disconnect_every
+        self.disconnect_prob = disconnect_prob
+        self.loop_period = 1.0 / loop_hz if loop_hz > 0 else 0.0
+        self.slew = slew_dps
+        self.telemetry = telemetry
+        self.telemetry_hz = telemetry_hz
+        self.ip = ip
+        self.rnd = random.Random(seed)
+        self.multi = multi
+
+        self.t0 = time.monotonic()
+        self.roll = self.pitch = self.yaw = 0.0
+        self.spawn_set = False
+        self.spawn_pitch_q = 0
+        self.spawn_yaw_q = 0
+        self.last_msg = "-"
+        self.telemetry_clients = []
+
+        self.stats = {"clients": 0, "packets": 0, "acks": 0, "errors": 0, "dropped": 0,
+                      "disconnects": 0, "bin_frames": 0}
+
+        self.loop = None
+        self.thread = None
+        self.server = None
+        self.tel_server = None
+        self.client_lock = None
+        self.port = None
+        self.tasks = []
+        self.clients = set()
+
+    # ----- firmware state
+    def apply_target(self, msg: str, x: float, y: float):
+        self.spawn_pitch_q = quantize_deg2(x)
+        self.spawn_yaw_q = quantize_deg2(y)
+        self.spawn_set = True
+        self.last_msg = msg[:30] or "-"
+
+    def step_imu(self, dt: float):
+        if not self.spawn_set:
+            return
+        max_step = self.slew * dt
+        for name, target in (("pitch", self.spawn_pitch_q), ("yaw", self.spawn_yaw_q)):
+            cur = getattr(self, name)
+            d = max(-max_step, min(max_step, target - cur))
+            setattr(self, name, cur + d)
+
+    def csv_line(self) -> str:
+        r_q, p_q, y_q = quantize_deg2(self.roll), quantize_deg2(self.pitch), quantize_deg2(self.yaw)
+        pitch_rel = p_q - (self.spawn_pitch_q if self.spawn_set else 0)
+        yaw_rel = y_q - (self.spawn_yaw_q if self.spawn_set else 0)
+        on_target = abs(pitch_rel) <= TARGET_TOL_DEG and abs(yaw_rel) <= TARGET_TOL_DEG
+        t_ms = int((time.monotonic() - self.t0) * 1000)
+        return (f"{t_ms},{self.roll:.2f},{self.pitch:.2f},{self.yaw:.2f},{r_q},{p_q},{y_q},"
+                f"{1 if self.spawn_set else 0},{self.spawn_pitch_q if self.spawn_set else 0},"
+                f"{self.spawn_yaw_q if self.spawn_set else 0},{1 if on_target else 0},{self.last_msg},{self.ip}")
+
+    def handle_line(self, line: str, client: dict):
+        # -> reply line or None, same decisions as loop() in main.cpp
+        if line == NEGOTIATE:
+            client["bin"] = True
+            return NEGOTIATE_OK
+        parsed = parse_text_packet(line)
+        if parsed is None:
+            self.stats["errors"] += 1
+            return f"ERR;BAD_PACKET;{line}"
+        msg, x, y = parsed
+        self.apply_target(msg, x, y)
+        self.stats["acks"] += 1
+        return f"ACK;MSG:{msg};X:{x:.2f};Y:{y:.2f}"
+
+    def handle_frame(self, frame: bytes):
+        try:
+            seq, x, y = decode_frame(frame)
+        except ProtocolError:
+            self.stats["errors"] += 1
+            return "ERR;BAD_FRAME"
+        self.stats["bin_frames"] += 1
+        self.apply_target("PHONE", x, y)
+        self.stats["acks"] += 1
+        return f"{BIN_ACK_PREFIX}{seq}"
+
+    # ----- network
+    async def replier(self, writer, q):
+        # keeps replies in order while each one waits out its injected latency
+        while True:
+            due, data = await q.get()
+            if data is None:
+                break
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            writer.write(data)
+            await writer.drain()
+
+    def reply(self, q, line: str):
+        delay = self.latency + (self.rnd.uniform(0, self.jitter) if self.jitter else 0.0)
+        q.put_nowait((time.monotonic() + delay, (line + "\r\n").encode("utf-8")))
+
+    async def handle_client(self, reader, writer):
+        if not self.multi:
+            # the sketch serves one client; later ones wait in the backlog
+            await self.client_lock.acquire()
+        self.stats["clients"] += 1
+        self.clients.add(asyncio.current_task())
+        client = {"bin": False, "killed": False}
+        q = asyncio.Queue()
+        rep = asyncio.ensure_future(self.replier(writer, q))
+        self.reply(q, HELLO)
+        timer = asyncio.ensure_future(self.disconnect_timer(writer, client)) if self.disconnect_every > 0 else None
+        buf = bytearray()
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data or client["killed"]:
+                    break
+                buf += data
+                while buf:
+                    if client["bin"] and buf[0] == MAGIC:
+                        if len(buf) < FRAME_LEN:
+                            break
+                        frame, buf = bytes(buf[:FRAME_LEN]), buf[FRAME_LEN:]
+                        line = None
+                    else:
+                        i = buf.find(b"\n", 0, MAX_LINE + 1)
+                        if i >= 0:
+                            raw, buf = bytes(buf[:i]), buf[i + 1:]
+                        elif len(buf) > MAX_LINE:
+                            # readLine() returns after 257 chars; the next
+                            # byte starts the next line
+                            raw, buf = bytes(buf[:MAX_LINE + 1]), buf[MAX_LINE + 1:]
+                        else:
+                            break
+                        line = raw.replace(b"\r", b"").decode("utf-8", errors="replace").strip()
+                        if not line:
+                            continue
+                    self.stats["packets"] += 1
+                    if self.drop and self.rnd.random() < self.drop:
+                        self.stats["dropped"] += 1
+                        continue
+                    out = self.handle_line(line, client) if line is not None else self.handle_frame(frame)
+                    if out:
+                        self.reply(q, out)
+                    if self.loop_period:
+                        await asyncio.sleep(self.loop_period)
+                    if client["killed"] or (self.disconnect_prob and self.rnd.random() < self.disconnect_prob):
+                        raise ConnectionResetError("injected disconnect")
+        except ConnectionResetError:
+            client["killed"] = True
+        except (asyncio.CancelledError, Exception):
+            # CancelledError: emulator shutting down
+            pass
+        finally:
+            killed = client["killed"]
+            if killed:
+                self.stats["disconnects"] += 1
+            if timer is not None:
+                timer.cancel()
+            self.clients.discard(asyncio.current_task())
+            q.put_nowait((0.0, None))
+            if killed:
+                # a reset loses whatever was still in flight
+                rep.cancel()
+            try:
+                await rep
+            except BaseException:
+                pass
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+            if not self.multi:
+                self.client_lock.release()
+
+    async def disconnect_timer(self, writer, client):
+        # --disconnect-every runs on the clock, so a silent client is
+        # dropped too
+        await asyncio.sleep(self.disconnect_every)
+        client["killed"] = True
+        writer.transport.abort()
+
+    async def telemetry_client(self, reader, writer):
+        self.telemetry_clients.append(writer)
+        try:
+            writer.write((CSV_HEADER + "\r\n").encode())
+            await reader.read()
+        except Exception:
+            pass
+        finally:
+            self.telemetry_clients.remove(writer)
+            writer.close()
+
+    async def telemetry_loop(self):
+        period = 1.0 / max(1.0, self.telemetry_hz)
+        last = time.monotonic()
+        if self.telemetry is not None:
+            self.telemetry.write(CSV_HEADER + "\n")
+        while True:
+            await asyncio.sleep(period)
+            now = time.monotonic()
+            self.step_imu(now - last)
+            last = now
+            line = self.csv_line()
+            if self.telemetry is not None:
+                self.telemetry.write(line + "\n")
+            for w in list(self.telemetry_clients):
+                try:
+                    w.write((line + "\r\n").encode())
+                except Exception:
+                    pass
+
+    async def start(self, host: str = "0.0.0.0", port: int = PORT_DEFAULT, telemetry_port: int = 0):
+        self.client_lock = asyncio.Lock()
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        if telemetry_port:
+            self.tel_server = await asyncio.start_server(self.telemetry_client, host, telemetry_port)
+        self.tasks.append(asyncio.ensure_future(self.telemetry_loop()))
+        return self.port
+
+    async def stop_async(self):
+        pending = self.tasks + list(self.clients)
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for srv in (self.server, self.tel_server):
+            if srv is not None:
+                srv.close()
+
+    # ----- thread helpers for benches / scripts
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0, telemetry_port: int = 0):
+        # -> (host, port) once listening
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.start(host, port, telemetry_port))
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name="fw-emulator", daemon=True)
+        self.thread.start()
+        ready.wait(5.0)
+        return host, self.port
+
+    def stop(self):
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop_async(), self.loop).result(2.0)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(2.0)
+
+
+async def serve(args):
+    tel = sys.stdout if args.telemetry == "-" else (open(args.telemetry, "w") if args.telemetry else None)
+    emu = FirmwareEmulator(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, drop=args.drop,
+                           disconnect_every=args.disconnect_every, disconnect_prob=args.disconnect_prob,
+                           loop_hz=args.loop_hz, slew_dps=args.slew, telemetry=tel,
+                           telemetry_hz=args.telemetry_hz, seed=args.seed, multi=args.multi)
+    port = await emu.start(args.host, args.port, args.telemetry_port)
+    print(f"[EMU] listening on {args.host}:{port}", file=sys.stderr, flush=True)
+    try:
+        while True:
+            await asyncio.sleep(args.stats or 3600)
+            if args.stats:
+                print(f"[EMU] {emu.stats}", file=sys.stderr, flush=True)
+    finally:
+        await emu.stop_async()
+        print(f"[EMU] {emu.stats}", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="UNO R4 WiFi firmware emulator (TCP side of src/main.cpp).")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=PORT_DEFAULT)
+    p.add_argument("--latency-ms", type=float, default=0.0, help="added to every reply")
+    p.add_argument("--jitter-ms", type=float, default=0.0, help="uniform extra reply delay 0..J")
+    p.add_argument("--drop", type=float, default=0.0, help="probability a packet is ignored")
+    p.add_argument("--disconnect-every", type=float, default=0.0, metavar="S", help="drop the client every S seconds")
+    p.add_argument("--disconnect-prob", type=float, default=0.0, help="per-packet disconnect probability")
+    p.add_argument("--loop-hz", type=float, default=0.0, help="packets handled per second (0 = unlimited)")
+    p.add_argument("--slew", type=float, default=90.0, help="simulated gimbal speed, deg/s")
+    p.add_argument("--telemetry", help="write CSV telemetry to a file, '-' for stdout")
+    p.add_argument("--telemetry-port", type=int, default=0, help="also serve CSV telemetry over TCP")
+    p.add_argument("--telemetry-hz", type=float, default=100.0)
+    p.add_argument("--multi", action="store_true", help="serve several clients at once")
+    p.add_argument("--seed", type=int)
+    p.add_argument("--stats", type=float, default=0.0, metavar="S", help="print counters every S seconds")
+    args = p.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
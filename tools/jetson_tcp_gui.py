@@ -1,13 +1,14 @@
-import socket
-import threading
 import subprocess
 import queue
-import time
 import tkinter as tk
 from tkinter import messagebox
 from tkinter.scrolledtext import ScrolledText
 
-PORT_DEFAULT = 3333
+from defaults import PORT_DEFAULT
+from log_view import TextLog
+from session import SessionRecorder, session_path
+from tcp_link import CONNECTED, DISCONNECTED, FAILED, RECONNECTING, AsyncLink
+
 
 class App:
     def __init__(self, root: tk.Tk):
@@ -16,10 +17,11 @@ class App:
         self.root.geometry("900x650")
 
         # networking state
-        self.sock = None
-        self.rx_thread = None
-        self.stop_event = threading.Event()
         self.q = queue.Queue()
+        self.link = AsyncLink(on_line=self.on_link_line, on_state=self.on_link_state)
+        self.auto_reconnect = tk.BooleanVar(value=True)
+        self.record_session = tk.BooleanVar(value=False)
+        self.recorder = None
 
         # ===== UI =====
         self.build_ui()
@@ -64,6 +66,13 @@ class App:
         self.bt_disconnect = tk.Button(ard, text="Disconnect", command=self.disconnect_arduino, state="disabled")
         self.bt_disconnect.grid(row=1, column=3, pady=6, sticky="e")
 
+        self.cb_reconnect = tk.Checkbutton(ard, text="Auto-reconnect", variable=self.auto_reconnect)
+        self.cb_reconnect.grid(row=2, column=1, sticky="w")
+
+        self.cb_record = tk.Checkbutton(ard, text="Record session", variable=self.record_session,
+                                        command=self.toggle_recording)
+        self.cb_record.grid(row=2, column=2, columnspan=2, sticky="w")
+
         # ---- Send group
         send = tk.LabelFrame(self.root, text="Send", padx=10, pady=10)
         send.pack(fill="x", padx=10, pady=8)
@@ -94,15 +103,14 @@ class App:
 
         self.log_view = ScrolledText(logf, height=20, state="disabled")
         self.log_view.pack(fill="both", expand=True)
+        self.text_log = TextLog(self.log_view)
 
     def only_digits(self, new_value: str) -> bool:
         return new_value == "" or new_value.isdigit()
 
     def log(self, s: str):
-        self.log_view.configure(state="normal")
-        self.log_view.insert("end", s + "\n")
-        self.log_view.see("end")
-        self.log_view.configure(state="disabled")
+        # written to the widget by the next process_queue tick
+        self.text_log.append(s)
 
     def connect_wifi_nmcli(self):
         ssid = self.ed_ssid.get().strip()
@@ -144,48 +152,40 @@ class App:
             return
 
         port = int(port_s)
-        self.disconnect_arduino()
 
         self.log(f"[NET] Connecting to {ip}:{port} ...")
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5.0)
-            s.connect((ip, port))
-            s.settimeout(None)
-            self.sock = s
-        except Exception as e:
-            self.sock = None
-            self.log(f"[NET] Connect error: {e}")
-            messagebox.showwarning("TCP", f"Connect failed: {e}")
-            return
-
-        self.stop_event.clear()
-        self.rx_thread = threading.Thread(target=self.rx_loop, daemon=True)
-        self.rx_thread.start()
-
+        # non-blocking: the result comes back through on_link_state
         self.bt_connect.configure(state="disabled")
         self.bt_disconnect.configure(state="normal")
-        self.log("[NET] Connected.")
+        self.link.reconnect = bool(self.auto_reconnect.get())
+        self.link.connect(ip, port)
 
     def disconnect_arduino(self):
-        self.stop_event.set()
-
-        if self.sock:
-            try:
-                self.sock.shutdown(socket.SHUT_RDWR)
-            except Exception:
-                pass
-            try:
-                self.sock.close()
-            except Exception:
-                pass
-            self.sock = None
-
+        self.link.disconnect()
         self.bt_connect.configure(state="normal")
         self.bt_disconnect.configure(state="disabled")
 
+    def toggle_recording(self):
+        if self.record_session.get():
+            try:
+                self.recorder = SessionRecorder(session_path()).start()
+            except OSError as e:
+                self.record_session.set(False)
+                messagebox.showerror("Record", str(e))
+                return
+            self.recorder.attach(self.link)
+            self.log(f"[APP] Recording session to {self.recorder.path}")
+        else:
+            self.stop_recording()
+
+    def stop_recording(self):
+        rec, self.recorder = self.recorder, None
+        if rec is not None:
+            rec.close()
+            self.log(f"[APP] Session saved: {rec.path} ({rec.recorded} events, {rec.dropped} dropped)")
+
     def send_packet(self):
-        if not self.sock:
+        if not self.link.active:
             messagebox.showwarning("Send", "Not connected to Arduino.")
             return
 
@@ -194,42 +194,49 @@ class App:
         y = self.ed_y.get().strip() or "0"
 
         line = f"MSG:{msg};X:{x};Y:{y}\n"
-        try:
-            self.sock.sendall(line.encode("utf-8"))
+        if self.link.send(line):
             self.log(f"[TX] {line.strip()}")
-        except Exception as e:
-            self.log(f"[NET] Send error: {e}")
-            self.disconnect_arduino()
-
-    def rx_loop(self):
-        buf = b""
-        try:
-            while not self.stop_event.is_set() and self.sock:
-                data = self.sock.recv(4096)
-                if not data:
-                    break
-                buf += data
-                while b"\n" in buf:
-                    line, buf = buf.split(b"\n", 1)
-                    line = line.replace(b"\r", b"").decode("utf-8", errors="replace").strip()
-                    if line:
-                        self.q.put(f"[RX] {line}")
-        except Exception as e:
-            self.q.put(f"[NET] RX error: {e}")
-        finally:
-            self.q.put("[NET] Disconnected.")
-            self.q.put("__DISCONNECT__")
+        else:
+            self.log("[NET] Send queue full, packet dropped.")
+
+    # link callbacks run on the asyncio thread: hand them to Tk via the queue
+    def on_link_line(self, line: str):
+        self.q.put(f"[RX] {line}")
+
+    def on_link_state(self, state: str, info: str):
+        self.q.put(("__LINK__", state, info))
+
+    def handle_link_state(self, state: str, info: str):
+        if state == CONNECTED:
+            self.log("[NET] Connected.")
+            self.bt_connect.configure(state="disabled")
+            self.bt_disconnect.configure(state="normal")
+        elif state == FAILED:
+            self.log(f"[NET] Connect error: {info}")
+            self.bt_connect.configure(state="normal")
+            self.bt_disconnect.configure(state="disabled")
+            messagebox.showwarning("TCP", f"Connect failed: {info}")
+        elif state == RECONNECTING:
+            self.log(f"[NET] Reconnecting: {info}")
+        elif state == DISCONNECTED:
+            if info:
+                self.log(f"[NET] {info}")
+            self.log("[NET] Disconnected.")
+            if not self.link.active:
+                self.bt_connect.configure(state="normal")
+                self.bt_disconnect.configure(state="disabled")
 
     def process_queue(self):
         try:
             while True:
                 item = self.q.get_nowait()
-                if item == "__DISCONNECT__":
-                    self.disconnect_arduino()
+                if isinstance(item, tuple) and item[0] == "__LINK__":
+                    self.handle_link_state(item[1], item[2])
                     continue
                 self.log(item)
         except queue.Empty:
             pass
+        self.text_log.flush()
         self.root.after(50, self.process_queue)
 
 
@@ -238,7 +245,8 @@ def main():
     app = App(root)
 
     def on_close():
-        app.disconnect_arduino()
+        app.stop_recording()
+        app.link.close()
         root.destroy()
 
     root.protocol("WM_DELETE_WINDOW", on_close)
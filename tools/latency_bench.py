@@ -0,0 +1,374 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+from defaults import BACKENDS, CONF_DEFAULT, IMGSZ_DEFAULT, PHONE_CLASS, PORT_DEFAULT
+from detectors import Detector, load_detector
+from estimator import LOST_AFTER, TargetEstimator
+from fw_emulator import FirmwareEmulator
+from projection import Projector
+from protocol import BIN_ACK_PREFIX, BINARY, TargetChannel, parse_text_packet, text_packet
+from send_rate import MAX_HZ, MIN_HZ, SendScheduler
+from tcp_link import AsyncLink
+from vision import box_center
+
+STAGES = ("capture", "detect", "angles", "send", "ack_rtt", "end_to_end")
+
+
+class SyntheticSource:
+    # read()/release() like cv2.VideoCapture: a bright square moving on a dark
+    # background, so runs are repeatable without a camera or a video file.
+    def __init__(self, width: int = 1280, height: int = 720, count: int = 600, box: int = 80):
+        self.w, self.h, self.count, self.box = width, height, count, box
+        self.pos = 0
+
+    def isOpened(self) -> bool:
+        return True
+
+    def read(self):
+        if self.count and self.pos >= self.count:
+            return False, None
+        frame = np.full((self.h, self.w, 3), 30, np.uint8)
+        t = self.pos / 30.0
+        cx = int((0.5 + 0.4 * np.sin(t)) * self.w)
+        cy = int((0.5 + 0.3 * np.cos(0.7 * t)) * self.h)
+        b = self.box // 2
+        frame[max(0, cy - b):cy + b, max(0, cx - b):cx + b] = 255
+        self.pos += 1
+        return True, frame
+
+    def release(self):
+        self.count = self.pos
+
+
+class SyntheticDetector(Detector):
+    # Finds the bright square of SyntheticSource; --detect-ms adds a fixed
+    # cost to stand in for a model of known speed.
+    name = "synthetic"
+
+    def __init__(self, cost_ms: float = 0.0, conf: float = CONF_DEFAULT, classes=(PHONE_CLASS,)):
+        super().__init__(conf, classes)
+        self.cost = cost_ms / 1000.0
+
+    def detect_batch(self, frames, conf=None, classes=None):
+        out = []
+        for frame in frames:
+            if self.cost:
+                time.sleep(self.cost)
+            mask = frame[:, :, 1] > 200
+            rows = np.flatnonzero(mask.any(axis=1))
+            cols = np.flatnonzero(mask.any(axis=0))
+            if rows.size == 0:
+                out.append(None)
+                continue
+            out.append((int(cols[0]), int(rows[0]), int(cols[-1]), int(rows[-1]), 0.99))
+        return out
+
+
+class AckMatcher:
+    # Pairs firmware replies with the send they answer. Binary acks carry the
+    # frame seq; text ACKs echo the parsed X/Y, matched oldest first.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_seq = {}
+        self.by_xy = defaultdict(deque)
+        self.rtt = []
+        self.e2e = []
+        self.acks = 0
+        self.errors = 0
+
+    def sent(self, key, t_send: float, t_capture: float):
+        with self.lock:
+            if isinstance(key, int):
+                self.by_seq[key] = (t_send, t_capture)
+            else:
+                self.by_xy[key].append((t_send, t_capture))
+
+    def on_line(self, line: str):
+        now = time.perf_counter()
+        entry = None
+        with self.lock:
+            if line.startswith(BIN_ACK_PREFIX):
+                try:
+                    entry = self.by_seq.pop(int(line[len(BIN_ACK_PREFIX):]), None)
+                except ValueError:
+                    entry = None
+            elif line.startswith("ACK;"):
+                parsed = parse_text_packet(line[4:])
+                if parsed is not None:
+                    q = self.by_xy.get((round(parsed[1], 2), round(parsed[2], 2)))
+                    entry = q.popleft() if q else None
+            elif line.startswith("ERR"):
+                self.errors += 1
+            if entry is not None:
+                self.acks += 1
+                self.rtt.append(now - entry[0])
+                self.e2e.append(now - entry[1])
+
+
+def percentiles(samples) -> dict:
+    if not samples:
+        return {"n": 0}
+    a = np.asarray(samples, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(a, (50, 95, 99))
+    return {"n": int(a.size), "mean_ms": float(a.mean()), "p50_ms": float(p50), "p95_ms": float(p95),
+            "p99_ms": float(p99), "max_ms": float(a.max())}
+
+
+def process_usage() -> dict:
+    cpu = os.times()
+    out = {"cpu_user_s": cpu.user, "cpu_system_s": cpu.system}
+    if psutil is not None:
+        out["rss_mb"] = psutil.Process().memory_info().rss / 2 ** 20
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # KiB on Linux, bytes on macOS
+        out["peak_rss_mb"] = peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+    return out
+
+
+def open_source(args):
+    # files decode ahead on sources.FrameSource's thread, as in the tracker
+    if args.video or args.images:
+        from sources import FrameSource
+        return FrameSource(args.video or args.images)
+    return SyntheticSource(args.width, args.height, args.frames)
+
+
+def run(args) -> dict:
+    if args.model:
+        detector = load_detector(args.model, backend=args.backend, conf=args.conf, imgsz=args.imgsz)
+    else:
+        detector = SyntheticDetector(args.detect_ms, conf=args.conf)
+
+    projector = Projector.from_file(args.calib, args.hfov, args.vfov) if args.calib \
+        else Projector(hfov=args.hfov, vfov=args.vfov)
+
+    emulator = None
+    host, port = args.host, args.port
+    if not host:
+        emulator = FirmwareEmulator(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=1)
+        host, port = emulator.start_in_thread()
+
+    matcher = AckMatcher()
+    link = AsyncLink(on_line=matcher.on_line, reconnect=False)
+    channel = TargetChannel(link, prefer_binary=args.binary)
+    if not link.connect(host, port).result():
+        raise RuntimeError(f"cannot connect to {host}:{port}")
+    if args.binary:
+        # wait for PROTO:BIN1;OK before timing anything
+        deadline = time.perf_counter() + 2.0
+        while channel.mode != BINARY and time.perf_counter() < deadline:
+            time.sleep(0.01)
+
+    framing = channel.mode
+    src = open_source(args)
+    stages = defaultdict(list)
+    interval = 1.0 / args.rate if args.rate > 0 else 0.0
+    frame_period = 1.0 / args.fps if args.fps > 0 else 0.0
+    scheduler = SendScheduler(min_hz=args.send_min_hz, max_hz=args.send_max_hz)
+    estimator = TargetEstimator(lost_after=max(LOST_AFTER, 3 * interval))
+    last_det = -1e9
+    last_center = None
+    capture_ts = 0.0
+    frames = detections = sends = 0
+    cpu0 = process_usage()
+
+    t_start = time.perf_counter()
+    next_frame = t_start
+    try:
+        while args.max_frames <= 0 or frames < args.max_frames:
+            if frame_period:
+                # stand-in for the camera's own frame clock
+                delay = next_frame - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_frame += frame_period
+            t0 = time.perf_counter()
+            ok, frame = src.read()
+            t1 = time.perf_counter()
+            if not ok:
+                break
+            frames += 1
+            stages["capture"].append(t1 - t0)
+
+            # as in the GUI: detection at Detect Hz, each result feeds the
+            # estimator; sends go through the scheduler (see send_center)
+            if t1 - last_det >= interval:
+                last_det = t1
+                det = detector.detect(frame)
+                t2 = time.perf_counter()
+                stages["detect"].append(t2 - t1)
+                if det is not None:
+                    detections += 1
+                    last_center = box_center(det)
+                    estimator.update(*last_center, t0)
+                    capture_ts = t0
+
+            now = time.perf_counter()
+            if last_center is not None:
+                rtt = channel.rtt
+                predicted = estimator.predict(now + (rtt / 2 if rtt else 0.0))
+                if predicted is None:
+                    last_center = None
+                    continue
+                cx, cy = last_center if args.no_predict else predicted
+                fh, fw = frame.shape[:2]
+                angle_x, angle_y = projector.angles(cx, cy, fw, fh)
+                t3 = time.perf_counter()
+                stages["angles"].append(t3 - now)
+                # swap axes to match Processing expectations
+                if not scheduler.due(angle_y, angle_x, now, rtt=rtt, backlog=link.pending()):
+                    continue
+                if channel.mode == BINARY:
+                    key = (channel.seq + 1) & 0xFFFF
+                else:
+                    parsed = parse_text_packet(text_packet(angle_y, angle_x))
+                    key = (round(parsed[1], 2), round(parsed[2], 2))
+                matcher.sent(key, t3, capture_ts)
+                if channel.send_target(angle_y, angle_x):
+                    scheduler.sent(angle_y, angle_x, now)
+                    sends += 1
+                stages["send"].append(time.perf_counter() - t3)
+    finally:
+        elapsed = max(1e-6, time.perf_counter() - t_start)
+        # give the last acks time to arrive
+        deadline = time.perf_counter() + 1.0
+        while matcher.acks < sends and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        cpu1 = process_usage()
+        src.release()
+        link.close()
+        if emulator is not None:
+            emulator.stop()
+
+    stages["ack_rtt"] = matcher.rtt
+    stages["end_to_end"] = matcher.e2e
+    return {
+        "config": {
+            "source": "video" if args.video else "images" if args.images else "synthetic",
+            "detector": detector.name, "model": args.model, "rate_hz": args.rate, "fps": args.fps,
+            "send_min_hz": args.send_min_hz, "send_max_hz": args.send_max_hz, "predict": not args.no_predict,
+            "framing": framing, "server": "emulator" if emulator else f"{host}:{port}",
+            "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+        },
+        "host": {"platform": platform.platform(), "python": platform.python_version(),
+                 "cpus": os.cpu_count()},
+        "frames": frames, "detections": detections, "sends": sends, "acks": matcher.acks,
+        "errors": matcher.errors, "elapsed_s": elapsed,
+        "capture_fps": frames / elapsed,
+        "send_hz": sends / elapsed,
+        "scheduler": scheduler.stats(),
+        "stages": {name: percentiles(stages[name]) for name in STAGES},
+        "process": {
+            "cpu_s": (cpu1["cpu_user_s"] - cpu0["cpu_user_s"]) + (cpu1["cpu_system_s"] - cpu0["cpu_system_s"]),
+            "cpu_pct": 100.0 * ((cpu1["cpu_user_s"] - cpu0["cpu_user_s"])
+                                + (cpu1["cpu_system_s"] - cpu0["cpu_system_s"])) / elapsed,
+            **{k: v for k, v in cpu1.items() if "rss" in k},
+        },
+    }
+
+
+def print_report(res: dict):
+    c = res["config"]
+    print(f"[BENCH] {c['source']} / {c['detector']} / {c['framing']} -> {c['server']}")
+    print(f"frames={res['frames']} detections={res['detections']} sends={res['sends']} acks={res['acks']} "
+          f"errors={res['errors']} elapsed={res['elapsed_s']:.2f}s")
+    sch = res["scheduler"]
+    print(f"capture {res['capture_fps']:.1f} fps, detect at {c['rate_hz']} Hz, send {res['send_hz']:.2f} Hz "
+          f"(skipped {sch['suppressed']} unchanged, {sch['throttled']} throttled)")
+    print(f"{'stage':12s} {'n':>6s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}  (ms)")
+    for name in STAGES:
+        s = res["stages"][name]
+        if not s["n"]:
+            print(f"{name:12s} {0:6d}")
+            continue
+        print(f"{name:12s} {s['n']:6d} {s['p50_ms']:9.3f} {s['p95_ms']:9.3f} {s['p99_ms']:9.3f} {s['max_ms']:9.3f}")
+    p = res["process"]
+    rss = p.get("rss_mb", p.get("peak_rss_mb"))
+    print(f"cpu {p['cpu_pct']:.0f}%" + (f", rss {rss:.0f} MiB" if rss is not None else ""))
+
+
+def build_parser():
+    p = argparse.ArgumentParser(
+        description="End-to-end latency benchmark: capture -> detect -> angles -> TCP send -> firmware ACK.")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--video", help="video file (default: synthetic frames)")
+    g.add_argument("--images", help="directory of images, read in sorted order")
+    p.add_argument("--frames", type=int, default=600, help="synthetic frame count")
+    p.add_argument("--width", type=int, default=1280)
+    p.add_argument("--height", type=int, default=720)
+    p.add_argument("--fps", type=float, default=30.0, help="pace capture at this rate (0 = as fast as possible)")
+    p.add_argument("--max-frames", type=int, default=0)
+    p.add_argument("--model", help=".pt / .onnx model; without it a synthetic detector is used")
+    p.add_argument("--backend", choices=BACKENDS, default="auto")
+    p.add_argument("--imgsz", type=int, default=IMGSZ_DEFAULT)
+    p.add_argument("--conf", type=float, default=CONF_DEFAULT)
+    p.add_argument("--detect-ms", type=float, default=0.0, help="fixed cost of the synthetic detector")
+    p.add_argument("--rate", type=float, default=5.0, help="Detect Hz as set in the GUI")
+    p.add_argument("--send-min-hz", type=float, default=MIN_HZ, help="send rate for a still target")
+    p.add_argument("--send-max-hz", type=float, default=MAX_HZ, help="send rate for fast motion")
+    p.add_argument("--no-predict", action="store_true", help="send raw box centers, not filtered/predicted ones")
+    p.add_argument("--hfov", type=float, default=90.0)
+    p.add_argument("--vfov", type=float, default=30.0)
+    p.add_argument("--calib", help="camera calibration file (see projection.py)")
+    p.add_argument("--host", help="board / emulator address (default: in-process emulator)")
+    p.add_argument("--port", type=int, default=PORT_DEFAULT)
+    p.add_argument("--binary", action="store_true", help="negotiate binary target frames")
+    p.add_argument("--latency-ms", type=float, default=0.0, help="in-process emulator reply latency")
+    p.add_argument("--jitter-ms", type=float, default=0.0, help="in-process emulator reply jitter")
+    p.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if np is None:
+        print("[BENCH] numpy not installed. Install: pip install numpy")
+        return 2
+    if (args.video or args.images) and cv2 is None:
+        print("[BENCH] opencv-python not installed. Install: pip install opencv-python-headless")
+        return 2
+    try:
+        res = run(args)
+    except Exception as e:
+        print(f"[BENCH] {e}")
+        return 1
+    if args.json == "-":
+        print(json.dumps(res, indent=2))
+        return 0
+    print_report(res)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(res, f, indent=2)
+        print(f"[BENCH] wrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+from collections import deque
+
+LOG_MAX_LINES = 2000
+
+
+class TextLog:
+    # Ring-buffered log on top of a Tk Text/ScrolledText widget.
+    # append() only queues the line (cheap, any number per tick); flush(),
+    # called once per process_queue tick, does a single insert of all queued
+    # lines, trims the oldest lines in one delete once the widget holds more
+    # than max_lines (+ slack, so trimming is not a per-tick cost) and
+    # scrolls to the end only if the user was already at the bottom.
+    def __init__(self, widget, max_lines: int = LOG_MAX_LINES, slack: int = None):
+        self.widget = widget
+        self.max_lines = max(1, int(max_lines))
+        self.slack = max(1, self.max_lines // 10) if slack is None else max(0, int(slack))
+        self.pending = deque(maxlen=self.max_lines)
+        self.lines = 0
+        self.dropped = 0
+
+    def append(self, line: str):
+        if len(self.pending) == self.pending.maxlen:
+            # would be trimmed right after the insert anyway
+            self.dropped += 1
+        self.pending.append(line)
+
+    def clear(self):
+        self.pending.clear()
+        self.edit(lambda w: w.delete("1.0", "end"))
+        self.lines = 0
+
+    def at_bottom(self) -> bool:
+        try:
+            return self.widget.yview()[1] >= 0.999
+        except Exception:
+            return True
+
+    def edit(self, fn):
+        # read-only logs keep state="disabled" except while we write
+        disabled = str(self.widget.cget("state")) == "disabled"
+        if disabled:
+            self.widget.configure(state="normal")
+        try:
+            fn(self.widget)
+        finally:
+            if disabled:
+                self.widget.configure(state="disabled")
+
+    def flush(self) -> int:
+        # -> number of lines written
+        if not self.pending:
+            return 0
+        text = "\n".join(self.pending) + "\n"
+        # widget lines, not entries: netsh/nmcli output arrives as one entry
+        n = text.count("\n")
+        self.pending.clear()
+        follow = self.at_bottom()
+        excess = self.lines + n - self.max_lines
+
+        def write(w):
+            w.insert("end", text)
+            if excess > self.slack:
+                # "end" has an implicit trailing newline: line k+1 starts
+                # right after the k oldest lines
+                w.delete("1.0", f"{excess + 1}.0")
+
+        self.edit(write)
+        self.lines += n
+        if excess > self.slack:
+            self.dropped += excess
+            self.lines -= excess
+        if follow:
+            self.widget.see("end")
+        return n
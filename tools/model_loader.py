@@ -0,0 +1,94 @@
+import importlib
+import threading
+import time
+
+# what the GUI needs for camera and model work, cheapest first
+PRELOAD = ("numpy", "cv2", "PIL.ImageTk", "projection", "vision", "display", "sources", "detectors", "det_cache",
+           "roi_tracker")
+WARMUP_SIZE = (640, 480)
+
+
+def preload(modules=PRELOAD, on_progress=None) -> threading.Thread:
+    # Import modules on a daemon thread after the window is up, so the
+    # first Start Camera / Load Model finds them in sys.modules.
+    # on_progress(name, seconds, error) is called from that thread.
+    def run():
+        for name in modules:
+            t0 = time.perf_counter()
+            error = None
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                error = e
+            if on_progress is not None:
+                on_progress(name, time.perf_counter() - t0, error)
+
+    thread = threading.Thread(target=run, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+class ModelLoader:
+    # Loads a detector off the Tk thread: import the backend, build the
+    # model, then run one inference on a black frame so the first live
+    # frame does not pay for lazy initialisation. Callbacks run on the
+    # loader thread:
+    #   on_progress(stage, info)    "import", "load", "warmup"
+    #   on_done(detector, error, seconds)
+    # A load started while another is running supersedes it; the older
+    # result is closed and never reported.
+    def __init__(self, on_progress=None, on_done=None):
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def busy(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def load(self, model_path: str, backend: str = "auto", workers: int = 0, warmup_size=WARMUP_SIZE, **kw):
+        with self.lock:
+            self.generation += 1
+            gen = self.generation
+        self.thread = threading.Thread(target=self.run, name="model-loader", daemon=True,
+                                       args=(gen, model_path, backend, workers, warmup_size, kw))
+        self.thread.start()
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+
+    def current(self, gen: int) -> bool:
+        with self.lock:
+            return gen == self.generation
+
+    def report(self, gen: int, stage: str, info: str = ""):
+        if self.on_progress is not None and self.current(gen):
+            self.on_progress(stage, info)
+
+    def run(self, gen, model_path, backend, workers, warmup_size, kw):
+        t0 = time.perf_counter()
+        detector = None
+        try:
+            self.report(gen, "import", "detector backends")
+            import numpy as np
+            from detectors import load_detector
+            self.report(gen, "load", model_path)
+            detector = load_detector(model_path, backend=backend, workers=workers, **kw)
+            self.report(gen, "warmup", detector.name)
+            w, h = warmup_size
+            # one frame per worker so every process of a pool is warm
+            detector.detect_batch([np.zeros((h, w, 3), np.uint8)] * max(1, workers))
+        except Exception as e:
+            if detector is not None:
+                detector.close()
+            if self.on_done is not None and self.current(gen):
+                self.on_done(None, e, time.perf_counter() - t0)
+            return
+        if not self.current(gen):
+            detector.close()
+            return
+        if self.on_done is not None:
+            self.on_done(detector, None, time.perf_counter() - t0)
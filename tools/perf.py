@@ -0,0 +1,224 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# histogram bucket upper bounds, seconds (+Inf is implicit)
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+EXPORT_EVERY = 5.0
+PROM_PREFIX = "berdanka"
+
+
+class Histogram:
+    # Fixed buckets: observe() is a bisect and a few adds, no allocation.
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.n += 1
+        self.total += v
+        self.last = v
+        if v > self.max:
+            self.max = v
+
+    def quantile(self, q: float) -> float:
+        # linear inside the bucket that holds the q-th sample
+        if not self.n:
+            return 0.0
+        rank = q * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lo = self.bounds[i - 1] if i else 0.0
+                hi = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(self.max, lo + (hi - lo) * (rank - seen) / c)
+            seen += c
+        return self.max
+
+    def summary(self) -> dict:
+        return {"n": self.n, "mean_ms": 1000 * self.total / self.n if self.n else 0.0,
+                "p50_ms": 1000 * self.quantile(0.5), "p95_ms": 1000 * self.quantile(0.95),
+                "max_ms": 1000 * self.max, "last_ms": 1000 * self.last}
+
+
+class Perf:
+    # Per-stage timing histograms and event counters for the hot path.
+    # Histograms are cumulative (for export) plus a short window that
+    # take_window() hands to the live overlay and restarts. Disabled (the
+    # default) every call returns after one attribute check, so the
+    # instrumentation can stay in place in production and be switched on
+    # at runtime.
+    #   t0 = perf.now(); ...; perf.since("infer", t0)
+    #   perf.count("frames.captured")
+    #   perf.observe("latency.detect", seconds)
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.hists = {}
+        self.window = {}
+        self.counters = {}
+        self.started = time.time()
+
+    def now(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def since(self, name: str, t0: float) -> float:
+        # -> now, so consecutive stages can chain
+        if not self.enabled or not t0:
+            return 0.0
+        t = time.perf_counter()
+        self.observe(name, t - t0)
+        return t
+
+    def observe(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        with self.lock:
+            h = self.hists.get(name)
+            if h is None:
+                h = self.hists[name] = Histogram()
+            h.observe(seconds)
+            w = self.window.get(name)
+            if w is None:
+                w = self.window[name] = Histogram()
+            w.observe(seconds)
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        with self.lock:
+            self.hists.clear()
+            self.window.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"t": time.time(), "uptime_s": time.time() - self.started,
+                    "counters": dict(self.counters),
+                    "stages": {k: h.summary() for k, h in sorted(self.hists.items())}}
+
+    def take_window(self) -> dict:
+        # -> stage summaries since the previous call
+        with self.lock:
+            window, self.window = self.window, {}
+        return {k: h.summary() for k, h in window.items()}
+
+    def prometheus(self) -> str:
+        # text exposition format, e.g. for node_exporter's textfile collector
+        lines = [f"# TYPE {PROM_PREFIX}_stage_seconds histogram"]
+        with self.lock:
+            for name, h in sorted(self.hists.items()):
+                acc = 0
+                for bound, c in zip(h.bounds, h.counts):
+                    acc += c
+                    lines.append(f'{PROM_PREFIX}_stage_seconds_bucket{{stage="{name}",le="{bound:g}"}} {acc}')
+                lines.append(f'{PROM_PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {h.n}')
+                lines.append(f'{PROM_PREFIX}_stage_seconds_sum{{stage="{name}"}} {h.total:.6f}')
+                lines.append(f'{PROM_PREFIX}_stage_seconds_count{{stage="{name}"}} {h.n}')
+            lines.append(f"# TYPE {PROM_PREFIX}_events_total counter")
+            for name, v in sorted(self.counters.items()):
+                lines.append(f'{PROM_PREFIX}_events_total{{event="{name}"}} {v}')
+        return "\n".join(lines) + "\n"
+
+
+class RateMeter:
+    # Counter rates between two update() calls; each consumer (overlay,
+    # exporter) keeps its own meter so they do not reset each other.
+    def __init__(self, perf: Perf):
+        self.perf = perf
+        self.t = time.monotonic()
+        self.prev = {}
+        self.rates = {}
+
+    def update(self) -> dict:
+        now = time.monotonic()
+        dt = now - self.t
+        if dt <= 0:
+            return self.rates
+        with self.perf.lock:
+            counters = dict(self.perf.counters)
+        self.rates = {k: (v - self.prev.get(k, 0)) / dt for k, v in counters.items()}
+        self.prev = counters
+        self.t = now
+        return self.rates
+
+
+class PerfExporter:
+    # Writes snapshots every `every` seconds: *.prom gets the Prometheus
+    # text (replaced atomically), anything else gets one JSON line per
+    # snapshot appended, with counter rates since the previous one.
+    def __init__(self, perf: Perf, path: str, every: float = EXPORT_EVERY):
+        self.perf = perf
+        self.path = path
+        self.every = max(0.1, float(every))
+        self.prom = path.endswith(".prom")
+        self.meter = RateMeter(perf)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def start(self):
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, name="perf-export", daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stop_event.wait(self.every):
+            self.write()
+
+    def write(self):
+        try:
+            if self.prom:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w") as f:
+                    f.write(self.perf.prometheus())
+                os.replace(tmp, self.path)
+            else:
+                snap = self.perf.snapshot()
+                snap["rates"] = self.meter.update()
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(snap) + "\n")
+        except OSError as e:
+            self.error = e
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(2.0)
+            self.thread = None
+        self.write()
+
+
+def overlay_text(stages: dict, rates: dict) -> str:
+    # Two short lines for the video overlay: where the frames go and where
+    # the time goes.
+    def hz(name):
+        return f"{rates.get(name, 0.0):4.1f}"
+
+    def ms(name):
+        s = stages.get(name)
+        return f"{s['p50_ms']:.0f}/{s['p95_ms']:.0f}" if s and s["n"] else "-"
+
+    return (f"cam {hz('frames.captured')}  det {hz('frames.inferred')}  disp {hz('frames.displayed')}  "
+            f"send {hz('sends')} Hz\n"
+            f"read {ms('capture.read')}  infer {ms('infer')}  render {ms('render')}  tk {ms('tk.blit')}  "
+            f"lat {ms('latency.frame')} ms p50/p95")
+
+
+# process-wide instance the pipeline, display and GUIs report into
+PERF = Perf()
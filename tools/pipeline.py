@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import deque
+
+from perf import PERF
+
+
+class LatestQueue:
+    # Bounded queue where the newest item wins: put() never blocks and
+    # silently drops the oldest entry once maxsize is reached.
+    def __init__(self, maxsize: int = 1):
+        self.items = deque(maxlen=max(1, int(maxsize)))
+        self.cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.items:
+                self.cond.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def get_nowait(self):
+        with self.cond:
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def get_latest(self):
+        # Drain everything and keep only the newest entry (used by the Tk thread).
+        with self.cond:
+            if not self.items:
+                return None
+            item = self.items.pop()
+            self.dropped += len(self.items)
+            self.items.clear()
+            return item
+
+    def clear(self):
+        with self.cond:
+            self.items.clear()
+
+
+# Capture -> inference -> render, each stage on its own thread:
+#   read_frame() -> (ok, frame)                      capture thread
+#   infer(seq, ts, frame) -> result or None          inference worker
+#   render(seq, ts, frame, result) -> display item   render thread
+# Stages are joined by LatestQueue so a slow stage only ever sees the newest
+# frame; the GUI polls display_q / result_q and never blocks.
+class StagedPipeline:
+    def __init__(self, read_frame, infer, render, on_error=None, queue_size: int = 1):
+        self.read_frame = read_frame
+        self.infer = infer
+        self.render = render
+        self.on_error = on_error
+
+        self.infer_q = LatestQueue(queue_size)
+        self.render_q = LatestQueue(queue_size)
+        self.result_q = LatestQueue(queue_size)
+        self.display_q = LatestQueue(queue_size)
+
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.seq = 0
+        self.last_result = None
+        self.result_lock = threading.Lock()
+
+    def start(self):
+        self.stop_event.clear()
+        self.threads = [
+            threading.Thread(target=self.capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self.infer_loop, name="infer", daemon=True),
+            threading.Thread(target=self.render_loop, name="render", daemon=True),
+        ]
+        for t in self.threads:
+            t.start()
+
+    def stop(self, timeout: float = 1.0):
+        self.stop_event.set()
+        for q in (self.infer_q, self.render_q):
+            # wake blocked consumers
+            q.put(None)
+        for t in self.threads:
+            if t is not threading.current_thread():
+                t.join(timeout)
+        self.threads = []
+
+    def is_running(self) -> bool:
+        return any(t.is_alive() for t in self.threads)
+
+    def report(self, stage: str, e: Exception):
+        if self.on_error is not None:
+            try:
+                self.on_error(stage, e)
+            except Exception:
+                pass
+
+    def capture_loop(self):
+        while not self.stop_event.is_set():
+            t0 = PERF.now()
+            try:
+                ok, frame = self.read_frame()
+            except Exception as e:
+                self.report("capture", e)
+                break
+            if not ok or frame is None:
+                time.sleep(0.005)
+                continue
+            PERF.since("capture.read", t0)
+            PERF.count("frames.captured")
+            self.seq += 1
+            pkt = (self.seq, time.time(), frame)
+            self.infer_q.put(pkt)
+            self.render_q.put(pkt)
+
+    def infer_loop(self):
+        while not self.stop_event.is_set():
+            pkt = self.infer_q.get(timeout=0.1)
+            if pkt is None:
+                continue
+            seq, ts, frame = pkt
+            t0 = PERF.now()
+            try:
+                result = self.infer(seq, ts, frame)
+            except Exception as e:
+                self.report("infer", e)
+                continue
+            if result is not None:
+                PERF.since("infer", t0)
+                self.publish(result)
+
+    def publish(self, result):
+        # also used by infer stages that complete asynchronously
+        PERF.count("frames.inferred")
+        with self.result_lock:
+            self.last_result = result
+        self.result_q.put(result)
+
+    def render_loop(self):
+        while not self.stop_event.is_set():
+            pkt = self.render_q.get(timeout=0.1)
+            if pkt is None:
+                continue
+            seq, ts, frame = pkt
+            with self.result_lock:
+                result = self.last_result
+            t0 = PERF.now()
+            try:
+                item = self.render(seq, ts, frame, result)
+            except Exception as e:
+                self.report("render", e)
+                continue
+            PERF.since("render", t0)
+            if item is not None:
+                self.display_q.put(item)
@@ -0,0 +1,135 @@
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+from defaults import IMGSZ_DEFAULT
+
+PAD_VALUE = 114
+MOTION_SIZE = (64, 36)
+MOTION_THRESHOLD = 8.0
+MOTION_MAX_SKIP = 1.0
+
+
+def fit(w: int, h: int, size: int):
+    # -> (scale, new_w, new_h) so the long side becomes size
+    scale = min(size / w, size / h)
+    return scale, max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+
+
+class Letterbox:
+    # Resize keeping aspect ratio and pad to size x size, straight into a
+    # buffer allocated once: cv2.resize writes into the image area, and the
+    # padding is only repainted when the source geometry changes. The
+    # returned image is the buffer itself, valid until the next call.
+    # -> (image, scale, (pad_x, pad_y)) for mapping boxes back.
+    def __init__(self, size: int = IMGSZ_DEFAULT, pad_value: int = PAD_VALUE):
+        self.size = int(size)
+        self.pad_value = pad_value
+        self.buf = np.full((self.size, self.size, 3), pad_value, dtype=np.uint8)
+        self.geometry = None
+
+    def __call__(self, frame):
+        h, w = frame.shape[:2]
+        if self.geometry is None or self.geometry[0] != (w, h):
+            scale, nw, nh = fit(w, h, self.size)
+            pad_x, pad_y = (self.size - nw) // 2, (self.size - nh) // 2
+            self.buf[:] = self.pad_value
+            self.geometry = ((w, h), scale, (nw, nh), (pad_x, pad_y))
+        _, scale, (nw, nh), (pad_x, pad_y) = self.geometry
+        roi = self.buf[pad_y:pad_y + nh, pad_x:pad_x + nw]
+        if (nw, nh) == (w, h):
+            roi[:] = frame
+        else:
+            cv2.resize(frame, (nw, nh), dst=roi, interpolation=cv2.INTER_LINEAR)
+        return self.buf, scale, (pad_x, pad_y)
+
+
+class Downscale:
+    # Shrink frames whose long side exceeds size into a reused buffer, for
+    # backends that letterbox by themselves (ultralytics): they then pad a
+    # small image instead of copying and resizing a full 1080p frame.
+    # -> (image, scale); scale 1.0 returns the frame untouched.
+    def __init__(self, size: int = IMGSZ_DEFAULT):
+        self.size = int(size)
+        self.buf = None
+
+    def __call__(self, frame):
+        h, w = frame.shape[:2]
+        if max(w, h) <= self.size:
+            return frame, 1.0
+        scale, nw, nh = fit(w, h, self.size)
+        if self.buf is None or self.buf.shape[:2] != (nh, nw):
+            self.buf = np.empty((nh, nw) + frame.shape[2:], dtype=frame.dtype)
+        cv2.resize(frame, (nw, nh), dst=self.buf, interpolation=cv2.INTER_AREA)
+        return self.buf, scale
+
+
+def remap_boxes(det, scale: float, pad, w: int, h: int):
+    # In place on an (k, >=4) array of x1, y1, x2, y2 in model input
+    # pixels: undo padding and scale, clip to the w x h source frame.
+    if len(det):
+        det[:, [0, 2]] = np.clip((det[:, [0, 2]] - pad[0]) / scale, 0, w - 1)
+        det[:, [1, 3]] = np.clip((det[:, [1, 3]] - pad[1]) / scale, 0, h - 1)
+    return det
+
+
+def scale_box(det, scale: float):
+    # (x1, y1, x2, y2, conf) found on a frame shrunk by scale -> source pixels
+    if det is None or scale == 1.0:
+        return det
+    x1, y1, x2, y2, c = det
+    return int(x1 / scale), int(y1 / scale), int(x2 / scale), int(y2 / scale), c
+
+
+class MotionGate:
+    # Skips inference while the scene stands still. changed() compares a
+    # 64x36 grayscale thumbnail of the frame with the one taken at the last
+    # inference. The largest per-pixel difference (0..255) decides, not the
+    # mean: a small target moving in a big frame changes a few thumbnail
+    # pixels a lot, and area averaging already evens out sensor noise.
+    # Below threshold the caller reuses its previous result; the reference
+    # only moves when inference runs, so slow drift still adds up, and
+    # max_skip seconds force a fresh inference anyway.
+    def __init__(self, threshold: float = MOTION_THRESHOLD, max_skip: float = MOTION_MAX_SKIP,
+                 size=MOTION_SIZE):
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.size = size
+        self.small = np.empty((size[1], size[0], 3), np.uint8)
+        self.thumb = np.empty((size[1], size[0]), np.uint8)
+        self.diff = np.empty_like(self.thumb)
+        self.ref = None
+        self.ref_t = 0.0
+        self.last_diff = 0.0
+        self.checked = 0
+        self.skipped = 0
+
+    def reset(self):
+        self.ref = None
+
+    def changed(self, frame, now: float) -> bool:
+        # True: run inference (and make this frame the reference)
+        self.checked += 1
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.thumb)
+        if self.ref is not None and now - self.ref_t < self.max_skip:
+            cv2.absdiff(self.thumb, self.ref, dst=self.diff)
+            self.last_diff = float(self.diff.max())
+            if self.last_diff < self.threshold:
+                self.skipped += 1
+                return False
+        if self.ref is None:
+            self.ref = self.thumb.copy()
+        else:
+            self.ref[:] = self.thumb
+        self.ref_t = now
+        return True
+
+    def stats(self) -> dict:
+        return {"checked": self.checked, "skipped": self.skipped, "diff": self.last_diff}
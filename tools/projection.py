@@ -0,0 +1,256 @@
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+LUT_CACHE = 4
+
+
+def normalized_to_angles(xn, yn):
+    # Pan/tilt angles (degrees) of a normalized image ray (x right, y down):
+    # yaw first, then pitch in the yawed plane; up is positive like the
+    # old linear mapping.
+    ax = np.degrees(np.arctan(xn))
+    ay = -np.degrees(np.arctan2(yn, np.hypot(1.0, xn)))
+    return ax, ay
+
+
+def fov_angles(cx, cy, fw, fh, hfov: float, vfov: float):
+    # Ideal rectilinear lens with the frame edges at +/- fov / 2: scalar
+    # math, cheaper than any table
+    xn = (cx / max(1, fw) * 2.0 - 1.0) * math.tan(math.radians(hfov) / 2.0)
+    yn = (cy / max(1, fh) * 2.0 - 1.0) * math.tan(math.radians(vfov) / 2.0)
+    return math.degrees(math.atan(xn)), -math.degrees(math.atan2(yn, math.hypot(1.0, xn)))
+
+
+class CameraModel:
+    # Pinhole intrinsics plus OpenCV distortion coefficients at a reference
+    # resolution. scaled() maps them to other capture sizes of the same
+    # sensor mode (same field of view, different resize).
+    def __init__(self, K, dist=None, size=None):
+        self.K = np.asarray(K, dtype=np.float64).reshape(3, 3)
+        d = np.zeros(0) if dist is None else np.asarray(dist, dtype=np.float64).ravel()
+        self.dist = d if np.any(d) else np.zeros(0)
+        self.size = tuple(int(v) for v in size) if size else (int(round(2 * self.K[0, 2])),
+                                                               int(round(2 * self.K[1, 2])))
+
+    @classmethod
+    def from_fov(cls, width: int, height: int, hfov: float, vfov: float):
+        # ideal rectilinear lens whose frame edges sit at +/- fov / 2
+        fx = (width / 2.0) / math.tan(math.radians(hfov) / 2.0)
+        fy = (height / 2.0) / math.tan(math.radians(vfov) / 2.0)
+        return cls([[fx, 0, width / 2.0], [0, fy, height / 2.0], [0, 0, 1]], None, (width, height))
+
+    @classmethod
+    def load(cls, path: str):
+        # our JSON (see save()) or OpenCV calibration YAML/XML with
+        # camera_matrix / distortion_coefficients / image_width / image_height
+        if path.lower().endswith(".json"):
+            with open(path) as f:
+                d = json.load(f)
+            return cls(d["camera_matrix"], d.get("dist_coeffs"), d.get("image_size"))
+        if cv2 is None:
+            raise RuntimeError("opencv-python is needed to read OpenCV calibration files")
+        fs = cv2.FileStorage(path, cv2.FILE_STORAGE_READ)
+        if not fs.isOpened():
+            raise OSError(f"cannot open {path}")
+        try:
+            K = fs.getNode("camera_matrix").mat()
+            if K is None:
+                raise ValueError(f"{path}: no camera_matrix")
+            dist_node = fs.getNode("distortion_coefficients")
+            if dist_node.empty():
+                dist_node = fs.getNode("dist_coeffs")
+            dist = None if dist_node.empty() else dist_node.mat()
+            w, h = fs.getNode("image_width"), fs.getNode("image_height")
+            size = (int(w.real()), int(h.real())) if not w.empty() and not h.empty() else None
+        finally:
+            fs.release()
+        return cls(K, dist, size)
+
+    def save(self, path: str, **extra):
+        d = {"camera_matrix": self.K.tolist(), "dist_coeffs": self.dist.tolist(), "image_size": list(self.size)}
+        d.update(extra)
+        with open(path, "w") as f:
+            json.dump(d, f, indent=2)
+
+    def scaled(self, width: int, height: int):
+        if (width, height) == self.size:
+            return self
+        sx, sy = width / self.size[0], height / self.size[1]
+        K = self.K.copy()
+        K[0, :] *= sx
+        K[1, :] *= sy
+        return CameraModel(K, self.dist, (width, height))
+
+    def normalized(self, px, py):
+        # pixel coordinates -> undistorted normalized ray coordinates
+        px = np.asarray(px, dtype=np.float64)
+        py = np.asarray(py, dtype=np.float64)
+        if self.dist.size == 0:
+            return (px - self.K[0, 2]) / self.K[0, 0], (py - self.K[1, 2]) / self.K[1, 1]
+        if cv2 is None:
+            raise RuntimeError("opencv-python is needed to undistort points")
+        pts = np.stack([px.ravel(), py.ravel()], axis=1).reshape(-1, 1, 2)
+        und = cv2.undistortPoints(pts, self.K, self.dist).reshape(-1, 2)
+        return und[:, 0].reshape(px.shape), und[:, 1].reshape(py.shape)
+
+    def angles(self, px, py):
+        return normalized_to_angles(*self.normalized(px, py))
+
+
+class Projector:
+    # Pixel -> (angle_x, angle_y). With a calibration the first call at a
+    # new resolution builds two float32 tables (one vectorized undistort
+    # pass over every pixel); after that a center costs two array reads.
+    # Without one it is the ideal lens for hfov/vfov, computed directly.
+    def __init__(self, camera: CameraModel = None, hfov: float = 90.0, vfov: float = 30.0):
+        self.camera = camera
+        self.hfov = hfov
+        self.vfov = vfov
+        self.luts = {}
+
+    @classmethod
+    def from_file(cls, path: str, hfov: float = 90.0, vfov: float = 30.0):
+        return cls(CameraModel.load(path), hfov, vfov)
+
+    def set_fov(self, hfov: float, vfov: float):
+        # only used without a calibration
+        self.hfov, self.vfov = hfov, vfov
+
+    def model(self, width: int, height: int) -> CameraModel:
+        if self.camera is not None:
+            return self.camera.scaled(width, height)
+        return CameraModel.from_fov(width, height, self.hfov, self.vfov)
+
+    def lut(self, width: int, height: int):
+        key = (width, height)
+        tables = self.luts.get(key)
+        if tables is None:
+            if len(self.luts) >= LUT_CACHE:
+                self.luts.pop(next(iter(self.luts)))
+            py, px = np.mgrid[0:height, 0:width].astype(np.float64)
+            ax, ay = self.model(width, height).angles(px, py)
+            tables = (ax.astype(np.float32), ay.astype(np.float32))
+            self.luts[key] = tables
+        return tables
+
+    def angles(self, cx, cy, fw: int, fh: int):
+        # same contract as vision.center_to_angles()
+        if self.camera is None:
+            return fov_angles(cx, cy, fw, fh, self.hfov, self.vfov)
+        ax, ay = self.lut(int(fw), int(fh))
+        ix = min(max(int(round(cx)), 0), int(fw) - 1)
+        iy = min(max(int(round(cy)), 0), int(fh) - 1)
+        return float(ax[iy, ix]), float(ay[iy, ix])
+
+    def angles_many(self, cx, cy, fw: int, fh: int):
+        if self.camera is None:
+            return self.model(int(fw), int(fh)).angles(cx, cy)
+        ax, ay = self.lut(int(fw), int(fh))
+        ix = np.clip(np.rint(cx).astype(np.intp), 0, int(fw) - 1)
+        iy = np.clip(np.rint(cy).astype(np.intp), 0, int(fh) - 1)
+        return ax[iy, ix], ay[iy, ix]
+
+
+def calibrate(paths, board=(9, 6), square: float = 1.0, log=print):
+    # Chessboard calibration. board = inner corners (cols, rows).
+    # -> (CameraModel, rms reprojection error, images used)
+    if cv2 is None:
+        raise RuntimeError("opencv-python not installed. Install: pip install opencv-python")
+    objp = np.zeros((board[0] * board[1], 3), np.float32)
+    objp[:, :2] = np.mgrid[0:board[0], 0:board[1]].T.reshape(-1, 2) * square
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-3)
+    obj_pts, img_pts, size, used = [], [], None, []
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            log(f"[CAL] skip {path}: unreadable")
+            continue
+        if size is None:
+            size = (img.shape[1], img.shape[0])
+        elif (img.shape[1], img.shape[0]) != size:
+            log(f"[CAL] skip {path}: size {img.shape[1]}x{img.shape[0]} != {size[0]}x{size[1]}")
+            continue
+        found, corners = cv2.findChessboardCorners(img, board, cv2.CALIB_CB_ADAPTIVE_THRESH | cv2.CALIB_CB_NORMALIZE_IMAGE)
+        if not found:
+            log(f"[CAL] skip {path}: board not found")
+            continue
+        corners = cv2.cornerSubPix(img, corners, (11, 11), (-1, -1), criteria)
+        obj_pts.append(objp)
+        img_pts.append(corners)
+        used.append(path)
+    if len(used) < 3:
+        raise RuntimeError(f"need at least 3 usable chessboard images, got {len(used)}")
+    rms, K, dist, _, _ = cv2.calibrateCamera(obj_pts, img_pts, size, None, None)
+    return CameraModel(K, dist, size), rms, used
+
+
+def fov_of(model: CameraModel):
+    w, h = model.size
+    ax, _ = model.angles(np.array([0.0, w]), np.array([h / 2.0, h / 2.0]))
+    _, ay = model.angles(np.array([w / 2.0, w / 2.0]), np.array([0.0, h]))
+    return float(ax[1] - ax[0]), float(ay[0] - ay[1])
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Camera calibration and pixel -> angle projection.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("calibrate", help="calibrate from chessboard images")
+    c.add_argument("--images", required=True, help="directory of chessboard images")
+    c.add_argument("--board", default="9x6", help="inner corners, COLSxROWS")
+    c.add_argument("--square", type=float, default=1.0, help="square size (any unit)")
+    c.add_argument("-o", "--output", default="camera.json")
+    s = sub.add_parser("show", help="print the angle error of the linear mapping for a model")
+    s.add_argument("--camera", help="calibration file (default: ideal lens from --hfov/--vfov)")
+    s.add_argument("--size", default="1280x720")
+    s.add_argument("--hfov", type=float, default=90.0)
+    s.add_argument("--vfov", type=float, default=30.0)
+    args = p.parse_args(argv)
+    if np is None:
+        print("[CAL] numpy not installed. Install: pip install numpy")
+        return 2
+
+    try:
+        if args.cmd == "calibrate":
+            cols, rows = (int(v) for v in args.board.lower().split("x"))
+            paths = sorted(f for f in glob.glob(os.path.join(args.images, "*")) if f.lower().endswith(IMAGE_EXTS))
+            model, rms, used = calibrate(paths, (cols, rows), args.square)
+            model.save(args.output, rms=rms, images=len(used))
+            hfov, vfov = fov_of(model)
+            print(f"[CAL] {len(used)}/{len(paths)} images, rms={rms:.3f}px, "
+                  f"fov={hfov:.1f}x{vfov:.1f} deg -> {args.output}")
+            return 0
+
+        w, h = (int(v) for v in args.size.lower().split("x"))
+        proj = Projector(CameraModel.load(args.camera) if args.camera else None, args.hfov, args.vfov)
+        model = proj.model(w, h)
+        hfov, vfov = fov_of(model)
+        print(f"[CAL] {w}x{h} fov={hfov:.1f}x{vfov:.1f} deg")
+        for fx, fy in ((0.5, 0.5), (0.75, 0.5), (1.0, 0.5), (0.5, 0.0), (1.0, 0.0), (0.9, 0.1)):
+            cx, cy = fx * (w - 1), fy * (h - 1)
+            ax, ay = proj.angles(cx, cy, w, h)
+            lx, ly = (cx / w - 0.5) * hfov, (0.5 - cy / h) * vfov
+            print(f"  px=({cx:7.1f},{cy:7.1f}) angles=({ax:7.2f},{ay:7.2f}) linear=({lx:7.2f},{ly:7.2f}) "
+                  f"diff=({ax - lx:+6.2f},{ay - ly:+6.2f})")
+        return 0
+    except Exception as e:
+        print(f"[CAL] {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import math
+import struct
+import threading
+import time
+from collections import deque
+
+from tcp_link import CONNECTED
+
+# Binary target frame, version 1 (9 bytes, little endian):
+#   [0xA5][ver][seq u16][x i16][y i16][crc8]
+# x / y are centi-degrees, crc8 (poly 0x07, init 0) covers the first 8
+# bytes. Must stay in sync with readBinFrame() in src/main.cpp.
+MAGIC = 0xA5
+VERSION = 1
+FRAME = struct.Struct("<BBHhh")
+FRAME_LEN = FRAME.size + 1
+SCALE = 100.0
+LIMIT = 32767 / SCALE
+
+# Negotiation: after the HELLO banner the client asks for binary frames;
+# firmware that does not know the request answers ERR;BAD_PACKET and the
+# client keeps sending text lines.
+HELLO_PREFIX = "HELLO"
+NEGOTIATE = "PROTO:BIN1"
+NEGOTIATE_OK = "PROTO:BIN1;OK"
+BIN_ACK_PREFIX = "A:"
+TEXT_ACK_PREFIX = "ACK;"
+
+# ACK round trip smoothing (EWMA weight of a new sample) and how many
+# unanswered sends are remembered for matching
+RTT_ALPHA = 0.2
+RTT_TRACK = 64
+
+TEXT = "text"
+BINARY = "binary"
+
+# Aiming on the board: targets snap to ANGLE_STEP_DEG (quantizeDeg2()) and
+# count as hit within TARGET_TOL_DEG. Must stay in sync with src/main.cpp.
+ANGLE_STEP_DEG = 2
+TARGET_TOL_DEG = 6
+
+
+def quantize_deg2(a: float) -> int:
+    # roundf() rounds halves away from zero, Python's round() does not
+    q = a / ANGLE_STEP_DEG
+    return int(ANGLE_STEP_DEG * math.copysign(math.floor(abs(q) + 0.5), q))
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def _crc8_table():
+    table = []
+    for i in range(256):
+        c = i
+        for _ in range(8):
+            c = ((c << 1) ^ 0x07) & 0xFF if c & 0x80 else (c << 1) & 0xFF
+        table.append(c)
+    return bytes(table)
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data: bytes) -> int:
+    c = 0
+    for b in data:
+        c = CRC8_TABLE[c ^ b]
+    return c
+
+
+def to_centi(deg: float) -> int:
+    return int(round(max(-LIMIT, min(LIMIT, deg)) * SCALE))
+
+
+def encode_frame(seq: int, x_deg: float, y_deg: float) -> bytes:
+    head = FRAME.pack(MAGIC, VERSION, seq & 0xFFFF, to_centi(x_deg), to_centi(y_deg))
+    return head + bytes((crc8(head),))
+
+
+def decode_frame(buf) -> tuple:
+    # -> (seq, x_deg, y_deg); raises ProtocolError on a bad frame
+    if len(buf) < FRAME_LEN:
+        raise ProtocolError("short frame")
+    head = bytes(buf[:FRAME.size])
+    magic, version, seq, x, y = FRAME.unpack(head)
+    if magic != MAGIC:
+        raise ProtocolError("bad magic")
+    if version != VERSION:
+        raise ProtocolError(f"unsupported version {version}")
+    if crc8(head) != buf[FRAME.size]:
+        raise ProtocolError("crc mismatch")
+    return seq, x / SCALE, y / SCALE
+
+
+class FrameDecoder:
+    # Stream decoder: feed() arbitrary chunks, get whole frames back.
+    # On a bad magic/CRC it skips one byte and resyncs on the next magic.
+    def __init__(self):
+        self.buf = bytearray()
+        self.errors = 0
+
+    def feed(self, data: bytes) -> list:
+        self.buf += data
+        out = []
+        while True:
+            i = self.buf.find(MAGIC)
+            if i < 0:
+                self.errors += 1 if self.buf else 0
+                self.buf.clear()
+                break
+            if i:
+                self.errors += 1
+                del self.buf[:i]
+            if len(self.buf) < FRAME_LEN:
+                break
+            try:
+                out.append(decode_frame(self.buf))
+                del self.buf[:FRAME_LEN]
+            except ProtocolError:
+                self.errors += 1
+                del self.buf[:1]
+        return out
+
+
+def text_packet(x_deg: float, y_deg: float, msg: str = "PHONE") -> str:
+    return f"MSG:{msg};X:{x_deg:.2f};Y:{y_deg:.2f}\n"
+
+
+def parse_text_packet(line: str):
+    # Same rules as parsePacket() in src/main.cpp -> (msg, x, y) or None
+    line = line.strip()
+    if not line.startswith("MSG:"):
+        return None
+    i_x = line.find(";X:")
+    i_y = line.find(";Y:")
+    if i_x < 0 or i_y < 0:
+        return None
+    msg = line[4:i_x]
+    sx = line[i_x + 3:i_y].strip()
+    sy = line[i_y + 3:].strip()
+    if not sx or not sy:
+        return None
+    allowed = set("0123456789+-.")
+    if not set(sx) <= allowed or not set(sy) <= allowed:
+        return None
+    return msg, arduino_to_float(sx), arduino_to_float(sy)
+
+
+def arduino_to_float(s: str) -> float:
+    # String::toFloat() parses the longest valid prefix and returns 0 otherwise
+    end = len(s)
+    while end:
+        try:
+            return float(s[:end])
+        except ValueError:
+            end -= 1
+    return 0.0
+
+
+class TargetChannel:
+    # Sends target angles over an AsyncLink in the best format the board
+    # supports. Starts in text mode on every (re)connect, asks for binary
+    # after the HELLO banner and switches only once the board confirms.
+    # ACKs are matched to sends (binary by seq, text by the echoed X/Y) for
+    # a smoothed round-trip time; a send replaced in the queue before it went
+    # out is never answered and drops out when a later one is.
+    def __init__(self, link, prefer_binary: bool = True, on_mode=None):
+        self.link = link
+        self.prefer_binary = prefer_binary
+        self.on_mode = on_mode
+        self.mode = TEXT
+        self.seq = 0
+        self.last = None
+        self.unacked = deque(maxlen=RTT_TRACK)
+        self.unacked_lock = threading.Lock()
+        self.rtt = None
+        self.acks = 0
+        link.add_line_listener(self.on_line)
+        link.add_state_listener(self.on_state)
+
+    def set_mode(self, mode: str):
+        if mode != self.mode:
+            self.mode = mode
+            if self.on_mode is not None:
+                self.on_mode(mode)
+
+    def on_state(self, state: str, info: str):
+        if state == CONNECTED:
+            return
+        with self.unacked_lock:
+            self.unacked.clear()
+        if self.mode == BINARY:
+            self.set_mode(TEXT)
+            if self.last is not None:
+                # a parked binary frame would confuse a board that just
+                # restarted in text mode: replace it with a text line
+                self.link.send(text_packet(*self.last), drop_oldest=True, key="center")
+
+    def on_line(self, line: str):
+        if line.startswith(HELLO_PREFIX) and self.prefer_binary:
+            self.link.send(NEGOTIATE + "\n")
+        elif line == NEGOTIATE_OK:
+            self.set_mode(BINARY)
+        elif line.startswith(BIN_ACK_PREFIX):
+            try:
+                self.on_ack(int(line[len(BIN_ACK_PREFIX):]))
+            except ValueError:
+                pass
+        elif line.startswith(TEXT_ACK_PREFIX):
+            parsed = parse_text_packet(line[len(TEXT_ACK_PREFIX):])
+            if parsed is not None:
+                self.on_ack((round(parsed[1], 2), round(parsed[2], 2)))
+
+    def on_ack(self, key):
+        now = time.monotonic()
+        with self.unacked_lock:
+            for i, (k, t) in enumerate(self.unacked):
+                if k == key:
+                    # everything older was replaced in the queue or lost
+                    for _ in range(i + 1):
+                        self.unacked.popleft()
+                    break
+            else:
+                return
+        rtt = now - t
+        self.rtt = rtt if self.rtt is None else self.rtt + RTT_ALPHA * (rtt - self.rtt)
+        self.acks += 1
+
+    def send_target(self, x_deg: float, y_deg: float) -> bool:
+        self.last = (x_deg, y_deg)
+        if self.mode == BINARY:
+            self.seq = (self.seq + 1) & 0xFFFF
+            data = encode_frame(self.seq, x_deg, y_deg)
+            key = self.seq
+        else:
+            data = text_packet(x_deg, y_deg)
+            key = (round(x_deg, 2), round(y_deg, 2))
+        ok = self.link.send(data, drop_oldest=True, key="center")
+        if ok:
+            with self.unacked_lock:
+                self.unacked.append((key, time.monotonic()))
+        return ok
@@ -0,0 +1,66 @@
+import argparse
+import json
+import random
+import sys
+import time
+
+from protocol import FRAME_LEN, FrameDecoder, decode_frame, encode_frame, parse_text_packet, text_packet
+
+
+def bench(n: int, seed: int = 2) -> dict:
+    rnd = random.Random(seed)
+    samples = [(rnd.uniform(-90, 90), rnd.uniform(-45, 45)) for _ in range(n)]
+    res = {"n": n}
+
+    t0 = time.perf_counter()
+    lines = [text_packet(x, y).encode("utf-8") for x, y in samples]
+    t1 = time.perf_counter()
+    for line in lines:
+        parse_text_packet(line.decode("utf-8"))
+    t2 = time.perf_counter()
+    res["text"] = {
+        "avg_bytes": sum(map(len, lines)) / n,
+        "encode_per_s": n / (t1 - t0),
+        "decode_per_s": n / (t2 - t1),
+    }
+
+    t0 = time.perf_counter()
+    frames = [encode_frame(i, x, y) for i, (x, y) in enumerate(samples)]
+    t1 = time.perf_counter()
+    for f in frames:
+        decode_frame(f)
+    t2 = time.perf_counter()
+    dec = FrameDecoder()
+    dec.feed(b"".join(frames))
+    t3 = time.perf_counter()
+    res["binary"] = {
+        "avg_bytes": FRAME_LEN,
+        "encode_per_s": n / (t1 - t0),
+        "decode_per_s": n / (t2 - t1),
+        "stream_decode_per_s": n / (t3 - t2),
+    }
+    res["size_ratio"] = res["binary"]["avg_bytes"] / res["text"]["avg_bytes"]
+    return res
+
+
+def main(argv=None):
+    # round-trip correctness is covered by test_protocol.py
+    p = argparse.ArgumentParser(description="Size/throughput benchmark for target framing.")
+    p.add_argument("-n", type=int, default=100000, help="packets per benchmark run")
+    p.add_argument("--json", action="store_true", help="print results as JSON")
+    args = p.parse_args(argv)
+
+    res = bench(args.n)
+    if args.json:
+        print(json.dumps(res, indent=2))
+        return 0
+    for name in ("text", "binary"):
+        r = res[name]
+        print(f"{name:7s} {r['avg_bytes']:6.1f} B/pkt  encode {r['encode_per_s'] / 1e3:8.1f} k/s  "
+              f"decode {r['decode_per_s'] / 1e3:8.1f} k/s")
+    print(f"binary/text size: {res['size_ratio']:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+TRACK_MODES = ("auto", "csrt", "kcf", "flow", "crop")
+
+
+def create_cv_tracker(kind: str):
+    # CSRT/KCF live in opencv-contrib; depending on the build they are
+    # exposed at top level or under cv2.legacy. None if unavailable.
+    name = "TrackerCSRT_create" if kind == "csrt" else "TrackerKCF_create"
+    for mod in (cv2, getattr(cv2, "legacy", None)):
+        fn = getattr(mod, name, None) if mod is not None else None
+        if fn is not None:
+            try:
+                return fn()
+            except Exception:
+                pass
+    return None
+
+
+def expand_box(det, fw, fh, margin: float):
+    # Box grown by margin * its size on each side, clipped to the frame.
+    x1, y1, x2, y2 = det[:4]
+    mx = int((x2 - x1) * margin)
+    my = int((y2 - y1) * margin)
+    return (max(0, x1 - mx), max(0, y1 - my), min(fw, x2 + mx), min(fh, y2 + my))
+
+
+class RoiTracker:
+    # Full-frame detection every `detect_every` frames (or when the last
+    # confidence drops below `min_conf`); in between the phone box is
+    # followed cheaply so a center is available on every camera frame.
+    #   csrt / kcf  OpenCV contrib trackers
+    #   flow        median Lucas-Kanade flow of corners inside the box
+    #   crop        run the detector on an ROI around the last box
+    # update() returns (det, how) with how in "detect", "track", "lost";
+    # conf overrides the detector's threshold for that call.
+    def __init__(self, detector, detect_every: int = 10, min_conf: float = 0.35,
+                 mode: str = "auto", crop_margin: float = 1.0, min_points: int = 6):
+        self.detector = detector
+        self.detect_every = max(1, int(detect_every))
+        self.min_conf = min_conf
+        self.crop_margin = crop_margin
+        self.min_points = min_points
+        self.mode = mode
+        if mode == "auto":
+            self.mode = "csrt" if create_cv_tracker("csrt") is not None else "flow"
+
+        self.det = None
+        self.since_detect = 0
+        self.cv_tracker = None
+        self.prev_gray = None
+        self.points = None
+        self.flow_box = None
+
+        self.full_detections = 0
+        self.tracked = 0
+
+    def reset(self):
+        self.det = None
+        self.since_detect = 0
+        self.cv_tracker = None
+        self.prev_gray = None
+        self.points = None
+        self.flow_box = None
+
+    def need_detect(self) -> bool:
+        return (self.det is None
+                or self.since_detect >= self.detect_every
+                or self.det[4] < self.min_conf)
+
+    def update(self, frame, conf=None):
+        if self.need_detect():
+            return self.full_detect(frame, conf)
+        self.since_detect += 1
+        det = self.track(frame, conf)
+        if det is None:
+            # tracker lost the box: fall back to a full detection right away
+            return self.full_detect(frame, conf)
+        self.det = det
+        self.tracked += 1
+        return det, "track"
+
+    def full_detect(self, frame, conf=None):
+        self.full_detections += 1
+        self.since_detect = 0
+        det = self.detector.detect(frame, conf=conf)
+        self.det = det
+        if det is None:
+            self.cv_tracker = None
+            self.points = None
+            return None, "lost"
+        self.init_track(frame, det)
+        return det, "detect"
+
+    def init_track(self, frame, det):
+        x1, y1, x2, y2 = det[:4]
+        if self.mode in ("csrt", "kcf"):
+            self.cv_tracker = create_cv_tracker(self.mode)
+            if self.cv_tracker is not None:
+                self.cv_tracker.init(frame, (int(x1), int(y1), int(x2 - x1), int(y2 - y1)))
+        elif self.mode == "flow":
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            mask = np.zeros_like(gray)
+            mask[int(y1):int(y2), int(x1):int(x2)] = 255
+            self.points = cv2.goodFeaturesToTrack(gray, maxCorners=60, qualityLevel=0.01,
+                                                  minDistance=4, mask=mask)
+            self.prev_gray = gray
+            self.flow_box = (float(x1), float(y1), float(x2), float(y2))
+
+    def track(self, frame, conf=None):
+        fh, fw = frame.shape[:2]
+        box_conf = self.det[4]
+        if self.mode in ("csrt", "kcf"):
+            if self.cv_tracker is None:
+                return None
+            ok, (x, y, w, h) = self.cv_tracker.update(frame)
+            if not ok or w <= 0 or h <= 0:
+                return None
+            return (int(x), int(y), int(x + w), int(y + h), box_conf)
+
+        if self.mode == "crop":
+            rx1, ry1, rx2, ry2 = expand_box(self.det, fw, fh, self.crop_margin)
+            if rx2 - rx1 < 8 or ry2 - ry1 < 8:
+                return None
+            det = self.detector.detect(frame[ry1:ry2, rx1:rx2], conf=conf)
+            if det is None:
+                return None
+            x1, y1, x2, y2, c = det[:5]
+            return (x1 + rx1, y1 + ry1, x2 + rx1, y2 + ry1, c)
+
+        # optical flow: shift the box by the median point displacement
+        if self.points is None or len(self.points) < self.min_points:
+            return None
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        nxt, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None,
+                                                  winSize=(15, 15), maxLevel=2)
+        good = status.reshape(-1) == 1
+        if good.sum() < self.min_points:
+            return None
+        d = np.median((nxt[good] - self.points[good]).reshape(-1, 2), axis=0)
+        self.points = nxt[good].reshape(-1, 1, 2)
+        self.prev_gray = gray
+        # keep sub-pixel motion in flow_box, hand out integer boxes
+        x1, y1, x2, y2 = self.flow_box
+        dx, dy = float(d[0]), float(d[1])
+        x1, x2 = min(max(0.0, x1 + dx), fw - 1.0), min(max(0.0, x2 + dx), fw - 1.0)
+        y1, y2 = min(max(0.0, y1 + dy), fh - 1.0), min(max(0.0, y2 + dy), fh - 1.0)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        self.flow_box = (x1, y1, x2, y2)
+        return (int(x1), int(y1), int(x2), int(y2), box_conf)
+
+    def stats(self) -> dict:
+        total = self.full_detections + self.tracked
+        return {
+            "mode": self.mode,
+            "full_detections": self.full_detections,
+            "tracked": self.tracked,
+            "detect_ratio": (self.full_detections / total) if total else 0.0,
+        }
@@ -0,0 +1,84 @@
+import math
+
+from protocol import ANGLE_STEP_DEG, quantize_deg2
+
+MIN_HZ = 1.0
+MAX_HZ = 30.0
+FAST_DPS = 40.0
+RTT_TARGET = 0.08
+KEEPALIVE = 1.0
+SPEED_ALPHA = 0.5
+
+
+class SendScheduler:
+    # Decides when a target is worth a packet, independent of how often the
+    # detector runs:
+    #   - a target that quantizes (like quantizeDeg2() on the board) to the
+    #     spawn last sent is not sent again, except once per keepalive
+    #   - the send rate scales from min_hz for a still target to max_hz at
+    #     fast_dps of target motion
+    #   - when the smoothed ACK round trip exceeds rtt_target, or packets
+    #     are still queued, the rate backs off proportionally
+    # Call due() with the angles as they go on the wire and sent() after
+    # the packet was queued.
+    def __init__(self, min_hz: float = MIN_HZ, max_hz: float = MAX_HZ, fast_dps: float = FAST_DPS,
+                 rtt_target: float = RTT_TARGET, keepalive: float = KEEPALIVE):
+        self.min_hz = float(min_hz)
+        self.max_hz = max(self.min_hz, float(max_hz))
+        self.fast_dps = float(fast_dps)
+        self.rtt_target = float(rtt_target)
+        self.keepalive = float(keepalive)
+        self.speed = 0.0
+        self.hz = self.min_hz
+        self.sends = 0
+        self.suppressed = 0
+        self.throttled = 0
+        self.reset()
+
+    def reset(self):
+        # after a (re)connect the board has no spawn: the next target goes out
+        self.last_q = None
+        self.last_send_t = -math.inf
+        self.last_seen = None
+
+    def observe(self, x: float, y: float, now: float):
+        # motion estimate from successive distinct targets
+        if self.last_seen is not None:
+            px, py, pt = self.last_seen
+            if (x, y) == (px, py):
+                return
+            dt = now - pt
+            if dt > 0:
+                v = math.hypot(x - px, y - py) / dt
+                self.speed += SPEED_ALPHA * (v - self.speed)
+        self.last_seen = (x, y, now)
+
+    def rate(self, rtt: float = None, backlog: int = 0) -> float:
+        hz = self.min_hz + (self.max_hz - self.min_hz) * min(1.0, self.speed / max(1e-6, self.fast_dps))
+        if rtt is not None and rtt > self.rtt_target:
+            hz *= self.rtt_target / rtt
+        if backlog:
+            hz /= 1 + backlog
+        return max(self.min_hz, hz)
+
+    def due(self, x: float, y: float, now: float, rtt: float = None, backlog: int = 0) -> bool:
+        self.observe(x, y, now)
+        q = (quantize_deg2(x), quantize_deg2(y))
+        since = now - self.last_send_t
+        if q == self.last_q and since < self.keepalive:
+            self.suppressed += 1
+            return False
+        self.hz = self.rate(rtt, backlog)
+        if since + 1e-9 < 1.0 / self.hz:
+            self.throttled += 1
+            return False
+        return True
+
+    def sent(self, x: float, y: float, now: float):
+        self.last_q = (quantize_deg2(x), quantize_deg2(y))
+        self.last_send_t = now
+        self.sends += 1
+
+    def stats(self) -> dict:
+        return {"sends": self.sends, "suppressed": self.suppressed, "throttled": self.throttled,
+                "hz": self.hz, "speed_dps": self.speed, "step_deg": ANGLE_STEP_DEG}
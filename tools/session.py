@@ -0,0 +1,218 @@
+import gzip
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+# Event kinds. TX/RX carry what crossed the wire, DET a detection as the
+# app used it, STATE link state changes.
+TX = "tx"
+RX = "rx"
+DET = "det"
+STATE = "state"
+KINDS = (TX, RX, DET, STATE)
+
+# Binary session file: MAGIC, then records of
+#   [u32 body_len][f64 t][u8 kind][payload]
+# payload is the raw bytes for TX, UTF-8 text for RX/STATE and compact
+# JSON for DET. gzip'd JSONL (.jsonl.gz) holds one object per line:
+#   {"t": ..., "k": "tx", "d": "..."}  (binary TX as {"hex": "..."})
+MAGIC = b"BSES1\n"
+RECORD = struct.Struct("<IdB")
+KIND_CODES = {k: i for i, k in enumerate(KINDS, 1)}
+CODE_KINDS = {i: k for k, i in KIND_CODES.items()}
+
+QUEUE_SIZE = 10000
+FLUSH_INTERVAL = 0.5
+SESSION_DIR = "sessions"
+
+
+def session_path(directory: str = SESSION_DIR, ext: str = ".jsonl.gz") -> str:
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, time.strftime("session-%Y%m%d-%H%M%S") + ext)
+
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith((".jsonl", ".jsonl.gz"))
+
+
+def encode_payload(kind: str, data) -> bytes:
+    if kind == DET:
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return data if isinstance(data, bytes) else str(data).encode("utf-8")
+
+
+def jsonl_record(t: float, kind: str, data) -> str:
+    if isinstance(data, bytes):
+        try:
+            data = data.decode("ascii")
+        except UnicodeDecodeError:
+            data = {"hex": data.hex()}
+    return json.dumps({"t": round(t, 6), "k": kind, "d": data}, separators=(",", ":"))
+
+
+class SessionRecorder:
+    # Appends timestamped events to disk from a background writer thread.
+    # record() only enqueues (safe from the Tk thread, the link loop and
+    # the pipeline threads); the writer batches whatever has queued up and
+    # flushes every FLUSH_INTERVAL. If the disk falls behind, new events
+    # are dropped and counted rather than blocking the caller.
+    def __init__(self, path: str, queue_size: int = QUEUE_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.jsonl = is_jsonl(path)
+        self.flush_interval = flush_interval
+        self.q = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.thread = None
+        self.closing = False
+        self.link = None
+        self.recorded = 0
+        self.dropped = 0
+        self.error = None
+
+    def start(self):
+        if self.jsonl:
+            opener = gzip.open if self.path.endswith(".gz") else open
+            self.f = opener(self.path, "at", encoding="utf-8")
+        else:
+            self.f = open(self.path, "ab")
+            if self.f.tell() == 0:
+                self.f.write(MAGIC)
+        self.thread = threading.Thread(target=self.writer, name="session-recorder", daemon=True)
+        self.thread.start()
+        return self
+
+    def record(self, kind: str, data, t: float = None):
+        if self.closing:
+            # other threads may still report after close() began
+            return
+        try:
+            self.q.put_nowait((time.time() if t is None else t, kind, data))
+        except queue.Full:
+            self.dropped += 1
+
+    def record_detection(self, det, size, angles=None, t: float = None):
+        x1, y1, x2, y2, conf = det[:5]
+        data = {"box": [int(x1), int(y1), int(x2), int(y2)], "conf": round(float(conf), 4),
+                "size": [int(size[0]), int(size[1])]}
+        if angles is not None:
+            data["angles"] = [round(float(a), 3) for a in angles]
+        self.record(DET, data, t)
+
+    # ----- AsyncLink hooks (called on the link's loop thread)
+    def attach(self, link):
+        self.link = link
+        link.add_tx_listener(self.on_tx)
+        link.add_line_listener(self.on_rx)
+        link.add_state_listener(self.on_state)
+
+    def detach(self):
+        if self.link is not None:
+            self.link.remove_tx_listener(self.on_tx)
+            self.link.remove_line_listener(self.on_rx)
+            self.link.remove_state_listener(self.on_state)
+            self.link = None
+
+    def on_tx(self, data: bytes):
+        self.record(TX, data)
+
+    def on_rx(self, line: str):
+        self.record(RX, line)
+
+    def on_state(self, state: str, info: str):
+        self.record(STATE, f"{state};{info}" if info else state)
+
+    # ----- writer thread
+    def writer(self):
+        last_flush = time.monotonic()
+        done = False
+        while not done:
+            try:
+                batch = [self.q.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self.q.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                # anything queued behind the close sentinel is dropped
+                batch = batch[:batch.index(None)]
+                done = True
+            try:
+                self.write_batch(batch)
+                now = time.monotonic()
+                if done or now - last_flush >= self.flush_interval:
+                    self.f.flush()
+                    last_flush = now
+            except Exception as e:
+                self.error = str(e)
+                self.dropped += len(batch)
+        self.f.close()
+
+    def write_batch(self, batch):
+        if not batch:
+            return
+        if self.jsonl:
+            self.f.write("".join(jsonl_record(t, k, d) + "\n" for t, k, d in batch))
+        else:
+            parts = []
+            for t, k, d in batch:
+                payload = encode_payload(k, d)
+                parts.append(RECORD.pack(RECORD.size - 4 + len(payload), t, KIND_CODES[k]))
+                parts.append(payload)
+            self.f.write(b"".join(parts))
+        self.recorded += len(batch)
+
+    def close(self, timeout: float = 2.0):
+        self.detach()
+        self.closing = True
+        if self.thread is None:
+            return
+        self.q.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+
+def read_session(path: str):
+    # -> iterator of (t, kind, data); TX data is bytes, DET a dict, else str
+    if is_jsonl(path):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    rec = json.loads(line)
+                    kind, data = rec["k"], rec["d"]
+                    if kind == TX:
+                        data = bytes.fromhex(data["hex"]) if isinstance(data, dict) else data.encode("utf-8")
+                    yield rec["t"], kind, data
+            except (EOFError, ValueError):
+                # a crash leaves a truncated gzip member / last line
+                pass
+        return
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a session file")
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                break
+            body_len, t, code = RECORD.unpack(head)
+            payload = f.read(body_len - (RECORD.size - 4))
+            if len(payload) < body_len - (RECORD.size - 4):
+                break
+            kind = CODE_KINDS.get(code)
+            if kind is None:
+                continue
+            if kind == TX:
+                data = payload
+            elif kind == DET:
+                data = json.loads(payload.decode("utf-8"))
+            else:
+                data = payload.decode("utf-8", errors="replace")
+            yield t, kind, data
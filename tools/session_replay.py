@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+
+from defaults import log
+from session import DET, RX, TX, read_session
+from tcp_link import AsyncLink
+
+
+class Pacer:
+    # Sleeps so event t is replayed at start + (t - t0) / speed; speed 0 = no waiting.
+    def __init__(self, speed: float):
+        self.speed = speed
+        self.t0 = None
+        self.start = None
+
+    def delay(self, t: float) -> float:
+        if self.speed <= 0:
+            return 0.0
+        if self.t0 is None:
+            self.t0, self.start = t, time.perf_counter()
+            return 0.0
+        return self.start + (t - self.t0) / self.speed - time.perf_counter()
+
+    def wait(self, t: float):
+        d = self.delay(t)
+        if d > 0:
+            time.sleep(d)
+
+
+def dump(path: str, kinds) -> int:
+    counts = Counter()
+    t0 = None
+    for t, kind, data in read_session(path):
+        counts[kind] += 1
+        if kind not in kinds:
+            continue
+        t0 = t if t0 is None else t0
+        if isinstance(data, bytes):
+            try:
+                data = data.decode("ascii").rstrip("\n")
+            except UnicodeDecodeError:
+                data = "0x" + data.hex()
+        log(f"{t - t0:10.3f} [{kind.upper()}] {data}")
+    log(f"[REPLAY] {dict(counts)}")
+    return 0
+
+
+def replay_to(path: str, host: str, port: int, speed: float, settle: float) -> int:
+    # act as the client: resend every recorded TX payload to a board / emulator
+    rx = Counter()
+
+    def on_line(line):
+        rx["ACK" if line.startswith(("ACK", "A:")) else line.split(";")[0]] += 1
+
+    link = AsyncLink(on_line=on_line, reconnect=False)
+    if not link.connect(host, port).result():
+        log(f"[NET] Connect error: {host}:{port}")
+        link.close()
+        return 1
+    pacer = Pacer(speed)
+    sent = recorded_rx = 0
+    t_start = time.perf_counter()
+    try:
+        for t, kind, data in read_session(path):
+            if kind == RX:
+                recorded_rx += 1
+            if kind != TX:
+                continue
+            pacer.wait(t)
+            if not link.active:
+                log("[NET] Disconnected.")
+                break
+            # block rather than drop: a replay should deliver everything
+            while not link.send(data) and link.active:
+                time.sleep(0.001)
+            sent += 1
+        deadline = time.perf_counter() + settle
+        while link.connected and (link.pending() or sum(rx.values()) < recorded_rx) \
+                and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = max(1e-6, time.perf_counter() - t_start)
+        link.close()
+    log(f"[REPLAY] sent={sent} in {elapsed:.2f}s ({sent / elapsed:.1f}/s) "
+        f"replies={dict(rx)} recorded_rx={recorded_rx}")
+    return 0
+
+
+async def serve_rx(path: str, host: str, port: int, speed: float, once: bool):
+    # act as the board: feed the recorded RX lines to whichever client connects
+    events = [(t, data) for t, kind, data in read_session(path) if kind == RX]
+    done = asyncio.Event()
+
+    async def handle(reader, writer):
+        log(f"[REPLAY] client {writer.get_extra_info('peername')}, {len(events)} lines")
+        pacer = Pacer(speed)
+        try:
+            for t, line in events:
+                d = pacer.delay(t)
+                if d > 0:
+                    await asyncio.sleep(d)
+                writer.write((line + "\r\n").encode("utf-8"))
+                await writer.drain()
+        except Exception as e:
+            log(f"[REPLAY] {e}")
+        finally:
+            writer.close()
+            if once:
+                done.set()
+
+    server = await asyncio.start_server(handle, host, port)
+    log(f"[REPLAY] serving RX on {host}:{port}")
+    async with server:
+        if once:
+            await done.wait()
+        else:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Inspect or replay a recorded session.")
+    p.add_argument("path", help="session file (.bses or .jsonl[.gz])")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--to", metavar="HOST:PORT", help="resend recorded TX to a board or fw_emulator.py")
+    g.add_argument("--serve", type=int, metavar="PORT", help="play recorded RX to a connecting client")
+    p.add_argument("--bind", default="127.0.0.1", help="address for --serve")
+    p.add_argument("--once", action="store_true", help="with --serve: exit after one client")
+    p.add_argument("--speed", type=float, default=1.0, help="1 = recorded timing, 0 = as fast as possible")
+    p.add_argument("--settle", type=float, default=2.0, help="seconds to wait for replies at the end")
+    p.add_argument("--kinds", nargs="+", default=[TX, RX, DET], help="event kinds to print")
+    args = p.parse_args(argv)
+
+    try:
+        if args.to:
+            host, _, port = args.to.rpartition(":")
+            return replay_to(args.path, host or "127.0.0.1", int(port), args.speed, args.settle)
+        if args.serve:
+            asyncio.run(serve_rx(args.path, args.bind, args.serve, args.speed, args.once))
+            return 0
+        return dump(args.path, set(args.kinds))
+    except (OSError, ValueError) as e:
+        log(f"[REPLAY] {e}")
+        return 1
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import glob
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+from perf import PERF
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+FPS_DEFAULT = 30.0
+PREFETCH = 4
+
+DROP = "drop"
+BLOCK = "block"
+POLICIES = (DROP, BLOCK)
+
+CAMERA = "camera"
+IMAGES = "images"
+VIDEO = "video"
+STREAM = "stream"
+
+# index: position in the source (frame number for files)
+# pts:   media time in seconds (index / fps for files, from start for live)
+# ts:    wall clock when the frame was decoded (paced files: when it was due)
+Frame = namedtuple("Frame", "index pts ts image")
+
+
+def source_kind(spec: str) -> str:
+    # integer = camera index, directory = images, scheme:// = stream,
+    # anything else is a video file
+    spec = str(spec)
+    if spec.isdigit():
+        return CAMERA
+    if os.path.isdir(spec):
+        return IMAGES
+    if "://" in spec and not spec.startswith("file://"):
+        return STREAM
+    return VIDEO
+
+
+class ImageDirSource:
+    # Same read()/release() surface as cv2.VideoCapture over a sorted image
+    # directory. reduce=2/4/8 decodes at 1/n size (cv2.IMREAD_REDUCED_*),
+    # which is far cheaper than decoding full size and resizing.
+    def __init__(self, path: str, reduce: int = 1):
+        self.files = sorted(f for f in glob.glob(os.path.join(path, "*")) if f.lower().endswith(IMAGE_EXTS))
+        self.pos = 0
+        self.flags = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                      8: cv2.IMREAD_REDUCED_COLOR_8}.get(reduce, cv2.IMREAD_COLOR)
+
+    def isOpened(self) -> bool:
+        return len(self.files) > 0
+
+    def read(self):
+        while self.pos < len(self.files):
+            frame = cv2.imread(self.files[self.pos], self.flags)
+            self.pos += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def seek(self, index: int):
+        self.pos = min(max(0, int(index)), len(self.files))
+
+    def __len__(self):
+        return len(self.files)
+
+    def release(self):
+        self.files = []
+
+
+class FrameSource:
+    # One decode thread per source feeding a bounded prefetch buffer.
+    #   policy "drop":  a full buffer loses its oldest frame (live sources:
+    #                   the consumer always gets the newest frames)
+    #   policy "block": the decoder waits for the consumer (files: every
+    #                   frame is delivered, runs are repeatable)
+    # Files can be paced to their frame rate (realtime=True) or decoded as
+    # fast as they are consumed, and seek() is frame-accurate. max_width
+    # downscales in the decode thread (image directories decode reduced).
+    # read() keeps the cv2.VideoCapture contract; read_frame() also gives
+    # the frame's index and timestamps.
+    def __init__(self, spec, prefetch: int = PREFETCH, policy: str = None, max_width: int = 0,
+                 realtime: bool = False, loop: bool = False, fps: float = None):
+        if cv2 is None:
+            raise RuntimeError("opencv-python not installed. Install: pip install opencv-python")
+        self.spec = str(spec)
+        self.kind = source_kind(self.spec)
+        self.live = self.kind in (CAMERA, STREAM)
+        self.policy = policy or (DROP if self.live else BLOCK)
+        if self.policy not in POLICIES:
+            raise ValueError(f"unknown policy {self.policy!r}, expected one of {POLICIES}")
+        self.max_width = int(max_width or 0)
+        self.realtime = realtime
+        self.loop = loop
+
+        self.cap = self.open()
+        reported = 0.0 if self.kind == IMAGES else (self.cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        # fps: rate for sources that do not report one (image directories)
+        self.fps = float(reported if 0 < reported < 1000 else (fps or FPS_DEFAULT))
+        self.frame_count = self.count_frames()
+
+        self.buf = deque()
+        self.capacity = max(1, int(prefetch))
+        self.cond = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.eof = False
+        self.pending_seek = None
+        self.index = 0
+        self.t0 = None
+
+        self.decoded = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def open(self):
+        if self.kind == CAMERA:
+            return cv2.VideoCapture(int(self.spec))
+        if self.kind == IMAGES:
+            return ImageDirSource(self.spec, self.reduce_factor())
+        path = self.spec[len("file://"):] if self.spec.startswith("file://") else self.spec
+        return cv2.VideoCapture(path)
+
+    def reduce_factor(self) -> int:
+        # largest 1/n decode that stays at or above max_width
+        if not self.max_width or self.kind != IMAGES:
+            return 1
+        probe = ImageDirSource(self.spec)
+        ok, frame = probe.read()
+        if not ok:
+            return 1
+        w = frame.shape[1]
+        for n in (8, 4, 2):
+            if w // n >= self.max_width:
+                return n
+        return 1
+
+    def count_frames(self) -> int:
+        if self.kind == IMAGES:
+            return len(self.cap)
+        if self.kind == VIDEO:
+            return max(0, int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0))
+        return 0
+
+    def isOpened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    # ----- decode thread
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.decode_loop, name=f"decode-{self.kind}", daemon=True)
+            self.thread.start()
+        return self
+
+    def decode_loop(self):
+        while not self.stop_event.is_set():
+            with self.cond:
+                target = self.pending_seek
+                self.pending_seek = None
+            if target is not None:
+                self.seek_capture(target)
+            t_read = PERF.now()
+            ok, image = self.cap.read()
+            if not ok:
+                if self.live:
+                    time.sleep(0.005)
+                    continue
+                if self.loop and self.decoded:
+                    self.seek_capture(0)
+                    continue
+                with self.cond:
+                    if self.pending_seek is not None:
+                        continue
+                    self.eof = True
+                    self.cond.notify_all()
+                    self.cond.wait_for(lambda: self.pending_seek is not None or self.stop_event.is_set())
+                continue
+            PERF.since("decode", t_read)
+            if self.t0 is None:
+                self.t0 = time.time()
+            index = self.index
+            self.index += 1
+            pts = index / self.fps
+            if self.realtime and not self.live:
+                # play files at their own rate
+                delay = self.t0 + pts - time.time()
+                if delay > 0 and self.stop_event.wait(delay):
+                    break
+            now = time.time()
+            if self.live:
+                pts = now - self.t0
+            if self.max_width and image.shape[1] > self.max_width:
+                h = max(1, round(image.shape[0] * self.max_width / image.shape[1]))
+                image = cv2.resize(image, (self.max_width, h), interpolation=cv2.INTER_AREA)
+            self.decoded += 1
+            self.put(Frame(index, pts, now, image))
+
+    def put(self, frame: Frame):
+        with self.cond:
+            if self.policy == BLOCK:
+                self.cond.wait_for(lambda: len(self.buf) < self.capacity or self.stop_event.is_set()
+                                   or self.pending_seek is not None)
+            if self.pending_seek is not None:
+                # decoded before the seek: stale
+                return
+            if len(self.buf) >= self.capacity:
+                self.buf.popleft()
+                self.dropped += 1
+            self.buf.append(frame)
+            self.cond.notify_all()
+
+    def seek_capture(self, index: int):
+        # decode thread. Container seeks land on keyframes for some codecs,
+        # so check where the backend ended up and decode forward from the
+        # start when it is not exactly at index.
+        index = max(0, int(index))
+        if self.kind == IMAGES:
+            self.cap.seek(index)
+        elif not (self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                  and int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) == index):
+            self.cap.release()
+            self.cap = self.open()
+            for _ in range(index):
+                if not self.cap.grab():
+                    break
+        self.index = index
+        self.t0 = time.time() - index / self.fps
+
+    # ----- consumer side
+    def read_frame(self, timeout: float = None):
+        # -> Frame, or None at the end of a file / on timeout
+        if self.thread is None:
+            self.start()
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.buf or (self.eof and self.pending_seek is None)
+                                      or self.stop_event.is_set(), timeout):
+                return None
+            if not self.buf:
+                return None
+            frame = self.buf.popleft()
+            self.delivered += 1
+            self.cond.notify_all()
+            return frame
+
+    def read(self):
+        frame = self.read_frame()
+        return (True, frame.image) if frame is not None else (False, None)
+
+    def seek(self, index: int):
+        if self.live:
+            raise ValueError("live sources cannot seek")
+        with self.cond:
+            self.buf.clear()
+            self.eof = False
+            self.pending_seek = int(index)
+            self.cond.notify_all()
+
+    def release(self):
+        self.stop_event.set()
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(2.0)
+        self.thread = None
+        if self.cap is not None:
+            self.cap.release()
+
+    def stats(self) -> dict:
+        return {"kind": self.kind, "fps": self.fps, "frames": self.frame_count, "decoded": self.decoded,
+                "delivered": self.delivered, "dropped": self.dropped, "buffered": len(self.buf)}
@@ -0,0 +1,317 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+from batching import BatchInferenceEngine
+from defaults import BACKENDS, CONF_DEFAULT, IMGSZ_DEFAULT, PHONE_CLASS, PORT_DEFAULT, log
+from detectors import load_detector
+from estimator import TargetEstimator
+from projection import Projector
+from protocol import BIN_ACK_PREFIX, TargetChannel
+from send_rate import SendScheduler
+from sources import FrameSource
+from tcp_link import CONNECTED, DISCONNECTED, FAILED, RECONNECTING, AsyncLink
+from vision import box_center
+
+LATENCY_WINDOW = 200
+
+
+class Board:
+    # One camera feeding one board. The capture thread submits at most one
+    # frame at a time to the shared engine (newest frame wins while a
+    # detection is in flight), results come back on the engine thread and
+    # are turned into angles and sent on this board's own link.
+    def __init__(self, name: str, source: str, host: str = None, port: int = PORT_DEFAULT,
+                 rate: float = 5.0, projector: Projector = None, text_only: bool = False,
+                 reconnect: bool = True, loop: bool = False):
+        self.name = name
+        self.source = source
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / max(0.1, float(rate))
+        self.projector = projector or Projector()
+        self.loop = loop
+        self.engine = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.inflight = None
+        self.lock = threading.Lock()
+        self.scheduler = SendScheduler()
+        self.estimator = TargetEstimator()
+
+        self.link = None
+        self.channel = None
+        if host:
+            self.link = AsyncLink(on_line=self.on_line, on_state=self.on_state, reconnect=reconnect)
+            self.channel = TargetChannel(self.link, prefer_binary=not text_only)
+        self.state = DISCONNECTED if host else "offline"
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {"frames": 0, "submitted": 0, "busy": 0, "detections": 0, "sends": 0,
+                       "acks": 0, "errors": 0}
+        self.finished = False
+
+    # ----- link
+    def on_line(self, line: str):
+        if line.startswith(("ACK", BIN_ACK_PREFIX)):
+            self.counts["acks"] += 1
+        elif line.startswith("ERR"):
+            self.counts["errors"] += 1
+
+    def on_state(self, state: str, info: str):
+        self.state = state
+        if state == CONNECTED:
+            self.scheduler.reset()
+        if state in (RECONNECTING, FAILED):
+            log(f"[{self.name}] {state} {info}".rstrip())
+
+    # ----- lifecycle
+    def start(self, engine):
+        self.engine = engine
+        if self.link is not None:
+            self.link.connect(self.host, self.port)
+        self.thread = threading.Thread(target=self.capture_loop, name=f"capture-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(2.0)
+            self.thread = None
+        if self.link is not None:
+            self.link.close()
+
+    def capture_loop(self):
+        # files play at their own frame rate
+        src = FrameSource(self.source, realtime=True, loop=self.loop)
+        if not src.isOpened():
+            log(f"[{self.name}] Cannot open source {self.source}")
+            src.release()
+            self.finished = True
+            return
+        last_submit = 0.0
+        try:
+            while not self.stop_event.is_set():
+                item = src.read_frame(timeout=0.5)
+                if item is None:
+                    if src.live:
+                        continue
+                    break
+                self.counts["frames"] += 1
+                now = time.monotonic()
+                if now - last_submit < self.interval:
+                    continue
+                with self.lock:
+                    if self.inflight is not None and not self.inflight.done():
+                        self.counts["busy"] += 1
+                        continue
+                    last_submit = now
+                    frame = item.image
+                    size = (frame.shape[1], frame.shape[0])
+                    self.counts["submitted"] += 1
+                    self.inflight = self.engine.submit(
+                        frame, ts=item.ts, source=self.name,
+                        callback=lambda f, sz=size: self.on_result(f, sz))
+        finally:
+            src.release()
+            self.finished = True
+
+    # ----- engine thread
+    def on_result(self, fut, size):
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        ts, det = fut.result()
+        self.latencies.append(time.time() - ts)
+        if det is None:
+            return
+        self.counts["detections"] += 1
+        if self.channel is None:
+            return
+        self.estimator.update(*box_center(det), ts)
+        rtt = self.channel.rtt
+        predicted = self.estimator.predict(time.time() + (rtt / 2 if rtt else 0.0))
+        if predicted is None:
+            return
+        cx, cy = predicted
+        angle_x, angle_y = self.projector.angles(cx, cy, size[0], size[1])
+        now = time.monotonic()
+        # swap axes to match Processing expectations
+        if not self.scheduler.due(angle_y, angle_x, now, rtt=self.channel.rtt, backlog=self.link.pending()):
+            return
+        if self.channel.send_target(angle_y, angle_x):
+            self.scheduler.sent(angle_y, angle_x, now)
+            self.counts["sends"] += 1
+
+    def stats(self) -> dict:
+        lat = sorted(self.latencies)
+        out = dict(self.counts)
+        out.update(name=self.name, source=self.source, state=self.state,
+                   board=f"{self.host}:{self.port}" if self.host else None,
+                   reconnects=self.link.reconnects if self.link else 0,
+                   skipped=self.scheduler.suppressed,
+                   ack_rtt_ms=1000 * self.channel.rtt if self.channel and self.channel.rtt else None,
+                   det_latency_p50_ms=1000 * lat[len(lat) // 2] if lat else None,
+                   det_latency_p95_ms=1000 * lat[int(len(lat) * 0.95)] if lat else None)
+        return out
+
+
+class Supervisor:
+    # N camera -> board pairs sharing one detector through one
+    # BatchInferenceEngine: the model is loaded once and frames from all
+    # cameras that are ready at the same time go through one predict().
+    def __init__(self, detector, boards, batch_size: int = None, deadline_ms: float = 20.0,
+                 conf: float = CONF_DEFAULT, classes=(PHONE_CLASS,)):
+        self.detector = detector
+        self.boards = list(boards)
+        self.engine = BatchInferenceEngine(detector, batch_size=batch_size or max(1, len(self.boards)),
+                                           deadline_ms=deadline_ms, conf=conf, classes=classes)
+        self.t_start = None
+
+    def start(self):
+        self.engine.start()
+        self.t_start = time.time()
+        for b in self.boards:
+            b.start(self.engine)
+        return self
+
+    def stop(self):
+        for b in self.boards:
+            b.stop_event.set()
+        for b in self.boards:
+            b.stop()
+        self.engine.stop()
+
+    def done(self) -> bool:
+        return all(b.finished for b in self.boards)
+
+    def stats(self) -> dict:
+        return {"elapsed_s": time.time() - self.t_start if self.t_start else 0.0,
+                "engine": self.engine.stats(), "boards": [b.stats() for b in self.boards]}
+
+
+def parse_board(spec: str) -> dict:
+    # NAME=SOURCE[@HOST[:PORT]]
+    name, sep, rest = spec.partition("=")
+    if not sep:
+        raise ValueError(f"bad --board {spec!r}, expected NAME=SOURCE[@HOST[:PORT]]")
+    source, _, addr = rest.rpartition("@") if "@" in rest else (rest, "", "")
+    host, _, port = addr.partition(":")
+    return {"name": name, "source": source, "host": host or None, "port": int(port) if port else PORT_DEFAULT}
+
+
+def config_board(entry, i: int) -> dict:
+    # one --config entry: source is required, name defaults to board<i>
+    if not isinstance(entry, dict):
+        raise ValueError(f"config entry {i}: expected an object, got {type(entry).__name__}")
+    if "source" not in entry:
+        raise ValueError(f"config entry {i}: missing \"source\"")
+    return {"name": f"board{i}", **entry}
+
+
+def print_stats(st: dict):
+    e = st["engine"]
+    log(f"[SUP] {st['elapsed_s']:.0f}s batches={e['batches']} avg_batch={e['avg_batch']:.2f} dropped={e['dropped']}")
+    for b in st["boards"]:
+        lat = b["det_latency_p50_ms"]
+        log(f"  {b['name']:10s} {b['state']:12s} frames={b['frames']} det={b['detections']} "
+            f"sent={b['sends']} skipped={b['skipped']} ack={b['acks']} err={b['errors']} busy={b['busy']} "
+            f"reconn={b['reconnects']} lat50={'-' if lat is None else f'{lat:.0f}ms'}")
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Several camera -> board pairs sharing one detector.")
+    p.add_argument("--board", action="append", default=[], metavar="NAME=SOURCE[@HOST[:PORT]]",
+                   help="camera index, video file/URL or image directory, and the board it drives")
+    p.add_argument("--config", help="JSON list of boards: source, name (default board<i>), host, port, rate, "
+                                     "hfov, vfov, calib")
+    p.add_argument("--model", default="yolo11n.pt")
+    p.add_argument("--backend", choices=BACKENDS, default="auto")
+    p.add_argument("--imgsz", type=int, default=IMGSZ_DEFAULT)
+    p.add_argument("--conf", type=float, default=CONF_DEFAULT)
+    p.add_argument("--classes", type=int, nargs="+", default=[PHONE_CLASS])
+    p.add_argument("--batch", type=int, default=0, help="max frames per predict() (default: number of boards)")
+    p.add_argument("--workers", type=int, default=0, metavar="N", help="run the detector in N processes")
+    p.add_argument("--deadline-ms", type=float, default=20.0)
+    p.add_argument("--rate", type=float, default=5.0, help="default detection / send rate per board")
+    p.add_argument("--hfov", type=float, default=90.0)
+    p.add_argument("--vfov", type=float, default=30.0)
+    p.add_argument("--text-only", action="store_true")
+    p.add_argument("--no-reconnect", action="store_true")
+    p.add_argument("--loop", action="store_true", help="restart file sources at the end")
+    p.add_argument("--stats", type=float, default=5.0, metavar="S", help="print per-board stats every S seconds")
+    p.add_argument("--stats-json", metavar="PATH", help="write the final stats as JSON")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if cv2 is None:
+        log("[CAM] opencv-python not installed. Install: pip install opencv-python-headless")
+        return 2
+    try:
+        specs = [parse_board(s) for s in args.board]
+        if args.config:
+            with open(args.config) as f:
+                entries = json.load(f)
+            if not isinstance(entries, list):
+                raise ValueError(f"{args.config}: expected a JSON list of boards")
+            specs += [config_board(e, i) for i, e in enumerate(entries)]
+    except (OSError, ValueError) as e:
+        log(f"[SUP] {e}")
+        return 2
+    if not specs:
+        log("[SUP] No boards: use --board or --config.")
+        return 2
+
+    try:
+        detector = load_detector(args.model, backend=args.backend, workers=args.workers, conf=args.conf,
+                                 classes=args.classes, imgsz=args.imgsz)
+    except Exception as e:
+        log(f"[YOLO] Failed to load model: {e}")
+        return 2
+    log(f"[YOLO] Loaded model once for {len(specs)} boards: {args.model} ({detector.name})")
+
+    boards = []
+    for s in specs:
+        hfov, vfov = s.get("hfov", args.hfov), s.get("vfov", args.vfov)
+        proj = Projector.from_file(s["calib"], hfov, vfov) if s.get("calib") else Projector(hfov=hfov, vfov=vfov)
+        boards.append(Board(s["name"], str(s["source"]), s.get("host"), int(s.get("port", PORT_DEFAULT)),
+                            rate=s.get("rate", args.rate), projector=proj, text_only=args.text_only,
+                            reconnect=not args.no_reconnect, loop=args.loop))
+
+    sup = Supervisor(detector, boards, batch_size=args.batch or max(len(boards), args.workers), deadline_ms=args.deadline_ms,
+                     conf=args.conf, classes=args.classes).start()
+    next_stats = time.time() + args.stats
+    try:
+        while not sup.done():
+            time.sleep(0.1)
+            if args.stats > 0 and time.time() >= next_stats:
+                print_stats(sup.stats())
+                next_stats += args.stats
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # let queued packets go out
+        deadline = time.time() + 1.0
+        while any(b.link and b.link.connected and b.link.pending() for b in boards) \
+                and time.time() < deadline:
+            time.sleep(0.01)
+        st = sup.stats()
+        sup.stop()
+        detector.close()
+    print_stats(st)
+    if args.stats_json:
+        with open(args.stats_json, "w") as f:
+            json.dump(st, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
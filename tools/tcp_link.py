@@ -0,0 +1,359 @@
+import asyncio
+import random
+import threading
+from collections import OrderedDict, deque
+
+CONNECT_TIMEOUT = 5.0
+SEND_QUEUE_SIZE = 64
+OUTBOX_SIZE = 32
+MAX_LINE = 4096
+
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 10.0
+BACKOFF_FACTOR = 2.0
+BACKOFF_JITTER = 0.3
+
+# connection states reported through on_state(state, info)
+CONNECTING = "connecting"
+CONNECTED = "connected"
+DISCONNECTED = "disconnected"
+RECONNECTING = "reconnecting"
+FAILED = "failed"
+
+
+def backoff_delay(attempt: int, initial: float = BACKOFF_INITIAL, maximum: float = BACKOFF_MAX,
+                  factor: float = BACKOFF_FACTOR, jitter: float = BACKOFF_JITTER, rnd=random.random) -> float:
+    # Exponential backoff capped at maximum, spread by +/- jitter so several
+    # clients do not hammer the AP in lock step.
+    base = min(maximum, initial * factor ** max(0, attempt - 1))
+    return max(0.0, base * (1.0 - jitter + 2.0 * jitter * rnd()))
+
+
+class AsyncLink:
+    # Line-framed TCP client on its own asyncio loop thread.
+    # All public methods are thread-safe and never block the caller:
+    #   connect()/disconnect() schedule work on the loop,
+    #   send() enqueues onto a bounded queue drained by a writer task that
+    #   awaits drain() (backpressure), and received lines are delivered via
+    #   on_line(line). Callbacks run on the loop thread; GUIs hand them to
+    #   Tk through their queue.Queue.
+    # With reconnect on, connect() starts a supervisor that reopens the link
+    # with jittered exponential backoff after EOF/errors until disconnect().
+    # While it is down, send() parks packets in a bounded outbox; packets
+    # sent with a key (e.g. "center") keep only their newest value.
+    def __init__(self, on_line=None, on_state=None, queue_size: int = SEND_QUEUE_SIZE,
+                 reconnect: bool = True, outbox_size: int = OUTBOX_SIZE,
+                 backoff_initial: float = BACKOFF_INITIAL, backoff_max: float = BACKOFF_MAX,
+                 backoff_factor: float = BACKOFF_FACTOR, backoff_jitter: float = BACKOFF_JITTER):
+        self.on_line = on_line
+        self.on_state = on_state
+        self.listeners = []
+        self.line_listeners = []
+        self.tx_listeners = []
+        self.queue_size = max(1, int(queue_size))
+
+        self.reconnect = reconnect
+        self.backoff = (backoff_initial, backoff_max, backoff_factor, backoff_jitter)
+        self.supervisor = None
+        self.session_done = None
+        self.attempt = 0
+        self.reconnects = 0
+        self.outbox = deque(maxlen=max(1, int(outbox_size)))
+        self.outbox_latest = OrderedDict()
+
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+
+        self.state = DISCONNECTED
+        self.peer = None
+        self.reader = None
+        self.writer = None
+        self.send_q = None
+        self.tasks = []
+        self.session = None
+
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    # ----- loop thread
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return self
+        self.ready.clear()
+        self.thread = threading.Thread(target=self.run_loop, name="tcp-link", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def close(self, timeout: float = 2.0):
+        if not self.loop or not self.thread:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.stop_session(), self.loop).result(timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.thread = None
+
+    # ----- public, thread-safe
+    @property
+    def connected(self) -> bool:
+        return self.state == CONNECTED
+
+    @property
+    def active(self) -> bool:
+        # connected, or down but the supervisor is still trying
+        sup = self.supervisor
+        return self.connected or (sup is not None and not sup.done())
+
+    def add_state_listener(self, fn):
+        # extra on_state-style callbacks, called on the loop thread
+        self.listeners.append(fn)
+
+    def remove_state_listener(self, fn):
+        if fn in self.listeners:
+            self.listeners.remove(fn)
+
+    def add_line_listener(self, fn):
+        # extra on_line-style callbacks, called on the loop thread
+        self.line_listeners.append(fn)
+
+    def remove_line_listener(self, fn):
+        if fn in self.line_listeners:
+            self.line_listeners.remove(fn)
+
+    def add_tx_listener(self, fn):
+        # fn(data: bytes) after each write, called on the loop thread
+        self.tx_listeners.append(fn)
+
+    def remove_tx_listener(self, fn):
+        if fn in self.tx_listeners:
+            self.tx_listeners.remove(fn)
+
+    def connect(self, host: str, port: int, timeout: float = CONNECT_TIMEOUT):
+        # -> concurrent.futures.Future resolving to the first attempt's True/False
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self.start_session(host, port, timeout), self.loop)
+
+    def disconnect(self):
+        if self.loop and self.thread:
+            return asyncio.run_coroutine_threadsafe(self.stop_session(), self.loop)
+        return None
+
+    def send(self, line: str, drop_oldest: bool = False, key=None) -> bool:
+        # False when the link is down for good or the queue is full
+        # (and drop_oldest is off); True when sent or parked in the outbox.
+        if self.loop is None or not self.active:
+            return False
+        data = line if isinstance(line, bytes) else line.encode("utf-8")
+        q = self.send_q
+        if q is not None and q.qsize() >= self.queue_size and not drop_oldest:
+            self.dropped += 1
+            return False
+        self.loop.call_soon_threadsafe(self.enqueue, q, data, drop_oldest, key)
+        return True
+
+    def pending(self) -> int:
+        q = self.send_q
+        return q.qsize() if q is not None else 0
+
+    # ----- loop side
+    def set_state(self, state: str, info: str = ""):
+        self.state = state
+        for fn in [self.on_state] + self.listeners:
+            if fn is None:
+                continue
+            try:
+                fn(state, info)
+            except Exception:
+                pass
+
+    def park(self, data: bytes, key):
+        if key is None:
+            if len(self.outbox) == self.outbox.maxlen:
+                self.dropped += 1
+            self.outbox.append(data)
+            return
+        if key in self.outbox_latest:
+            self.dropped += 1
+            del self.outbox_latest[key]
+        self.outbox_latest[key] = data
+
+    def flush_outbox(self):
+        q = self.send_q
+        pending = list(self.outbox) + list(self.outbox_latest.values())
+        self.outbox.clear()
+        self.outbox_latest.clear()
+        for data in pending:
+            self.enqueue(q, data, True, None)
+
+    def enqueue(self, q, data: bytes, drop_oldest: bool, key=None):
+        if q is None or q is not self.send_q:
+            # link went down in between: keep it for the next session
+            if self.supervisor is not None and not self.supervisor.done():
+                self.park(data, key)
+            return
+        if q.full():
+            if not drop_oldest:
+                self.dropped += 1
+                return
+            q.get_nowait()
+            self.dropped += 1
+        q.put_nowait(data)
+
+    async def start_session(self, host: str, port: int, timeout: float) -> bool:
+        await self.stop_session()
+        self.outbox.clear()
+        self.outbox_latest.clear()
+        first = self.loop.create_future()
+        self.supervisor = asyncio.ensure_future(self.supervise(host, port, timeout, first))
+        # a disconnect()/connect() during the first attempt cancels the
+        # supervisor, possibly before it ever ran: the caller gets False
+        self.supervisor.add_done_callback(lambda _: first.done() or first.set_result(False))
+        return await first
+
+    async def stop_session(self):
+        sup, self.supervisor = self.supervisor, None
+        if sup is not None and sup is not asyncio.current_task():
+            sup.cancel()
+            try:
+                await sup
+            except BaseException:
+                pass
+        await self.teardown(None)
+        if self.state != DISCONNECTED:
+            self.set_state(DISCONNECTED, "")
+
+    async def supervise(self, host: str, port: int, timeout: float, first):
+        self.attempt = 0
+        while True:
+            error = await self.open(host, port, timeout)
+            if not first.done():
+                first.set_result(error is None)
+            if error is None:
+                if self.attempt:
+                    self.reconnects += 1
+                self.attempt = 0
+                self.flush_outbox()
+                await self.session_done.wait()
+            if not self.reconnect:
+                if error is not None:
+                    self.set_state(FAILED, error)
+                break
+            self.attempt += 1
+            delay = backoff_delay(self.attempt, *self.backoff)
+            info = f"retry {self.attempt} in {delay:.1f}s"
+            self.set_state(RECONNECTING, f"{error}; {info}" if error else info)
+            await asyncio.sleep(delay)
+        if self.supervisor is asyncio.current_task():
+            self.supervisor = None
+
+    async def open(self, host: str, port: int, timeout: float):
+        # -> None on success, error text otherwise
+        await self.teardown(None)
+        self.peer = (host, port)
+        self.set_state(CONNECTING, f"{host}:{port}")
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, limit=MAX_LINE), timeout)
+        except Exception as e:
+            return repr(e) if isinstance(e, asyncio.TimeoutError) else str(e)
+        self.reader, self.writer = reader, writer
+        self.send_q = asyncio.Queue(self.queue_size)
+        self.session_done = asyncio.Event()
+        self.session = object()
+        session = self.session
+        self.tasks = [
+            asyncio.ensure_future(self.rx_task(session)),
+            asyncio.ensure_future(self.tx_task(session)),
+        ]
+        self.set_state(CONNECTED, f"{host}:{port}")
+        return None
+
+    async def teardown(self, reason):
+        # cancel reader/writer tasks and close the socket; idempotent
+        if self.session is None and self.writer is None:
+            return
+        self.session = None
+        writer, self.writer, self.reader = self.writer, None, None
+        current = asyncio.current_task()
+        for t in self.tasks:
+            if t is not current:
+                t.cancel()
+        for t in self.tasks:
+            if t is not current:
+                try:
+                    await t
+                except BaseException:
+                    pass
+        self.tasks = []
+        self.send_q = None
+        if writer is not None:
+            try:
+                writer.close()
+                await asyncio.wait_for(writer.wait_closed(), 1.0)
+            except Exception:
+                pass
+        if self.session_done is not None:
+            self.session_done.set()
+        self.set_state(DISCONNECTED, reason or "")
+
+    async def rx_task(self, session):
+        reason = "EOF"
+        try:
+            while True:
+                try:
+                    raw = await self.reader.readline()
+                except ValueError:
+                    # line longer than MAX_LINE: drop what we have
+                    continue
+                if not raw:
+                    break
+                line = raw.replace(b"\r", b"").decode("utf-8", errors="replace").strip()
+                if line:
+                    self.received += 1
+                    for fn in [self.on_line] + self.line_listeners:
+                        if fn is None:
+                            continue
+                        try:
+                            fn(line)
+                        except Exception:
+                            pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            reason = f"RX error: {e}"
+        if self.session is session:
+            await self.teardown(reason)
+
+    async def tx_task(self, session):
+        reason = None
+        try:
+            while True:
+                data = await self.send_q.get()
+                self.writer.write(data)
+                await self.writer.drain()
+                self.sent += 1
+                for fn in self.tx_listeners:
+                    try:
+                        fn(data)
+                    except Exception:
+                        pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            reason = f"Send error: {e}"
+        if self.session is session:
+            await self.teardown(reason)
@@ -0,0 +1,346 @@
+import argparse
+import re
+import socket
+import sys
+import threading
+import time
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import serial
+except Exception:
+    serial = None
+
+# Serial CSV printed by loop() in src/main.cpp (115200 baud):
+#   t_ms,roll,pitch,yaw,rollQ,pitchQ,yawQ,spawnSet,spawnPitchQ,spawnYawQ,onTarget,msg,ip
+COLUMNS = ("t_ms", "roll", "pitch", "yaw", "rollQ", "pitchQ", "yawQ",
+           "spawnSet", "spawnPitchQ", "spawnYawQ", "onTarget")
+DTYPES = {"t_ms": "f8", "roll": "f4", "pitch": "f4", "yaw": "f4", "rollQ": "i2", "pitchQ": "i2",
+          "yawQ": "i2", "spawnSet": "u1", "spawnPitchQ": "i2", "spawnYawQ": "i2", "onTarget": "u1"}
+N_NUMERIC = len(COLUMNS)
+BAUD = 115200
+CAPACITY = 1 << 16
+CHUNK = 1 << 16
+
+# One regex pass per chunk picks out the well-formed data rows; the
+# header, "Client connected." and partial or garbled lines never match.
+NUM = rb"-?\d+(?:\.\d+)?"
+ROW = re.compile(rb"^(-?\d+(?:,%s){%d}),([^,\r\n]*),([^,\r\n]*)\r?$" % (NUM, N_NUMERIC - 1), re.M)
+
+
+def parse_chunk(buf: bytes):
+    # -> (values (n, 11) float64, msgs, ips, remainder); remainder is the
+    # trailing partial line to prepend to the next chunk
+    cut = buf.rfind(b"\n") + 1
+    body, rest = buf[:cut], buf[cut:]
+    rows = ROW.findall(body)
+    if not rows:
+        return np.empty((0, N_NUMERIC)), [], [], rest
+    # every field matched NUM, so the byte strings always convert
+    values = np.array(b",".join(r[0] for r in rows).split(b","), dtype="S").astype(np.float64)
+    return values.reshape(-1, N_NUMERIC), [r[1] for r in rows], [r[2] for r in rows], rest
+
+
+class TelemetryRing:
+    # Preallocated columnar ring buffer, one NumPy array per CSV column.
+    # extend() writes a whole parsed chunk with at most two slice copies;
+    # queries work on the last N samples or the last N seconds.
+    # Time is t_ms / 1000 as printed by the board (millis()); a board
+    # reset makes it go backwards, which clears the buffer.
+    def __init__(self, capacity: int = CAPACITY):
+        self.capacity = max(2, int(capacity))
+        self.cols = {c: np.zeros(self.capacity, DTYPES[c]) for c in COLUMNS}
+        self.t = np.zeros(self.capacity, np.float64)
+        self.msg_id = np.zeros(self.capacity, np.int16)
+        # host clock (time.time()) when the chunk holding the sample arrived
+        self.host_t = np.full(self.capacity, np.nan)
+        self.msgs = {}
+        self.msg_names = []
+        self.head = 0
+        self.count = 0
+        self.total = 0
+        self.resets = 0
+        self.last_ip = ""
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def msg_code(self, msg: bytes) -> int:
+        code = self.msgs.get(msg)
+        if code is None:
+            code = len(self.msg_names)
+            self.msgs[msg] = code
+            self.msg_names.append(msg.decode("utf-8", errors="replace"))
+        return code
+
+    def extend(self, values, msgs=(), ips=(), host_t: float = None):
+        n = len(values)
+        if not n:
+            return 0
+        t = values[:, 0] / 1000.0
+        with self.lock:
+            if self.count and t[0] < self.t[(self.head - 1) % self.capacity]:
+                self.clear_locked()
+                self.resets += 1
+            back = np.flatnonzero(np.diff(t) < 0)
+            if back.size:
+                # reset inside the chunk: keep what came after it
+                start = back[-1] + 1
+                values, t, msgs = values[start:], t[start:], msgs[start:]
+                n = len(values)
+                self.clear_locked()
+                self.resets += 1
+            if n > self.capacity:
+                values, t, msgs = values[-self.capacity:], t[-self.capacity:], msgs[-self.capacity:]
+                n = self.capacity
+            codes = np.fromiter((self.msg_code(m) for m in msgs), np.int16, n) if len(msgs) == n else None
+            first = min(n, self.capacity - self.head)
+            for dst_lo, src_lo, k in ((self.head, 0, first), (0, first, n - first)):
+                if k <= 0:
+                    continue
+                sl, src = slice(dst_lo, dst_lo + k), slice(src_lo, src_lo + k)
+                for i, c in enumerate(COLUMNS):
+                    self.cols[c][sl] = values[src, i]
+                self.t[sl] = t[src]
+                if codes is not None:
+                    self.msg_id[sl] = codes[src]
+                self.host_t[sl] = np.nan if host_t is None else host_t
+            self.head = (self.head + n) % self.capacity
+            self.count = min(self.capacity, self.count + n)
+            self.total += n
+            if ips:
+                self.last_ip = ips[-1].decode("utf-8", errors="replace")
+        return n
+
+    def clear(self):
+        with self.lock:
+            self.clear_locked()
+
+    def clear_locked(self):
+        self.head = 0
+        self.count = 0
+
+    def order(self):
+        # indices of the stored samples, oldest first
+        start = (self.head - self.count) % self.capacity
+        return (start + np.arange(self.count)) % self.capacity
+
+    def last(self, n: int = None) -> dict:
+        # -> copies of every column for the newest n samples (all if None), oldest first
+        with self.lock:
+            idx = self.order()
+            if n is not None:
+                idx = idx[-int(n):]
+            out = {c: self.cols[c][idx] for c in COLUMNS}
+            out["t"] = self.t[idx]
+            out["msg_id"] = self.msg_id[idx]
+            out["host_t"] = self.host_t[idx]
+        return out
+
+    def window(self, seconds: float) -> dict:
+        # -> columns for samples within `seconds` of the newest one
+        with self.lock:
+            idx = self.order()
+            t = self.t[idx]
+            if t.size:
+                idx = idx[np.searchsorted(t, t[-1] - seconds, side="left"):]
+            out = {c: self.cols[c][idx] for c in COLUMNS}
+            out["t"] = self.t[idx]
+            out["msg_id"] = self.msg_id[idx]
+            out["host_t"] = self.host_t[idx]
+        return out
+
+    def samples_between(self, t0: float, t1: float) -> dict:
+        # board-time range [t0, t1)
+        with self.lock:
+            idx = self.order()
+            t = self.t[idx]
+            lo, hi = np.searchsorted(t, (t0, t1), side="left")
+            idx = idx[lo:hi]
+            out = {c: self.cols[c][idx] for c in COLUMNS}
+            out["t"] = self.t[idx]
+            out["host_t"] = self.host_t[idx]
+        return out
+
+    def time_on_target(self, seconds: float) -> dict:
+        # each sample holds until the next one; the newest has no duration yet
+        w = self.window(seconds)
+        t = w["t"]
+        if t.size < 2:
+            return {"seconds": 0.0, "span": 0.0, "fraction": 0.0, "samples": int(t.size)}
+        dt = np.diff(t)
+        on = w["onTarget"][:-1].astype(bool) & w["spawnSet"][:-1].astype(bool)
+        span = float(t[-1] - t[0])
+        on_s = float(dt[on].sum())
+        return {"seconds": on_s, "span": span, "fraction": on_s / span if span > 0 else 0.0,
+                "samples": int(t.size)}
+
+    def error_stats(self, seconds: float) -> dict:
+        # angular error of the quantized IMU pose against the spawn target, degrees
+        w = self.window(seconds)
+        mask = w["spawnSet"].astype(bool)
+        out = {"samples": int(mask.sum())}
+        if not out["samples"]:
+            return out
+        for axis, q, s in (("pitch", "pitchQ", "spawnPitchQ"), ("yaw", "yawQ", "spawnYawQ")):
+            err = (w[q][mask].astype(np.int32) - w[s][mask]).astype(np.float64)
+            a = np.abs(err)
+            out[axis] = {"mean": float(err.mean()), "rms": float(np.sqrt((err * err).mean())),
+                         "p95_abs": float(np.percentile(a, 95)), "max_abs": float(a.max())}
+        return out
+
+    def clock_offset(self, seconds: float = 10.0):
+        # host time = board time + offset. Every sample arrived after it was
+        # printed, so the smallest (arrival - board time) is the best bound.
+        w = self.window(seconds)
+        d = w["host_t"] - w["t"]
+        d = d[~np.isnan(d)]
+        return float(d.min()) if d.size else None
+
+    def rate_hz(self, seconds: float = 1.0) -> float:
+        t = self.window(seconds)["t"]
+        return (t.size - 1) / float(t[-1] - t[0]) if t.size > 1 and t[-1] > t[0] else 0.0
+
+
+def open_stream(spec: str, baud: int = BAUD, timeout: float = 0.2):
+    # spec: "serial:COM5", "serial:/dev/ttyACM0@115200", "tcp:host:port" or a file path.
+    # -> (read(n) -> bytes, close(), live); b"" from read() means end of stream
+    if spec.startswith("serial:"):
+        if serial is None:
+            raise RuntimeError("pyserial not installed. Install: pip install pyserial")
+        port, _, rate = spec[len("serial:"):].partition("@")
+        ser = serial.Serial(port, int(rate) if rate else baud, timeout=timeout)
+
+        def read_serial(n):
+            data = ser.read(max(1, min(n, ser.in_waiting or 1)))
+            return data if data else None
+
+        return read_serial, ser.close, True
+    if spec.startswith("tcp:"):
+        host, _, port = spec[len("tcp:"):].rpartition(":")
+        sock = socket.create_connection((host or "127.0.0.1", int(port)), timeout=5.0)
+        sock.settimeout(timeout)
+
+        def read_tcp(n):
+            try:
+                return sock.recv(n)
+            except socket.timeout:
+                return None
+
+        return read_tcp, sock.close, True
+    f = open(spec, "rb")
+    return f.read, f.close, False
+
+
+class TelemetryReader:
+    # Background thread: read chunks from a stream, parse them in bulk and
+    # append to a TelemetryRing. read() returning None means "nothing yet".
+    def __init__(self, spec: str, ring: TelemetryRing = None, baud: int = BAUD, chunk: int = CHUNK,
+                 on_error=None):
+        self.spec = spec
+        self.ring = ring if ring is not None else TelemetryRing()
+        self.baud = baud
+        self.chunk = chunk
+        self.on_error = on_error
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.bytes = 0
+        self.rows = 0
+        self.eof = False
+
+    def start(self):
+        self.read, self.close_stream, self.live = open_stream(self.spec, self.baud)
+        self.thread = threading.Thread(target=self.run, name="telemetry", daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        rest = b""
+        try:
+            while not self.stop_event.is_set():
+                data = self.read(self.chunk)
+                if data is None:
+                    continue
+                if not data:
+                    break
+                self.bytes += len(data)
+                values, msgs, ips, rest = parse_chunk(rest + data)
+                self.rows += self.ring.extend(values, msgs, ips, host_t=time.time() if self.live else None)
+        except Exception as e:
+            if self.on_error is not None and not self.stop_event.is_set():
+                self.on_error(e)
+        finally:
+            self.eof = True
+            try:
+                self.close_stream()
+            except Exception:
+                pass
+
+    def stop(self, timeout: float = 2.0):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def wait(self, timeout: float = None):
+        # file sources: block until the whole file is in the ring
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Read the firmware's CSV telemetry and print windowed stats.")
+    p.add_argument("source", help="serial:PORT[@BAUD], tcp:HOST:PORT or a CSV file")
+    p.add_argument("--window", type=float, default=5.0, help="stats window, seconds of board time")
+    p.add_argument("--every", type=float, default=1.0, help="print interval for live sources")
+    p.add_argument("--capacity", type=int, default=CAPACITY)
+    args = p.parse_args(argv)
+    if np is None:
+        print("[TEL] numpy not installed. Install: pip install numpy")
+        return 2
+
+    reader = TelemetryReader(args.source, TelemetryRing(args.capacity),
+                             on_error=lambda e: print(f"[TEL] {e}", flush=True))
+    try:
+        reader.start()
+    except Exception as e:
+        print(f"[TEL] {e}")
+        return 1
+
+    def report():
+        ring = reader.ring
+        tot = ring.time_on_target(args.window)
+        err = ring.error_stats(args.window)
+        line = (f"[TEL] rows={ring.total} rate={ring.rate_hz(args.window):.0f}Hz "
+                f"on_target={100 * tot['fraction']:.0f}% of {tot['span']:.1f}s")
+        for axis in ("pitch", "yaw"):
+            if axis in err:
+                line += f" {axis} err rms={err[axis]['rms']:.1f} max={err[axis]['max_abs']:.0f}"
+        print(line, flush=True)
+
+    try:
+        if not reader.live:
+            t0 = time.perf_counter()
+            reader.wait()
+            dt = time.perf_counter() - t0
+            print(f"[TEL] parsed {reader.rows} rows ({reader.bytes / 2 ** 20:.1f} MiB) in {dt:.2f}s "
+                  f"({reader.rows / max(dt, 1e-9) / 1e3:.0f}k rows/s)")
+            report()
+            return 0
+        while not reader.eof:
+            time.sleep(args.every)
+            report()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from protocol import (FRAME, FRAME_LEN, LIMIT, FrameDecoder, ProtocolError, decode_frame, encode_frame,
+                      parse_text_packet, text_packet)
+
+
+def test_frame_roundtrip():
+    rnd = random.Random(1)
+    for _ in range(20000):
+        seq = rnd.randrange(0, 1 << 16)
+        x = rnd.uniform(-LIMIT, LIMIT)
+        y = rnd.uniform(-LIMIT, LIMIT)
+        s, dx, dy = decode_frame(encode_frame(seq, x, y))
+        assert s == seq
+        assert dx == pytest.approx(x, abs=0.005) and dy == pytest.approx(y, abs=0.005)
+
+
+def test_frame_seq_wraps_at_16_bits():
+    assert decode_frame(encode_frame(0x1_0005, 0, 0))[0] == 5
+
+
+@pytest.mark.parametrize("x, y", [(1e6, -1e6), (LIMIT + 0.01, -LIMIT - 0.01), (LIMIT, -LIMIT)])
+def test_frame_clamps_at_int16_limits(x, y):
+    # out-of-range angles clamp instead of wrapping around
+    frame = encode_frame(1, x, y)
+    _, _, _, cx, cy = FRAME.unpack(frame[:FRAME.size])
+    assert (cx, cy) == (32767, -32767)
+    assert decode_frame(frame)[1:] == (LIMIT, -LIMIT)
+
+
+def test_frame_rejects_every_single_bit_flip():
+    frame = encode_frame(1234, 12.34, -56.78)
+    for bit in range(FRAME_LEN * 8):
+        bad = bytearray(frame)
+        bad[bit // 8] ^= 1 << (bit % 8)
+        with pytest.raises(ProtocolError):
+            decode_frame(bad)
+
+
+def test_frame_rejects_short_buffer():
+    with pytest.raises(ProtocolError):
+        decode_frame(encode_frame(1, 0, 0)[:-1])
+
+
+def test_decoder_resyncs_after_garbage():
+    frames = [(i, i * 0.5, -i * 0.25) for i in range(200)]
+    stream = bytearray()
+    for seq, x, y in frames:
+        if seq % 17 == 0:
+            # includes a stray magic byte that must not swallow the next frame
+            stream += b"\x00\xa5\x01junk"
+        stream += encode_frame(seq, x, y)
+    dec = FrameDecoder()
+    out = dec.feed(bytes(stream))
+    assert [(s, round(x, 2), round(y, 2)) for s, x, y in out] == frames
+    assert dec.errors > 0
+
+
+def test_decoder_reassembles_split_frames():
+    frames = [(i, i * 0.5, -i * 0.25) for i in range(200)]
+    stream = b"".join(encode_frame(*f) for f in frames)
+    rnd = random.Random(2)
+    dec = FrameDecoder()
+    out = []
+    pos = 0
+    while pos < len(stream):
+        step = rnd.randint(1, 13)
+        out += dec.feed(stream[pos:pos + step])
+        pos += step
+    assert [(s, round(x, 2), round(y, 2)) for s, x, y in out] == frames
+    assert dec.errors == 0
+
+
+def test_decoder_keeps_partial_frame_until_complete():
+    frame = encode_frame(7, 1.5, -2.5)
+    dec = FrameDecoder()
+    assert dec.feed(frame[:3]) == []
+    assert dec.feed(frame[3:]) == [(7, 1.5, -2.5)]
+
+
+@pytest.mark.parametrize("x, y", [(0, 0), (-12.5, 7.25), (89.99, -89.99)])
+def test_text_packet_roundtrip(x, y):
+    r = parse_text_packet(text_packet(x, y))
+    assert r is not None
+    assert r[1] == pytest.approx(x, abs=0.005) and r[2] == pytest.approx(y, abs=0.005)
+
+
+@pytest.mark.parametrize("line", ["MSG:A;X:1e3;Y:0", "MSG:A;X:;Y:1", "FOO;X:1;Y:2", "MSG:A;Y:1"])
+def test_text_packet_rejects_what_firmware_rejects(line):
+    assert parse_text_packet(line) is None
@@ -0,0 +1,22 @@
+import numpy as np
+
+from telemetry import N_NUMERIC, parse_chunk
+
+GOOD = b"1000,1.5,-2.25,3,1,2,3,0,4,5,1,OK,192.168.1.7\r\n"
+
+
+def test_parse_chunk_rows_and_remainder():
+    values, msgs, ips, rest = parse_chunk(b"t_ms,roll\n" + GOOD + GOOD + b"1002,0.5")
+    assert values.shape == (2, N_NUMERIC)
+    assert values[0, 2] == -2.25
+    assert msgs == [b"OK", b"OK"] and ips == [b"192.168.1.7"] * 2
+    assert rest == b"1002,0.5"
+
+
+def test_parse_chunk_skips_malformed_rows():
+    # garbled serial fields used to reach np.fromstring and raise
+    bad = b"1001,1.0.0,-.,3,1,2,3,0,4,5,1,OK,\n1002,-.,0,0,0,0,0,0,0,0,0,NONE,\n"
+    values, msgs, _, _ = parse_chunk(GOOD + bad + GOOD)
+    assert values.shape == (2, N_NUMERIC)
+    assert np.all(values[:, 0] == 1000)
+    assert msgs == [b"OK", b"OK"]
@@ -0,0 +1,327 @@
+import argparse
+import sys
+import threading
+import time
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+from batching import BatchInferenceEngine
+from defaults import BACKENDS, CONF_DEFAULT, IMGSZ_DEFAULT, PHONE_CLASS, PORT_DEFAULT, log
+from det_cache import CAPACITY, MAX_DISTANCE, TTL, CachedDetector, DetectionCache
+from detectors import load_detector
+from estimator import LOST_AFTER, TargetEstimator
+from perf import PERF, PerfExporter
+from preprocess import MOTION_MAX_SKIP, MotionGate
+from projection import Projector
+from protocol import TargetChannel
+from roi_tracker import TRACK_MODES, RoiTracker
+from send_rate import MAX_HZ, MIN_HZ, SendScheduler
+from session import SessionRecorder
+from sources import BLOCK, DROP, PREFETCH, FrameSource
+from tcp_link import CONNECTED, DISCONNECTED, RECONNECTING, AsyncLink
+from vision import box_center, center_packet
+
+
+def open_source(args):
+    # -> (source, live, fps); file sources are paced by frame index, not wall clock
+    spec = args.source or args.images or args.video or str(args.camera)
+    src = FrameSource(spec, prefetch=args.prefetch, policy=args.policy, max_width=args.max_width,
+                      realtime=args.realtime, fps=args.fps)
+    if args.start_frame and not src.live:
+        src.seek(args.start_frame)
+    return src, src.live, src.fps
+
+
+def run(args) -> int:
+    if cv2 is None:
+        log("[CAM] opencv-python not installed. Install: pip install opencv-python-headless")
+        return 2
+    if args.track > 0 and args.batch > 1:
+        log("[APP] --track and --batch cannot be combined.")
+        return 2
+    classes = tuple(args.classes)
+    if args.workers > 1 and args.track == 0 and args.batch <= 1:
+        # one frame at a time would keep a single worker busy
+        args.batch = args.workers
+    try:
+        detector = load_detector(args.model, backend=args.backend, workers=args.workers, conf=args.conf,
+                                 classes=classes, imgsz=args.imgsz)
+    except Exception as e:
+        log(f"[YOLO] Failed to load model: {e}")
+        return 2
+    log(f"[YOLO] Loaded model: {args.model} ({detector.name})")
+    cache = None
+    if args.cache > 0:
+        cache = DetectionCache(args.cache, max_distance=args.cache_distance, ttl=args.cache_ttl)
+        detector = CachedDetector(detector, cache)
+
+    try:
+        projector = Projector.from_file(args.calib, args.hfov, args.vfov) if args.calib \
+            else Projector(hfov=args.hfov, vfov=args.vfov)
+    except Exception as e:
+        log(f"[CAM] Failed to load calibration: {e}")
+        detector.close()
+        return 2
+
+    src, live, _ = open_source(args)
+    if not src.isOpened():
+        log("[CAM] Cannot open source.")
+        detector.close()
+        return 1
+
+    recorder = SessionRecorder(args.record).start() if args.record else None
+    scheduler = SendScheduler(min_hz=args.send_min_hz, max_hz=args.send_max_hz)
+    link = None
+    if args.host:
+        states = []
+        def on_state(st, info):
+            states.append((st, info))
+            if st == CONNECTED:
+                scheduler.reset()
+            if st in (RECONNECTING, DISCONNECTED):
+                log(f"[NET] {st} {info}".rstrip())
+
+        link = AsyncLink(on_line=(lambda line: log(f"[RX] {line}")) if args.verbose else None,
+                         on_state=on_state, reconnect=False)
+        if recorder is not None:
+            recorder.attach(link)
+        # attach before connecting so the HELLO banner is seen
+        channel = TargetChannel(link, prefer_binary=not args.text_only,
+                                on_mode=lambda m: log(f"[NET] Target framing: {m}"))
+        if not link.connect(args.host, args.port).result():
+            log(f"[NET] Connect error: {states[-1][1] if states else '?'}")
+            link.close()
+            detector.close()
+            if recorder is not None:
+                recorder.close()
+            return 1
+        link.reconnect = not args.no_reconnect
+        log(f"[NET] Connected to {args.host}:{args.port}")
+
+    interval = 1.0 / max(1, int(args.rate))
+    last_det_ts = -1e9
+    last_center = None
+    frame_size = (1, 1)
+    estimator = TargetEstimator(lost_after=max(args.lost_after, 3 * interval))
+    frames = dets = sends = 0
+
+    gate = MotionGate(args.motion_gate, args.motion_max_skip) if args.motion_gate > 0 else None
+    gate_det = None
+
+    roi = None
+    if args.track > 0:
+        roi = RoiTracker(detector, detect_every=args.track, mode=args.track_mode)
+        log(f"[APP] ROI tracking: detect every {args.track} frames ({roi.mode})")
+
+    # batched mode: detections complete asynchronously, newest timestamp wins
+    engine = None
+    inflight = []
+    latest = {"ts": -1e9, "det": None, "size": (1, 1), "count": 0}
+    latest_lock = threading.Lock()
+    if args.batch > 1:
+        engine = BatchInferenceEngine(detector, batch_size=args.batch, deadline_ms=args.deadline_ms,
+                                      conf=args.conf, classes=classes).start()
+
+    def on_batched(fut, size):
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        ts, det = fut.result()
+        if det is None:
+            return
+        with latest_lock:
+            latest["count"] += 1
+            if ts > latest["ts"]:
+                latest.update(ts=ts, det=det, size=size)
+
+    PERF.enabled = args.perf or bool(args.perf_export)
+    exporter = PerfExporter(PERF, args.perf_export).start() if args.perf_export else None
+    t_start = time.time()
+    try:
+        while args.max_frames <= 0 or frames < args.max_frames:
+            t0 = PERF.now()
+            item = src.read_frame(timeout=1.0)
+            if item is None:
+                if live:
+                    continue
+                break
+            PERF.since("capture.read", t0)
+            PERF.count("frames.captured")
+            frame = item.image
+            # live sources run on wall clock; files on their own timeline
+            now = item.ts if live else item.pts
+            frames += 1
+
+            size = (frame.shape[1], frame.shape[0])
+            det = None
+            det_ts = now
+            if roi is not None:
+                # tracker runs every frame; it decides when to run full detection
+                det, _ = roi.update(frame)
+            elif (now - last_det_ts) + 1e-9 >= interval:
+                last_det_ts = now
+                if gate is not None and not gate.changed(frame, now):
+                    # scene unchanged since the last inference: repeat its result
+                    det = gate_det
+                elif engine is None:
+                    t0 = PERF.now()
+                    det = gate_det = detector.detect(frame)
+                    PERF.since("infer", t0)
+                    PERF.count("frames.inferred")
+                else:
+                    inflight = [f for f in inflight if not f.done()]
+                    if not live and len(inflight) >= engine.max_pending:
+                        # replay must not drop frames: wait for the engine
+                        inflight[0].exception()
+                    inflight.append(engine.submit(frame, ts=now, callback=lambda f, sz=size: on_batched(f, sz)))
+            if engine is not None and det is None:
+                with latest_lock:
+                    det, size, det_ts = latest["det"], latest["size"], latest["ts"]
+                    latest["det"] = None
+                if det is not None:
+                    gate_det = det
+
+            if det is not None:
+                if engine is None:
+                    dets += 1
+                last_center = box_center(det)
+                frame_size = size
+                estimator.update(*last_center, det_ts)
+                if recorder is not None:
+                    recorder.record_detection(det, size)
+                if args.verbose:
+                    log(f"[DET] frame={frames} box={det[:4]} conf={det[4]:.2f}")
+
+            if last_center is not None:
+                if link is not None and not link.active:
+                    log("[NET] Disconnected.")
+                    break
+                rtt, backlog = (channel.rtt, link.pending()) if link is not None else (None, 0)
+                # filtered center predicted to when the packet lands
+                predicted = estimator.predict(now + (rtt / 2 if rtt else 0.0))
+                if predicted is None:
+                    last_center = None
+                    if args.verbose:
+                        log(f"[DET] frame={frames} target lost")
+                    continue
+                cx, cy = last_center if args.no_predict else predicted
+                angle_x, angle_y = projector.angles(cx, cy, frame_size[0], frame_size[1])
+                # swap axes to match Processing expectations
+                if scheduler.due(angle_y, angle_x, now, rtt=rtt, backlog=backlog) and \
+                        (link is None or channel.send_target(angle_y, angle_x)):
+                    scheduler.sent(angle_y, angle_x, now)
+                    sends += 1
+                    PERF.count("sends")
+                    if args.verbose or link is None:
+                        log(f"[TX] {center_packet(angle_x, angle_y).strip()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if engine is not None:
+            for f in inflight:
+                if not f.done():
+                    f.exception()
+            engine.stop()
+            dets = latest["count"]
+            log(f"[YOLO] batches={engine.batches} avg_batch={engine.stats()['avg_batch']:.1f}")
+        if cache is not None:
+            st = cache.stats()
+            log(f"[APP] detection cache: hits={st['hits']} misses={st['misses']} "
+                f"hit_rate={st['hit_rate'] * 100:.0f}% evictions={st['evictions']} expired={st['expired']}")
+        if gate is not None:
+            log(f"[APP] motion gate: skipped {gate.skipped} of {gate.checked} detections")
+        if roi is not None:
+            st = roi.stats()
+            log(f"[APP] full detections={st['full_detections']} tracked={st['tracked']}")
+        src.release()
+        detector.close()
+        if link:
+            # let queued packets go out before closing
+            deadline = time.time() + 1.0
+            while link.connected and link.pending() and time.time() < deadline:
+                time.sleep(0.01)
+            link.close()
+        if recorder is not None:
+            recorder.close()
+            log(f"[APP] session: {args.record} ({recorder.recorded} events)")
+        if exporter is not None:
+            exporter.stop()
+
+    elapsed = max(1e-6, time.time() - t_start)
+    st = scheduler.stats()
+    log(f"[APP] frames={frames} detections={dets} sends={sends} "
+        f"elapsed={elapsed:.2f}s fps={frames / elapsed:.1f}")
+    log(f"[APP] unchanged targets skipped={st['suppressed']} rate-limited={st['throttled']}")
+    if PERF.enabled:
+        for name, s in PERF.snapshot()["stages"].items():
+            log(f"[PERF] {name:14s} n={s['n']} mean={s['mean_ms']:.2f}ms p50={s['p50_ms']:.2f}ms "
+                f"p95={s['p95_ms']:.2f}ms max={s['max_ms']:.2f}ms")
+    return 0
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Headless phone tracker: detection -> angles -> TCP, no display.")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--camera", type=int, default=0, help="camera index (default 0)")
+    g.add_argument("--video", help="video file path")
+    g.add_argument("--images", help="directory of images, read in sorted order")
+    g.add_argument("--source", metavar="SPEC",
+                   help="camera index, video file, image directory or stream URL (rtsp://, http://)")
+    p.add_argument("--host", help="Arduino IP; without it packets are only printed")
+    p.add_argument("--port", type=int, default=PORT_DEFAULT)
+    p.add_argument("--text-only", action="store_true", help="never negotiate binary target frames")
+    p.add_argument("--no-reconnect", action="store_true", help="exit instead of reconnecting when the link drops")
+    p.add_argument("--rate", type=int, default=5, help="detection rate in Hz")
+    p.add_argument("--send-min-hz", type=float, default=MIN_HZ, help="send rate for a still target")
+    p.add_argument("--send-max-hz", type=float, default=MAX_HZ, help="send rate for fast motion")
+    p.add_argument("--fps", type=float, default=30.0, help="timeline rate for image dirs / files without FPS")
+    p.add_argument("--start-frame", type=int, default=0, metavar="N", help="seek files to frame N first")
+    p.add_argument("--realtime", action="store_true", help="play files at their frame rate, not as fast as possible")
+    p.add_argument("--prefetch", type=int, default=PREFETCH, help="decoded frames buffered ahead of detection")
+    p.add_argument("--policy", choices=(DROP, BLOCK),
+                   help="full prefetch buffer: drop the oldest frame (live default) or block decoding (file default)")
+    p.add_argument("--max-width", type=int, default=0, metavar="PX", help="downscale frames wider than PX on decode")
+    p.add_argument("--model", default="yolo11n.pt", help=".pt for ultralytics, .onnx for the CPU engine")
+    p.add_argument("--backend", choices=BACKENDS, default="auto")
+    p.add_argument("--imgsz", type=int, default=IMGSZ_DEFAULT, help="model input size; frames are resized to it once")
+    p.add_argument("--conf", type=float, default=CONF_DEFAULT)
+    p.add_argument("--classes", type=int, nargs="+", default=[PHONE_CLASS])
+    p.add_argument("--batch", type=int, default=1, help="frames per predict() call (1 = unbatched)")
+    p.add_argument("--workers", type=int, default=0, metavar="N",
+                   help="run the detector in N processes (detector_pool.py); implies --batch N")
+    p.add_argument("--deadline-ms", type=float, default=20.0, help="max wait to fill a batch")
+    p.add_argument("--motion-gate", type=float, default=0.0, metavar="DIFF",
+                   help="skip inference while no part of the frame changed by DIFF gray levels (0 = off, e.g. 8)")
+    p.add_argument("--motion-max-skip", type=float, default=MOTION_MAX_SKIP, metavar="S",
+                   help="run inference at least every S seconds even in a still scene")
+    p.add_argument("--cache", type=int, nargs="?", const=CAPACITY, default=0, metavar="N",
+                   help=f"reuse detections of near-identical frames, keep N (default {CAPACITY}, 0 = off)")
+    p.add_argument("--cache-distance", type=int, default=MAX_DISTANCE, metavar="BITS",
+                   help="max Hamming distance between frame hashes for a cache hit")
+    p.add_argument("--cache-ttl", type=float, default=TTL, metavar="S", help="cached detections expire after S seconds")
+    p.add_argument("--track", type=int, default=0, metavar="N",
+                   help="full detection every N frames, ROI tracking in between (0 = off)")
+    p.add_argument("--track-mode", choices=TRACK_MODES, default="auto")
+    p.add_argument("--no-predict", action="store_true", help="send raw box centers, not filtered/predicted ones")
+    p.add_argument("--lost-after", type=float, default=LOST_AFTER, metavar="S",
+                   help="stop sending S seconds after the last detection")
+    p.add_argument("--hfov", type=float, default=90.0)
+    p.add_argument("--vfov", type=float, default=30.0)
+    p.add_argument("--calib", help="camera calibration (projection.py calibrate); overrides --hfov/--vfov")
+    p.add_argument("--max-frames", type=int, default=0)
+    p.add_argument("--perf", action="store_true", help="time each stage and print histograms at the end")
+    p.add_argument("--perf-export", metavar="PATH",
+                   help="write perf snapshots every 5 s (*.prom: Prometheus text, else JSON lines)")
+    p.add_argument("--record", metavar="PATH", help="record TX/RX/detections (.jsonl.gz or binary .bses)")
+    p.add_argument("-v", "--verbose", action="store_true")
+    return p
+
+
+def main(argv=None):
+    return run(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+from defaults import CONF_DEFAULT, PHONE_CLASS
+from projection import fov_angles
+from protocol import text_packet
+
+
+def detect_phone(model, frame, conf: float = CONF_DEFAULT, classes=(PHONE_CLASS,), imgsz=None):
+    # Best (x1, y1, x2, y2, conf) for the requested classes or None.
+    kw = {"imgsz": imgsz} if imgsz else {}
+    results = model.predict(frame, verbose=False, conf=conf, classes=list(classes), **kw)
+    if len(results) == 0:
+        return None
+    return best_box(results[0])
+
+
+def detect_batch(model, frames, conf: float = CONF_DEFAULT, classes=(PHONE_CLASS,), imgsz=None):
+    # One predict() call for a list of frames; results come back in input order.
+    if not frames:
+        return []
+    kw = {"imgsz": imgsz} if imgsz else {}
+    results = model.predict(list(frames), verbose=False, conf=conf, classes=list(classes), **kw)
+    dets = [best_box(r) for r in results]
+    dets += [None] * (len(frames) - len(dets))
+    return dets
+
+
+def best_box(r):
+    best = None
+    best_conf = 0.0
+    for b in r.boxes:
+        conf = float(b.conf.item())
+        if conf > best_conf:
+            best_conf = conf
+            best = b
+    if best is None:
+        return None
+    x1, y1, x2, y2 = map(int, best.xyxy[0].tolist())
+    return (x1, y1, x2, y2, best_conf)
+
+
+def box_center(det):
+    x1, y1, x2, y2 = det[:4]
+    return (int((x1 + x2) / 2), int((y1 + y2) / 2))
+
+
+def draw_detection(frame, det, label: str = "phone"):
+    x1, y1, x2, y2, conf = det[:5]
+    cx, cy = box_center(det)
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    cv2.circle(frame, (cx, cy), 4, (0, 255, 0), -1)
+    cv2.putText(frame, f"{label} {conf:.2f}", (x1, max(0, y1 - 6)),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    return frame
+
+
+def center_to_angles(cx, cy, fw, fh, hfov: float, vfov: float):
+    # atan of the ideal lens for hfov/vfov; projection.Projector adds
+    # calibrated intrinsics / distortion
+    return fov_angles(cx, cy, fw, fh, hfov, vfov)
+
+
+def center_packet(angle_x: float, angle_y: float, msg: str = "PHONE") -> str:
+    # swap axes to match Processing expectations
+    return text_packet(angle_y, angle_x, msg)
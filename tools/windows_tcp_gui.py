@@ -1,30 +1,31 @@
 import socket
-import threading
 import subprocess
+import os
 import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox
 from tkinter.scrolledtext import ScrolledText
 import time
-import base64
-
-try:
-    import cv2
-except Exception:
-    cv2 = None
 
-try:
-    from ultralytics import YOLO
-except Exception:
-    YOLO = None
-
-try:
-    from PIL import Image, ImageTk
-except Exception:
-    Image = None
-    ImageTk = None
-
-PORT_DEFAULT = 3333
+# Only light modules at import time: cv2, numpy, PIL and the detector
+# backends are imported by model_loader.preload() once the window is up,
+# or on first use (see ensure_vision()).
+from defaults import BACKENDS, CONF_DEFAULT, IMGSZ_DEFAULT, PORT_DEFAULT
+from estimator import LOST_AFTER, TargetEstimator
+from log_view import TextLog
+from model_loader import ModelLoader, preload
+from perf import PERF, PerfExporter, RateMeter, overlay_text
+from pipeline import StagedPipeline
+from protocol import TargetChannel
+from send_rate import SendScheduler
+from session import SessionRecorder, session_path
+from tcp_link import CONNECTED, DISCONNECTED, FAILED, RECONNECTING, AsyncLink
+
+# with Perf on, snapshots also go to this file (*.prom: Prometheus text,
+# otherwise JSON lines)
+PERF_EXPORT_ENV = "BERDANKA_PERF_EXPORT"
+OVERLAY_EVERY = 0.5
 WIFI_SSID = "cisco"
 WIFI_PASS = "cisco"
 
@@ -35,10 +36,13 @@ class App:
         self.root.geometry("1100x700")
         self.root.minsize(900, 600)
 
-        self.sock = None
-        self.rx_thread = None
-        self.stop_event = threading.Event()
         self.q = queue.Queue()
+        self.link = AsyncLink(on_line=self.on_link_line, on_state=self.on_link_state)
+        self.auto_reconnect = tk.BooleanVar(value=True)
+        self.record_session = tk.BooleanVar(value=False)
+        self.recorder = None
+        self.binary_frames = tk.BooleanVar(value=True)
+        self.channel = TargetChannel(self.link, on_mode=self.on_target_mode)
 
         # vision state
         self.cap = None
@@ -49,21 +53,64 @@ class App:
         self.rate_hz = tk.IntVar(value=5)
         self.hfov = tk.DoubleVar(value=90.0)
         self.vfov = tk.DoubleVar(value=30.0)
+        self.calib_path = tk.StringVar(value="")
+        self.projector = None
+        self.yolo_conf = tk.DoubleVar(value=CONF_DEFAULT)
+        self.track_enabled = tk.BooleanVar(value=False)
+        self.predict_enabled = tk.BooleanVar(value=True)
+        self.estimator = TargetEstimator()
+        self.track_every = tk.IntVar(value=10)
         self.yolo_model = None
         self.yolo_model_path = tk.StringVar(value="yolo11n.pt")
+        self.yolo_backend = tk.StringVar(value="auto")
+        self.yolo_workers = tk.IntVar(value=0)
+        self.yolo_imgsz = tk.IntVar(value=IMGSZ_DEFAULT)
+        self.skip_still = tk.BooleanVar(value=False)
+        self.cache_enabled = tk.BooleanVar(value=False)
+        self.cache_on = False
+        self.det_cache = None
+        self.cache_status_ts = 0.0
+        self.gate_on = False
+        self.motion_gate = None
+        self.gate_det = None
+        self.yolo_pooled = False
+        self.loader = ModelLoader(on_progress=self.on_model_progress, on_done=self.on_model_loaded)
         self.last_frame = None
         self.last_det = None
         self.last_det_center = None
         self.last_det_ts = 0.0
-        self.last_send_ts = 0.0
+        self.scheduler = SendScheduler()
+        self.send_status_ts = 0.0
+        self.last_det_size = (1, 1)
         self.single_request = False
         self.hold_until = 0.0
         self.hold_frame = None
 
+        # capture / inference / render threads (see pipeline.py)
+        self.pipeline = None
+        self.yolo_on = False
+        self.detect_interval = 0.2
+        self.det_conf = CONF_DEFAULT
+        self.track_on = False
+        self.track_n = 10
+        self.roi_tracker = None
+        self.view_size = (1, 1)
+        self.display = None
+        self.res_shown = None
+
+        # timing instrumentation (see perf.py)
+        self.perf_enabled = tk.BooleanVar(value=False)
+        self.perf_meter = None
+        self.perf_exporter = None
+        self.overlay_item = None
+        self.overlay_ts = 0.0
+
         self.build_ui()
         self.root.after(50, self.process_queue)
-        self.root.after(30, self.update_camera)
+        self.root.after(15, self.update_camera)
         self.log("[APP] Ready. 1) Connect Wi‑Fi 2) Connect TCP 3) Send.")
+        # warm the import cache once the window has been drawn
+        self.root.after(100, lambda: preload(on_progress=self.on_preload))
 
     def build_ui(self):
         self.root.grid_rowconfigure(0, weight=1)
@@ -120,6 +167,16 @@ class App:
         self.bt_disconnect = tk.Button(ard, text="Disconnect", command=self.disconnect_arduino, state="disabled")
         self.bt_disconnect.grid(row=1, column=3, pady=6, sticky="e")
 
+        self.cb_reconnect = tk.Checkbutton(ard, text="Auto-reconnect", variable=self.auto_reconnect)
+        self.cb_reconnect.grid(row=2, column=1, sticky="w")
+
+        self.cb_binary = tk.Checkbutton(ard, text="Binary target frames", variable=self.binary_frames)
+        self.cb_binary.grid(row=2, column=2, columnspan=2, sticky="w")
+
+        self.cb_record = tk.Checkbutton(ard, text="Record session", variable=self.record_session,
+                                        command=self.toggle_recording)
+        self.cb_record.grid(row=3, column=1, columnspan=3, sticky="w")
+
         send = tk.LabelFrame(left, text="Send", padx=10, pady=10)
         send.grid(row=2, column=0, sticky="ew", pady=(0, 8))
 
@@ -151,8 +208,8 @@ class App:
         top_row = tk.Frame(vision)
         top_row.grid(row=0, column=0, sticky="ew")
 
-        tk.Label(top_row, text="Camera:").pack(side="left")
-        self.ed_cam = tk.Entry(top_row, width=6)
+        tk.Label(top_row, text="Source:").pack(side="left")
+        self.ed_cam = tk.Entry(top_row, width=16)
         self.ed_cam.insert(0, "0")
         self.ed_cam.pack(side="left", padx=6)
 
@@ -166,6 +223,17 @@ class App:
         self.ed_model = tk.Entry(top_row, width=20, textvariable=self.yolo_model_path)
         self.ed_model.pack(side="left")
 
+        self.om_backend = tk.OptionMenu(top_row, self.yolo_backend, *BACKENDS)
+        self.om_backend.pack(side="left")
+
+        tk.Label(top_row, text="Procs:").pack(side="left", padx=(6, 0))
+        self.ed_workers = tk.Entry(top_row, width=3, textvariable=self.yolo_workers)
+        self.ed_workers.pack(side="left")
+
+        tk.Label(top_row, text="Size:").pack(side="left", padx=(6, 0))
+        self.ed_imgsz = tk.Entry(top_row, width=4, textvariable=self.yolo_imgsz)
+        self.ed_imgsz.pack(side="left")
+
         self.cb_yolo = tk.Checkbutton(top_row, text="YOLO On", variable=self.yolo_enabled)
         self.cb_yolo.pack(side="left", padx=6)
 
@@ -175,7 +243,10 @@ class App:
         self.bt_reload = tk.Button(top_row, text="Load Model", command=self.load_model)
         self.bt_reload.pack(side="left", padx=6)
 
-        tk.Label(top_row, text="Rate Hz:").pack(side="left", padx=6)
+        self.lb_model = tk.Label(top_row, text="Model: none")
+        self.lb_model.pack(side="left", padx=6)
+
+        tk.Label(top_row, text="Detect Hz:").pack(side="left", padx=6)
         self.sc_rate = tk.Scale(top_row, from_=1, to=30, orient="horizontal", variable=self.rate_hz, length=120)
         self.sc_rate.pack(side="left")
 
@@ -193,9 +264,45 @@ class App:
         self.ed_vfov = tk.Entry(fov_row, width=6, textvariable=self.vfov)
         self.ed_vfov.pack(side="left", padx=6)
 
+        tk.Label(fov_row, text="Conf:").pack(side="left")
+        self.ed_conf = tk.Entry(fov_row, width=6, textvariable=self.yolo_conf)
+        self.ed_conf.pack(side="left", padx=6)
+
+        self.cb_track = tk.Checkbutton(fov_row, text="Track between detections", variable=self.track_enabled)
+        self.cb_track.pack(side="left", padx=6)
+
+        self.cb_predict = tk.Checkbutton(fov_row, text="Predict", variable=self.predict_enabled)
+        self.cb_predict.pack(side="left", padx=6)
+
+        self.cb_still = tk.Checkbutton(fov_row, text="Skip still", variable=self.skip_still)
+        self.cb_still.pack(side="left", padx=6)
+
+        self.cb_cache = tk.Checkbutton(fov_row, text="Cache", variable=self.cache_enabled)
+        self.cb_cache.pack(side="left", padx=6)
+
+        self.cb_perf = tk.Checkbutton(fov_row, text="Perf", variable=self.perf_enabled, command=self.toggle_perf)
+        self.cb_perf.pack(side="left", padx=6)
+
+        tk.Label(fov_row, text="Detect every:").pack(side="left")
+        self.ed_track_every = tk.Entry(fov_row, width=4, textvariable=self.track_every)
+        self.ed_track_every.pack(side="left", padx=6)
+
+        tk.Label(fov_row, text="Calib:").pack(side="left")
+        self.ed_calib = tk.Entry(fov_row, width=14, textvariable=self.calib_path)
+        self.ed_calib.pack(side="left", padx=6)
+
+        self.bt_calib = tk.Button(fov_row, text="Load Calib", command=self.load_calibration)
+        self.bt_calib.pack(side="left", padx=6)
+
         self.lb_res = tk.Label(fov_row, text="Res: n/a")
         self.lb_res.pack(side="left", padx=12)
 
+        self.lb_send = tk.Label(fov_row, text="Send: idle")
+        self.lb_send.pack(side="left", padx=12)
+
+        self.lb_cache = tk.Label(fov_row, text="Cache: off")
+        self.lb_cache.pack(side="left", padx=12)
+
         self.canvas = tk.Canvas(vision, bg="black", highlightthickness=0)
         self.canvas.grid(row=2, column=0, sticky="nsew", pady=6)
 
@@ -207,13 +314,14 @@ class App:
         self.log_view = ScrolledText(logf, height=12, state="normal")
         self.log_view.bind("<Key>", lambda e: "break")
         self.log_view.grid(row=0, column=0, sticky="nsew")
+        self.text_log = TextLog(self.log_view)
 
     def only_digits(self, new_value: str) -> bool:
         return new_value == "" or new_value.isdigit()
 
     def log(self, s: str):
-        self.log_view.insert("end", s + "\n")
-        self.log_view.see("end")
+        # written to the widget by the next process_queue tick
+        self.text_log.append(s)
 
     def connect_wifi_windows(self):
         ssid = self.ed_ssid.get().strip()
@@ -285,7 +393,6 @@ class App:
             return
 
         port = int(port_s)
-        self.disconnect_arduino()
 
         self.log(f"[NET] Connecting to {ip}:{port} ...")
         self.log(f"[NET] Hostname: {socket.gethostname()}")
@@ -294,45 +401,39 @@ class App:
             self.log(f"[NET] Local IPs: {host_info[2]}")
         except Exception as e:
             self.log(f"[NET] Local IPs error: {e}")
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5.0)
-            s.connect((ip, port))
-            s.settimeout(None)
-            self.sock = s
-        except Exception as e:
-            self.sock = None
-            self.log(f"[NET] Connect error: {repr(e)}")
-            messagebox.showwarning("TCP", f"Connect failed: {e}")
-            return
-
-        self.stop_event.clear()
-        self.rx_thread = threading.Thread(target=self.rx_loop, daemon=True)
-        self.rx_thread.start()
-
+        # non-blocking: the result comes back through on_link_state
         self.bt_connect.configure(state="disabled")
         self.bt_disconnect.configure(state="normal")
-        self.log("[NET] Connected.")
+        self.link.reconnect = bool(self.auto_reconnect.get())
+        self.channel.prefer_binary = bool(self.binary_frames.get())
+        self.link.connect(ip, port)
 
     def disconnect_arduino(self):
-        self.stop_event.set()
-
-        if self.sock:
-            try:
-                self.sock.shutdown(socket.SHUT_RDWR)
-            except Exception:
-                pass
-            try:
-                self.sock.close()
-            except Exception:
-                pass
-            self.sock = None
-
+        self.link.disconnect()
         self.bt_connect.configure(state="normal")
         self.bt_disconnect.configure(state="disabled")
 
+    def toggle_recording(self):
+        if self.record_session.get():
+            try:
+                self.recorder = SessionRecorder(session_path()).start()
+            except OSError as e:
+                self.record_session.set(False)
+                messagebox.showerror("Record", str(e))
+                return
+            self.recorder.attach(self.link)
+            self.log(f"[APP] Recording session to {self.recorder.path}")
+        else:
+            self.stop_recording()
+
+    def stop_recording(self):
+        rec, self.recorder = self.recorder, None
+        if rec is not None:
+            rec.close()
+            self.log(f"[APP] Session saved: {rec.path} ({rec.recorded} events, {rec.dropped} dropped)")
+
     def send_packet(self):
-        if not self.sock:
+        if not self.link.active:
             messagebox.showwarning("Send", "Not connected to Arduino.")
             return
 
@@ -341,193 +442,484 @@ class App:
         y = self.ed_y.get().strip() or "0"
 
         line = f"MSG:{msg};X:{x};Y:{y}\n"
-        try:
-            self.sock.sendall(line.encode("utf-8"))
+        if self.link.send(line):
             self.log(f"[TX] {line.strip()}")
-        except Exception as e:
-            self.log(f"[NET] Send error: {e}")
-            self.disconnect_arduino()
-
-    def rx_loop(self):
-        buf = b""
-        try:
-            while not self.stop_event.is_set() and self.sock:
-                data = self.sock.recv(4096)
-                if not data:
-                    break
-                buf += data
-                while b"\n" in buf:
-                    line, buf = buf.split(b"\n", 1)
-                    line = line.replace(b"\r", b"").decode("utf-8", errors="replace").strip()
-                    if line:
-                        self.q.put(f"[RвевX] {line}")
-        except Exception as e:
-            self.q.put(f"[NET] RX error: {e}")
-        finally:
-            self.q.put("[NET] Disconnected.")
-            self.q.put("__DISCONNECT__")
+        else:
+            self.log("[NET] Send queue full, packet dropped.")
+
+    # link callbacks run on the asyncio thread: hand them to Tk via the queue
+    def on_link_line(self, line: str):
+        self.q.put(f"[RX] {line}")
+
+    def on_link_state(self, state: str, info: str):
+        self.q.put(("__LINK__", state, info))
+
+    def on_target_mode(self, mode: str):
+        self.q.put(f"[NET] Target framing: {mode}")
+
+    def handle_link_state(self, state: str, info: str):
+        if state == CONNECTED:
+            self.log("[NET] Connected.")
+            self.scheduler.reset()
+            self.bt_connect.configure(state="disabled")
+            self.bt_disconnect.configure(state="normal")
+        elif state == FAILED:
+            self.log(f"[NET] Connect error: {info}")
+            self.bt_connect.configure(state="normal")
+            self.bt_disconnect.configure(state="disabled")
+            messagebox.showwarning("TCP", f"Connect failed: {info}")
+        elif state == RECONNECTING:
+            self.log(f"[NET] Reconnecting: {info}")
+        elif state == DISCONNECTED:
+            if info:
+                self.log(f"[NET] {info}")
+            self.log("[NET] Disconnected.")
+            if not self.link.active:
+                self.bt_connect.configure(state="normal")
+                self.bt_disconnect.configure(state="disabled")
 
     def process_queue(self):
         try:
             while True:
                 item = self.q.get_nowait()
-                if item == "__DISCONNECT__":
-                    self.disconnect_arduino()
+                if isinstance(item, tuple) and item[0] == "__LINK__":
+                    self.handle_link_state(item[1], item[2])
+                    continue
+                if isinstance(item, tuple) and item[0] == "__MODEL__":
+                    self.handle_model_state(*item[1:])
+                    continue
+                if isinstance(item, tuple) and item[0] == "__CALIB__":
+                    self.use_calibration(*item[1:])
                     continue
                 self.log(item)
         except queue.Empty:
             pass
+        self.text_log.flush()
         self.root.after(50, self.process_queue)
 
     # ===== Vision =====
     def load_model(self):
-        if YOLO is None:
-            messagebox.showwarning("YOLO", "ultralytics not installed. Install: pip install ultralytics")
-            return
         model_path = self.yolo_model_path.get().strip()
         if not model_path:
             messagebox.showwarning("YOLO", "Model path is empty.")
             return
         try:
-            self.yolo_model = YOLO(model_path)
-            self.log(f"[YOLO] Loaded model: {model_path}")
+            workers = max(0, int(self.yolo_workers.get()))
+        except Exception:
+            messagebox.showwarning("YOLO", "Procs must be a number (0 = in-process).")
+            return
+        try:
+            imgsz = int(self.yolo_imgsz.get())
+            if imgsz < 32:
+                raise ValueError
+        except Exception:
+            messagebox.showwarning("YOLO", "Size must be a number of pixels (e.g. 640).")
+            return
+        # import, load and warm-up run on the loader thread; the old model
+        # keeps detecting until the new one is ready
+        self.loader.load(model_path, backend=self.yolo_backend.get(), workers=workers, imgsz=imgsz)
+        self.bt_reload.configure(state="disabled")
+        self.lb_model.configure(text="Model: loading...")
+        self.log(f"[YOLO] Loading model: {model_path}")
+
+    def on_model_progress(self, stage: str, info: str):
+        # loader thread
+        self.q.put(("__MODEL__", stage, info))
+
+    def on_model_loaded(self, model, error, seconds: float):
+        # loader thread
+        self.q.put(("__MODEL__", "done", (model, error, seconds)))
+
+    def on_preload(self, name: str, seconds: float, error):
+        # preload thread: missing optional packages are reported when used
+        if seconds > 0.5 and error is None:
+            self.q.put(f"[APP] Imported {name} in {seconds:.1f}s")
+
+    def handle_model_state(self, stage: str, info):
+        if stage != "done":
+            self.lb_model.configure(text=f"Model: {stage} {info}".rstrip())
+            return
+        model, error, seconds = info
+        self.bt_reload.configure(state="normal")
+        if error is not None:
+            self.lb_model.configure(text="Model: failed")
+            messagebox.showwarning("YOLO", f"Failed to load model: {error}")
+            return
+        from detector_pool import ProcessPoolDetector
+        self.release_model()
+        self.yolo_pooled = isinstance(model, ProcessPoolDetector)
+        self.yolo_model = model
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.det_cache is not None:
+            # boxes of the previous model
+            self.det_cache.clear()
+        self.lb_model.configure(text=f"Model: {model.name}")
+        self.log(f"[YOLO] Loaded model: {self.yolo_model_path.get().strip()} ({model.name}, "
+                 f"ready in {seconds:.1f}s)")
+
+    def release_model(self):
+        # worker processes of a pooled model must not outlive it
+        model, self.yolo_model = self.yolo_model, None
+        if model is not None:
+            model.close()
+
+    def ensure_vision(self) -> bool:
+        # first camera use: normally the preload thread already imported these
+        if self.display is not None:
+            return True
+        try:
+            from det_cache import DetectionCache
+            from display import DisplayEngine
+            from preprocess import MotionGate
+            from projection import Projector
         except Exception as e:
-            self.yolo_model = None
-            messagebox.showwarning("YOLO", f"Failed to load model: {e}")
+            messagebox.showwarning("Camera", f"Vision modules unavailable: {e}")
+            return False
+        if self.projector is None:
+            self.projector = Projector(hfov=float(self.hfov.get()), vfov=float(self.vfov.get()))
+        self.display = DisplayEngine()
+        self.motion_gate = MotionGate()
+        self.det_cache = DetectionCache()
+        return True
 
     def start_camera(self):
-        if cv2 is None:
-            messagebox.showwarning("Camera", "opencv-python not installed. Install: pip install opencv-python")
-            return
         try:
-            idx = int(self.ed_cam.get().strip())
+            import cv2
         except Exception:
-            messagebox.showwarning("Camera", "Camera index must be a number.")
+            messagebox.showwarning("Camera", "opencv-python not installed. Install: pip install opencv-python")
+            return
+        if not self.ensure_vision():
+            return
+        from sources import FrameSource
+        spec = self.ed_cam.get().strip()
+        if not spec:
+            messagebox.showwarning("Camera", "Enter a camera index, video file, image folder or stream URL.")
             return
         self.stop_camera()
-        self.cap = cv2.VideoCapture(idx)
+        # decodes on its own thread; files play at their frame rate
+        self.cap = FrameSource(spec, realtime=True)
         if not self.cap.isOpened():
+            self.cap.release()
             self.cap = None
-            messagebox.showwarning("Camera", "Cannot open camera.")
+            messagebox.showwarning("Camera", f"Cannot open {spec}.")
             return
+        self.sync_vision_settings()
+        self.pipeline = StagedPipeline(self.cap.read, self.infer_frame, self.render_frame,
+                                       on_error=self.pipeline_error)
+        self.pipeline.start()
         self.camera_running = True
         self.bt_cam_start.configure(state="disabled")
         self.bt_cam_stop.configure(state="normal")
-        self.log(f"[CAM] Started camera {idx}")
+        self.log(f"[CAM] Started {self.cap.kind} {spec}")
 
     def stop_camera(self):
         self.camera_running = False
+        self.estimator.reset()
+        self.last_det_center = None
+        self.gate_det = None
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
         if self.cap:
+            # first, so a capture thread waiting for a frame wakes up
             try:
                 self.cap.release()
             except Exception:
                 pass
-            self.cap = None
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+        self.cap = None
         self.bt_cam_start.configure(state="normal")
         self.bt_cam_stop.configure(state="disabled")
 
     def single_detect(self):
         self.single_request = True
 
-    def run_yolo(self, frame, single=False):
-        if YOLO is None or self.yolo_model is None:
-            if single:
-                messagebox.showwarning("YOLO", "Model not loaded.")
-            return frame
+    def pipeline_error(self, stage, e):
+        # called from pipeline threads; hand over to the Tk thread via the queue
+        self.q.put(f"[CAM] {stage} error: {e}")
+
+    def sync_vision_settings(self):
+        # Tk variables must only be touched from the Tk thread, so mirror the
+        # values the pipeline threads need into plain attributes.
+        try:
+            self.detect_interval = 1.0 / max(1, int(self.rate_hz.get()))
+            # a slow detect rate must not look like a lost target
+            self.estimator.lost_after = max(LOST_AFTER, 3 * self.detect_interval)
+        except Exception:
+            pass
         try:
-            results = self.yolo_model.predict(frame, verbose=False, conf=0.25, classes=[67])
-            if len(results) == 0:
-                return frame
-            r = results[0]
-            best = None
-            best_conf = 0.0
-            for b in r.boxes:
-                conf = float(b.conf.item())
-                if conf > best_conf:
-                    best_conf = conf
-                    best = b
-            if best is not None:
-                x1, y1, x2, y2 = map(int, best.xyxy[0].tolist())
-                cx = int((x1 + x2) / 2)
-                cy = int((y1 + y2) / 2)
-                self.last_det = (x1, y1, x2, y2, best_conf)
-                self.last_det_center = (cx, cy)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.circle(frame, (cx, cy), 4, (0, 255, 0), -1)
-                cv2.putText(frame, f"phone {best_conf:.2f}", (x1, max(0, y1 - 6)),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-            return frame
+            self.det_conf = min(1.0, max(0.0, float(self.yolo_conf.get())))
+        except Exception:
+            pass
+        try:
+            self.track_n = max(1, int(self.track_every.get()))
+        except Exception:
+            pass
+        self.yolo_on = bool(self.yolo_enabled.get())
+        self.track_on = bool(self.track_enabled.get())
+        self.gate_on = bool(self.skip_still.get())
+        self.cache_on = bool(self.cache_enabled.get())
+        self.view_size = (max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height()))
+
+    def run_yolo(self, frame):
+        # Runs on the inference worker: no Tk calls here, errors propagate.
+        return self.yolo_model.detect(frame, conf=self.det_conf)
+
+    def track_frame(self, frame):
+        # Inference worker: full detection every track_n frames, cheap ROI
+        # tracking in between so the center follows at camera rate.
+        t = self.roi_tracker
+        if t is None or t.detector is not self.yolo_model:
+            from roi_tracker import RoiTracker
+            t = self.roi_tracker = RoiTracker(self.yolo_model)
+        t.detect_every = self.track_n
+        det, _ = t.update(frame, conf=self.det_conf)
+        return det
+
+    def infer_frame(self, seq, ts, frame):
+        # Inference worker: returns (ts, frame_size, det, single, hold_frame, error) or None.
+        single = self.single_request
+        if single:
+            self.single_request = False
+        elif not self.yolo_on:
+            return None
+        elif not self.track_on and (ts - self.last_det_ts) < self.detect_interval:
+            return None
+        fh, fw = frame.shape[:2]
+        if self.yolo_model is None:
+            return (ts, (fw, fh), None, single, None, "Model not loaded.") if single else None
+        self.last_det_ts = ts
+        if not single and not self.track_on and self.gate_on and not self.motion_gate.changed(frame, ts):
+            # scene unchanged since the last inference: repeat its result
+            return (ts, (fw, fh), self.gate_det, False, None, None)
+        key = None
+        if self.cache_on and (single or not self.track_on):
+            # a near-identical frame was detected recently: reuse its box
+            hit, det, key = self.det_cache.lookup(frame, tag=self.det_conf)
+            if hit:
+                self.gate_det = det
+                return self.detect_result(ts, frame, det, single, None)
+        if not single and not self.track_on and self.yolo_pooled:
+            # pooled: hand the frame over and take the next one; results come
+            # back in frame order on the pool's collector thread
+            fut = self.yolo_model.submit(frame, conf=self.det_conf)
+            fut.add_done_callback(lambda f, ts=ts, size=(fw, fh), key=key: self.pooled_result(f, ts, size, key))
+            return None
+        det, error = None, None
+        try:
+            if single or not self.track_on:
+                det = self.gate_det = self.run_yolo(frame)
+                if key is not None:
+                    self.det_cache.put(key, det)
+            else:
+                det = self.track_frame(frame)
+        except Exception as e:
+            error = f"Detect error: {e}"
+        return self.detect_result(ts, frame, det, single, error)
+
+    def detect_result(self, ts, frame, det, single, error):
+        # Inference worker: a Single Detect result is drawn on a held copy.
+        fh, fw = frame.shape[:2]
+        hold = None
+        if single:
+            hold = frame.copy()
+            if det is not None:
+                from vision import draw_detection
+                draw_detection(hold, det)
+        return (ts, (fw, fh), det, single, hold, error)
+
+    def pooled_result(self, fut, ts, size, key=None):
+        if fut.cancelled() or self.pipeline is None:
+            return
+        error = fut.exception()
+        if error is not None:
+            self.q.put(f"[YOLO] Detect error: {error}")
+            return
+        self.gate_det = fut.result()
+        if key is not None:
+            self.det_cache.put(key, self.gate_det)
+        self.pipeline.publish((ts, size, self.gate_det, False, None, None))
+
+    def render_frame(self, seq, ts, frame, result):
+        # Render stage: resize/annotate/convert into the display engine's
+        # preallocated buffers; the Tk thread only pastes the result.
+        det = None
+        if self.hold_frame is not None and ts < self.hold_until:
+            frame = self.hold_frame
+        elif result is not None and result[2] is not None and ts - result[0] <= max(0.5, 2 * self.detect_interval):
+            det = result[2]
+        canvas_w, canvas_h = self.view_size
+        return self.display.prepare(frame, canvas_w, canvas_h, det), ts
+
+    def load_calibration(self):
+        path = self.calib_path.get().strip()
+        if not path:
+            if self.projector is not None:
+                self.projector.camera = None
+            self.log("[CAM] No calibration: ideal lens from HFOV/VFOV.")
+            return
+        try:
+            from projection import Projector
+            proj = Projector.from_file(path)
         except Exception as e:
-            if single:
-                messagebox.showwarning("YOLO", f"Detect error: {e}")
-            return frame
+            messagebox.showerror("Calibration", f"Failed to load calibration:\n{e}")
+            return
+        if self.res_shown is None:
+            self.use_calibration(proj, path)
+            return
+        # the full-resolution lookup table takes ~0.4 s at 1080p: build it
+        # off the Tk thread, the old projector keeps serving until then
+        size = self.res_shown
+
+        def build():
+            try:
+                proj.lut(*size)
+            except Exception as e:
+                # the first send retries it and reports there
+                self.q.put(f"[CAM] Lookup table for {size[0]}x{size[1]} failed: {e}")
+            self.q.put(("__CALIB__", proj, path))
+
+        self.bt_calib.configure(state="disabled")
+        threading.Thread(target=build, name="calib-lut", daemon=True).start()
+
+    def use_calibration(self, proj, path: str):
+        self.bt_calib.configure(state="normal")
+        self.projector = proj
+        w, h = proj.camera.size
+        self.log(f"[CAM] Calibration loaded: {path} ({w}x{h}, {proj.camera.dist.size} distortion coeffs)")
+
+    def handle_result(self, result, now):
+        ts, (fw, fh), det, single, hold, error = result
+        PERF.observe("latency.detect", now - ts)
+        if single:
+            if error:
+                messagebox.showwarning("YOLO", error)
+            if hold is not None:
+                self.hold_frame = hold
+                self.hold_until = now + 5.0
+        if det is not None:
+            from vision import box_center
+            self.last_det = det
+            self.last_det_center = box_center(det)
+            self.estimator.update(*self.last_det_center, ts)
+            self.last_det_size = (fw, fh)
+            if self.recorder is not None:
+                self.recorder.record_detection(det, (fw, fh), t=ts)
+
+    def send_center(self, now):
+        # Detection runs at Detect Hz; the scheduler decides which centers
+        # are worth a packet (see send_rate.py). The center sent is the
+        # filtered one, predicted to where the target should be when the
+        # packet lands: capture -> now plus half the ACK round trip.
+        rtt = self.channel.rtt
+        predicted = self.estimator.predict(now + (rtt / 2 if rtt else 0.0))
+        if predicted is None:
+            self.last_det_center = None
+            self.log("[YOLO] Target lost.")
+            return
+        t0 = PERF.now()
+        cx, cy = predicted if self.predict_enabled.get() else self.last_det_center
+        fw, fh = self.last_det_size
+        self.projector.set_fov(float(self.hfov.get()), float(self.vfov.get()))
+        angle_x, angle_y = self.projector.angles(cx, cy, fw, fh)
+        # swap axes to match Processing expectations
+        x, y = angle_y, angle_x
+        if not self.scheduler.due(x, y, now, rtt=self.channel.rtt, backlog=self.link.pending()):
+            return
+        # newest center wins if the link is backed up or down
+        if self.channel.send_target(x, y):
+            self.scheduler.sent(x, y, now)
+            PERF.count("sends")
+        PERF.since("send", t0)
+
+    def update_send_status(self, now):
+        if now - self.send_status_ts < 0.5:
+            return
+        self.send_status_ts = now
+        st = self.scheduler.stats()
+        rtt = self.channel.rtt
+        self.lb_send.configure(text=f"Send: {st['hz']:.0f} Hz, rtt {'-' if rtt is None else f'{rtt * 1000:.0f} ms'}, "
+                                    f"sent {st['sends']}, skipped {st['suppressed']}")
+
+    def update_cache_status(self, now):
+        if now - self.cache_status_ts < 0.5:
+            return
+        self.cache_status_ts = now
+        if not self.cache_on:
+            self.lb_cache.configure(text="Cache: off")
+            return
+        st = self.det_cache.stats()
+        self.lb_cache.configure(text=f"Cache: {st['hits']} hits / {st['misses']} misses "
+                                     f"({st['hit_rate'] * 100:.0f}%), {st['entries']} kept")
 
     def update_camera(self):
-        if self.camera_running and self.cap:
-            ret, frame = self.cap.read()
-            if ret:
-                fh, fw = frame.shape[:2]
-                self.lb_res.configure(text=f"Res: {fw}x{fh}")
-                self.last_frame = frame
-                now = time.time()
-                interval = 1.0 / max(1, int(self.rate_hz.get()))
-
-                if self.single_request:
-                    frame = self.run_yolo(frame, single=True)
-                    self.hold_frame = frame.copy()
-                    self.hold_until = now + 5.0
-                    self.single_request = False
-                elif self.yolo_enabled.get() and (now - self.last_det_ts) >= interval:
-                    frame = self.run_yolo(frame)
-                    self.last_det_ts = now
-
-                # If single detect is holding, show that frame
-                if self.hold_frame is not None and now < self.hold_until:
-                    frame = self.hold_frame.copy()
-                elif self.hold_frame is not None and now >= self.hold_until:
-                    self.hold_frame = None
-
-                # Send center via TCP (throttled)
-                if self.send_enabled.get() and self.sock and self.last_det_center is not None:
-                    if (now - self.last_send_ts) >= interval:
-                        cx, cy = self.last_det_center
-                        hfov = float(self.hfov.get())
-                        vfov = float(self.vfov.get())
-                        angle_x = (cx / max(1, fw) - 0.5) * hfov
-                        angle_y = (0.5 - cy / max(1, fh)) * vfov
-                        # swap axes to match Processing expectations
-                        line = f"MSG:PHONE;X:{angle_y:.2f};Y:{angle_x:.2f}\n"
-                        try:
-                            self.sock.sendall(line.encode("utf-8"))
-                            self.last_send_ts = now
-                        except Exception as e:
-                            self.log(f"[NET] Send error: {e}")
-                            self.disconnect_arduino()
-
-                # convert BGR -> RGB for Tk
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, _ = frame_rgb.shape
-                canvas_w = max(1, self.canvas.winfo_width())
-                canvas_h = max(1, self.canvas.winfo_height())
-
-                # preserve aspect ratio (letterbox)
-                scale = min(canvas_w / w, canvas_h / h)
-                new_w = max(1, int(w * scale))
-                new_h = max(1, int(h * scale))
-                resized = cv2.resize(frame_rgb, (new_w, new_h))
-
-                if ImageTk is not None:
-                    img = ImageTk.PhotoImage(Image.fromarray(resized))
-                else:
-                    png_bytes = cv2.imencode(".png", resized)[1].tobytes()
-                    img = tk.PhotoImage(master=self.canvas, data=base64.b64encode(png_bytes))
-
-                self.canvas.delete("all")
-                x0 = (canvas_w - new_w) // 2
-                y0 = (canvas_h - new_h) // 2
-                self.canvas.image = img
-                self.canvas.create_image(x0, y0, image=img, anchor="nw")
-        self.root.after(30, self.update_camera)
+        # Tk thread: pick up the newest result and frame, never wait on the pipeline.
+        if self.camera_running and self.pipeline:
+            now = time.time()
+            self.sync_vision_settings()
+            if self.hold_frame is not None and now >= self.hold_until:
+                self.hold_frame = None
+
+            result = self.pipeline.result_q.get_latest()
+            if result is not None:
+                self.handle_result(result, now)
+
+            # Send center via TCP (throttled)
+            if self.send_enabled.get() and self.link.active and self.last_det_center is not None:
+                self.send_center(now)
+                self.update_send_status(now)
+
+            item = self.pipeline.display_q.get_latest()
+            if item is not None:
+                item, ts = item
+                fw, fh = item[3]
+                if self.res_shown != (fw, fh):
+                    self.lb_res.configure(text=f"Res: {fw}x{fh}")
+                    self.res_shown = (fw, fh)
+                t0 = PERF.now()
+                self.display.blit(self.canvas, item)
+                PERF.since("tk.blit", t0)
+                PERF.count("frames.displayed")
+                PERF.observe("latency.frame", time.time() - ts)
+            self.update_cache_status(now)
+            if self.overlay_item is not None:
+                self.update_overlay(now)
+        self.root.after(15, self.update_camera)
+
+    # ===== Perf =====
+    def toggle_perf(self):
+        on = bool(self.perf_enabled.get())
+        if on:
+            PERF.reset()
+            self.perf_meter = RateMeter(PERF)
+            self.overlay_item = self.canvas.create_text(8, 8, anchor="nw", fill="#00ff00", font=("Consolas", 10),
+                                                        text="measuring...")
+            path = os.environ.get(PERF_EXPORT_ENV)
+            if path:
+                self.perf_exporter = PerfExporter(PERF, path).start()
+                self.log(f"[PERF] Exporting to {path}")
+        else:
+            if self.overlay_item is not None:
+                self.canvas.delete(self.overlay_item)
+                self.overlay_item = None
+            if self.perf_exporter is not None:
+                self.perf_exporter.stop()
+                self.perf_exporter = None
+            snap = PERF.snapshot()
+            for name, st in snap["stages"].items():
+                self.log(f"[PERF] {name:18s} n={st['n']} p50={st['p50_ms']:.1f}ms p95={st['p95_ms']:.1f}ms "
+                         f"max={st['max_ms']:.1f}ms")
+        PERF.enabled = on
+
+    def update_overlay(self, now):
+        if now - self.overlay_ts < OVERLAY_EVERY:
+            return
+        self.overlay_ts = now
+        self.canvas.itemconfigure(self.overlay_item, text=overlay_text(PERF.take_window(), self.perf_meter.update()))
+        # the video item is created after the overlay on the first frame
+        self.canvas.tag_raise(self.overlay_item)
 
 
 def main():
@@ -535,7 +927,13 @@ def main():
     app = App(root)
 
     def on_close():
-        app.disconnect_arduino()
+        app.stop_camera()
+        app.stop_recording()
+        app.loader.cancel()
+        if app.perf_exporter is not None:
+            app.perf_exporter.stop()
+        app.release_model()
+        app.link.close()
         root.destroy()
 
     root.protocol("WM_DELETE_WINDOW", on_close)